@@ -0,0 +1,151 @@
+"""
+Índice de adjacência entre chunks da LOA 2026.
+
+Guarda a ordem dos chunks no documento (página, chunk_index) para que um
+resultado de busca possa ser expandido com os chunks vizinhos, formando
+uma passagem completa (descrição de programa, tabela que continua na
+página seguinte etc.).
+
+Documentos ingeridos à parte (metadado `document`) e as linhas de cada
+tabela (`table_id`) formam sequências próprias: a expansão nunca une
+chunks de sequências diferentes.
+"""
+
+from array import array
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+from corpus import Corpus
+
+
+class _Ranks:
+    """ID do chunk -> posição na ordem de adjacência (sem um dict próprio)."""
+
+    def __init__(self, position: Dict[str, int], rank: array):
+        self._position = position
+        self._rank = rank
+
+    def get(self, chunk_id: str, default: Optional[int] = None) -> Optional[int]:
+        row = self._position.get(chunk_id)
+        return default if row is None else self._rank[row]
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._position
+
+    def __getitem__(self, chunk_id: str) -> int:
+        return self._rank[self._position[chunk_id]]
+
+
+class AdjacencyIndex:
+    """Mapeia cada chunk para sua posição na ordem do documento."""
+
+    # Vizinhos só são unidos se estiverem na mesma página ou em páginas consecutivas
+    MAX_PAGE_GAP = 1
+
+    def __init__(self):
+        self.corpus = Corpus()
+        # Posições do corpus na ordem de adjacência e o inverso (posição -> ordem)
+        self.order = array("i")
+        self.rank = array("i")
+        self.pages = array("i")
+        self.streams = array("i")
+        self.position = _Ranks(self.corpus.position, self.rank)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def build(self, corpus: Corpus) -> "AdjacencyIndex":
+        """
+        Reconstrói o índice a partir do corpus.
+
+        Args:
+            corpus: Chunks na ordem do documento (página, chunk_index)
+        """
+        stream_codes: Dict[Tuple[Any, Any], int] = {}
+        streams = array("i", (
+            stream_codes.setdefault(self.stream(corpus, row), len(stream_codes))
+            for row in range(len(corpus))
+        ))
+        # Ordenação estável: cada sequência mantém a ordem do documento
+        order = array("i", sorted(range(len(corpus)), key=streams.__getitem__))
+        rank = array("i", [0]) * len(corpus)
+        for index, row in enumerate(order):
+            rank[row] = index
+        pages = array("i", (int(corpus.value(row, "page") or 0) for row in order))
+
+        # Monta em variáveis locais e troca no fim: buscas concorrentes
+        # continuam lendo o índice anterior durante a reconstrução
+        self.corpus, self.order, self.rank, self.pages, self.streams, self.position = (
+            corpus, order, rank, pages, array("i", (streams[row] for row in order)),
+            _Ranks(corpus.position, rank)
+        )
+        return self
+
+    @staticmethod
+    def stream(corpus: Corpus, row: int) -> Tuple[Any, Any]:
+        """Sequência do chunk: (documento ingerido, tabela); (None, None) = texto da LOA."""
+        return corpus.value(row, "document"), corpus.value(row, "table_id")
+
+    def neighbors(self, chunk_id: str, window: int) -> List[str]:
+        """
+        Retorna o chunk e até `window` vizinhos de cada lado, na ordem do documento.
+
+        A expansão para ao encontrar um salto de páginas maior que MAX_PAGE_GAP.
+        """
+        pos = self.position.get(chunk_id)
+        if pos is None:
+            return [chunk_id]
+
+        stream = self.streams[pos]
+        start = pos
+        while start > 0 and pos - start < window and self.streams[start - 1] == stream and \
+                self.pages[start] - self.pages[start - 1] <= self.MAX_PAGE_GAP:
+            start -= 1
+
+        end = pos
+        while end < len(self.order) - 1 and end - pos < window and self.streams[end + 1] == stream and \
+                self.pages[end + 1] - self.pages[end] <= self.MAX_PAGE_GAP:
+            end += 1
+
+        ids = self.corpus.ids
+        return [ids[row] for row in self.order[start:end + 1]]
+
+    def expand(self, chunk_ids: List[str], window: int) -> List[List[str]]:
+        """
+        Expande cada hit com seus vizinhos, sem repetir chunks entre hits.
+
+        Hits que já fazem parte da passagem de um hit anterior (melhor
+        ranqueado) retornam lista vazia e devem ser descartados.
+
+        Args:
+            chunk_ids: IDs dos hits na ordem de relevância
+            window: Número de vizinhos de cada lado
+
+        Returns:
+            Para cada hit, os IDs da passagem na ordem do documento
+        """
+        seen: Set[str] = set()
+        passages = []
+        for chunk_id in chunk_ids:
+            if chunk_id in seen:
+                passages.append([])
+                continue
+            passage = [cid for cid in self.neighbors(chunk_id, window) if cid not in seen]
+            seen.update(passage)
+            passages.append(passage)
+        return passages
+
+
+def stitch(texts: List[str], max_overlap: int = 200, min_overlap: int = 20) -> str:
+    """Une textos de chunks consecutivos removendo sobreposição entre eles."""
+    merged = ""
+    for text in texts:
+        if not merged:
+            merged = text
+            continue
+        overlap = 0
+        for size in range(min(max_overlap, len(merged), len(text)), min_overlap - 1, -1):
+            if merged.endswith(text[:size]):
+                overlap = size
+                break
+        merged += text[overlap:] if overlap else "\n\n" + text
+    return merged
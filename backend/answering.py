@@ -0,0 +1,400 @@
+"""
+Respostas fundamentadas sobre a LOA 2026.
+
+Fluxo de /api/answer:
+
+1. recupera os hits da busca (com o roteador e o reranking do vetorizador);
+2. empacota os hits no prompt de forma gulosa sob um orçamento de tokens,
+   removendo quase-duplicatas, unindo chunks vizinhos e compactando tabelas;
+3. chama um backend de LLM plugável (Gemini por padrão, ou um substituto
+   local determinístico) em modo streaming;
+4. emite eventos (fontes, tokens, métricas) para a resposta SSE, com as
+   citações no formato [id do chunk].
+"""
+
+import os
+import re
+import time
+import threading
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+import google.generativeai as genai
+
+from adjacency import AdjacencyIndex, stitch
+from dedup import SimHashDeduplicator
+
+
+# Aproximação de tokens para português (~4 caracteres por token)
+CHARS_PER_TOKEN = 4
+
+CITATION_PATTERN = re.compile(r"\[([\w\-]+)\]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata do número de tokens de um texto."""
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def compact_table(text: str) -> str:
+    """
+    Compacta o texto de uma tabela para o prompt.
+
+    Remove pontilhados de preenchimento, espaços repetidos, linhas vazias e
+    linhas consecutivas idênticas, sem alterar números nem nomes.
+    """
+    lines = []
+    for line in text.splitlines():
+        line = re.sub(r"[.·_]{3,}", " ", line)
+        line = re.sub(r"[ \t]{2,}", " ", line).strip()
+        if line and (not lines or lines[-1] != line):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+class ContextPacker:
+    """
+    Monta o contexto do prompt sob um orçamento de tokens.
+
+    Os hits são considerados na ordem de relevância. Hits vizinhos no
+    documento viram um único bloco (uma citação, sem texto sobreposto);
+    quase-duplicatas de hits já incluídos são descartadas; tabelas são
+    compactadas. Cada bloco entra inteiro se couber; o primeiro bloco que
+    não couber é truncado se restar espaço útil.
+    """
+
+    MIN_PARTIAL_TOKENS = 80
+
+    def __init__(self, token_budget: int = 1500):
+        self.token_budget = token_budget
+        self.deduplicator = SimHashDeduplicator()
+
+    def pack(
+        self,
+        hits: List[Dict[str, Any]],
+        adjacency: Optional[AdjacencyIndex] = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Empacota os hits em blocos de contexto.
+
+        Args:
+            hits: Resultados da busca com id, text e metadata, em ordem de relevância
+            adjacency: Índice com a ordem dos chunks no documento (para unir vizinhos)
+
+        Returns:
+            Tupla (blocos com ids, pages, text e tokens; relatório do empacotamento)
+        """
+        adjacency = adjacency or AdjacencyIndex()
+        report = {
+            "token_budget": self.token_budget,
+            "hits": len(hits),
+            "duplicates_skipped": 0,
+            "neighbors_merged": 0,
+            "truncated": 0,
+            "dropped": 0,
+        }
+
+        # Quase-duplicatas (tabelas repetidas em várias páginas) entram uma vez só
+        unique = []
+        hashes: List[int] = []
+        for hit in hits:
+            value = self.deduplicator.simhash(hit["text"])
+            if any(bin(value ^ other).count("1") <= self.deduplicator.max_distance for other in hashes):
+                report["duplicates_skipped"] += 1
+                continue
+            hashes.append(value)
+            unique.append(hit)
+
+        groups = self._merge_neighbors(unique, adjacency, report)
+
+        blocks: List[Dict[str, Any]] = []
+        used = 0
+        for group in groups:
+            text = stitch([
+                compact_table(hit["text"]) if hit["metadata"].get("chunk_type") == "tabela" else hit["text"]
+                for hit in group
+            ])
+
+            ids = [hit["id"] for hit in group]
+            header = self._header(ids, group)
+            tokens = estimate_tokens(header + text)
+            remaining = self.token_budget - used
+
+            if tokens > remaining:
+                if remaining < self.MIN_PARTIAL_TOKENS:
+                    report["dropped"] += len(group)
+                    continue
+                text = self._truncate(text, (remaining - estimate_tokens(header)) * CHARS_PER_TOKEN)
+                tokens = estimate_tokens(header + text)
+                report["truncated"] += 1
+
+            blocks.append({
+                "ids": ids,
+                "pages": sorted({hit["metadata"].get("page") for hit in group}),
+                "header": header,
+                "text": text,
+                "tokens": tokens
+            })
+            used += tokens
+
+        report["blocks"] = len(blocks)
+        report["tokens_used"] = used
+        return blocks, report
+
+    @staticmethod
+    def _merge_neighbors(
+        hits: List[Dict[str, Any]],
+        adjacency: AdjacencyIndex,
+        report: Dict[str, Any]
+    ) -> List[List[Dict[str, Any]]]:
+        """Agrupa hits consecutivos no documento, mantendo a ordem do melhor hit de cada grupo."""
+        position = adjacency.position
+        groups: List[List[Dict[str, Any]]] = []
+        group_of: Dict[int, int] = {}
+        for hit in hits:
+            pos = position.get(hit["id"])
+            target = None
+            if pos is not None:
+                for other in (pos - 1, pos + 1):
+                    # Só une vizinhos na mesma página ou em páginas consecutivas
+                    if other in group_of and \
+                            abs(adjacency.pages[other] - adjacency.pages[pos]) <= adjacency.MAX_PAGE_GAP:
+                        target = group_of[other]
+                        break
+            if target is None:
+                target = len(groups)
+                groups.append([])
+            else:
+                report["neighbors_merged"] += 1
+            groups[target].append(hit)
+            if pos is not None:
+                group_of[pos] = target
+
+        for group in groups:
+            group.sort(key=lambda hit: position.get(hit["id"], 0))
+        return groups
+
+    @staticmethod
+    def _header(ids: List[str], group: List[Dict[str, Any]]) -> str:
+        pages = sorted({str(hit["metadata"].get("page", "?")) for hit in group})
+        return f"[{ids[0]}] (página {', '.join(pages)})\n"
+
+    @staticmethod
+    def _truncate(text: str, max_chars: int) -> str:
+        """Corta o texto no último fim de linha ou espaço antes do limite."""
+        if len(text) <= max_chars:
+            return text
+        cut = text[:max_chars]
+        boundary = max(cut.rfind("\n"), cut.rfind(" "))
+        return (cut[:boundary] if boundary > max_chars // 2 else cut).rstrip() + " …"
+
+
+PROMPT_TEMPLATE = """Você é um assistente que responde perguntas sobre a Lei Orçamentária Anual (LOA) 2026 de Fortaleza.
+Responda em português, de forma direta, usando SOMENTE os trechos abaixo.
+Cite a fonte de cada informação com o identificador do trecho entre colchetes, por exemplo [loa_page_254_chunk_1].
+Se os trechos não contiverem a resposta, diga que a informação não foi encontrada na LOA.
+
+Trechos:
+{context}
+
+Pergunta: {question}
+Resposta:"""
+
+
+def build_prompt(question: str, blocks: List[Dict[str, Any]]) -> str:
+    """Monta o prompt a partir dos blocos empacotados."""
+    context = "\n\n".join(block["header"] + block["text"] for block in blocks)
+    return PROMPT_TEMPLATE.format(context=context, question=question.strip())
+
+
+class LLMBackend:
+    """Interface dos backends de geração."""
+
+    name = "base"
+
+    def stream(self, prompt: str, max_output_tokens: int) -> Iterator[str]:
+        """Gera a resposta em pedaços de texto."""
+        raise NotImplementedError
+
+
+class GeminiLLM(LLMBackend):
+    """Geração com Gemini em modo streaming."""
+
+    name = "gemini"
+    MODEL = "gemini-2.0-flash"
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = genai.GenerativeModel(model or os.getenv("ANSWER_MODEL", self.MODEL))
+
+    def stream(self, prompt: str, max_output_tokens: int) -> Iterator[str]:
+        response = self.model.generate_content(
+            prompt,
+            generation_config={"max_output_tokens": max_output_tokens, "temperature": 0.2},
+            stream=True
+        )
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Pedaço sem texto (ex: bloqueado por segurança)
+                continue
+            if text:
+                yield text
+
+
+class ExtractiveLLM(LLMBackend):
+    """
+    Substituto local e determinístico do LLM (testes e uso offline).
+
+    Responde com a primeira frase de cada trecho do prompt, citando o
+    trecho, emitida palavra a palavra como um stream.
+    """
+
+    name = "extractive"
+    BLOCK_PATTERN = re.compile(r"^\[([\w\-]+)\] \(página [^)]*\)\n(.+?)(?=\n\n\[|\n\nPergunta:)", re.M | re.S)
+
+    def stream(self, prompt: str, max_output_tokens: int) -> Iterator[str]:
+        budget = max_output_tokens
+        blocks = self.BLOCK_PATTERN.findall(prompt)
+        if not blocks:
+            yield "A informação não foi encontrada na LOA."
+            return
+        for chunk_id, text in blocks:
+            sentence = re.split(r"(?<=[.!?])\s+|\n", text.strip(), maxsplit=1)[0]
+            for word in f"{sentence} [{chunk_id}]\n".split(" "):
+                budget -= estimate_tokens(word)
+                if budget < 0:
+                    return
+                yield word + " "
+
+
+def create_llm(backend: Optional[str] = None) -> LLMBackend:
+    """
+    Cria o backend de geração configurado.
+
+    Args:
+        backend: "gemini" ou "extractive" (padrão: variável ANSWER_BACKEND ou "gemini")
+    """
+    backend = backend or os.getenv("ANSWER_BACKEND", "gemini")
+    if backend == "gemini":
+        return GeminiLLM()
+    if backend == "extractive":
+        return ExtractiveLLM()
+    raise ValueError(f"Backend de geração desconhecido: {backend}")
+
+
+class AnswerService:
+    """Orquestra recuperação, empacotamento e geração, com métricas."""
+
+    TOKEN_BUDGET = 1500
+    MAX_OUTPUT_TOKENS = 512
+    N_RESULTS = 8
+
+    def __init__(self, vectorizer: Any, llm: Optional[LLMBackend] = None):
+        self.vectorizer = vectorizer
+        self.llm = llm or create_llm()
+        self._lock = threading.Lock()
+        self.metrics = {
+            "requests": 0,
+            "ttft_ms_total": 0.0,
+            "prompt_tokens_total": 0,
+            "completion_tokens_total": 0,
+        }
+
+    def stream_answer(
+        self,
+        question: str,
+        n_results: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        token_budget: Optional[int] = None,
+        max_output_tokens: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Gera os eventos da resposta.
+
+        Eventos, em ordem:
+        - {"type": "sources", "sources": [...], "packing": {...}} logo após a recuperação
+        - {"type": "token", "text": "..."} para cada pedaço gerado
+        - {"type": "done", "citations": [...], "metrics": {...}}
+        """
+        started = time.perf_counter()
+        search = self.vectorizer.search(
+            question,
+            n_results=n_results or self.N_RESULTS,
+            filters=filters,
+            include_text=True,
+            rerank=True
+        )
+        retrieval_ms = (time.perf_counter() - started) * 1000
+
+        packer = ContextPacker(token_budget or self.TOKEN_BUDGET)
+        blocks, packing = packer.pack(search["results"], self.vectorizer.adjacency)
+        sources = [{"id": block["ids"][0], "chunk_ids": block["ids"], "pages": block["pages"]} for block in blocks]
+
+        # As fontes saem antes da geração: o cliente já pode mostrá-las
+        yield {"type": "sources", "route": search.get("route"), "sources": sources, "packing": packing}
+
+        prompt = build_prompt(question, blocks)
+        prompt_tokens = estimate_tokens(prompt)
+
+        first_token_at = None
+        completion = []
+        for text in self.llm.stream(prompt, max_output_tokens or self.MAX_OUTPUT_TOKENS):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            completion.append(text)
+            yield {"type": "token", "text": text}
+
+        answer = "".join(completion)
+        known = {chunk_id for block in blocks for chunk_id in block["ids"]}
+        citations = []
+        for chunk_id in CITATION_PATTERN.findall(answer):
+            if chunk_id in known and chunk_id not in citations:
+                citations.append(chunk_id)
+
+        finished = time.perf_counter()
+        metrics = {
+            "llm_backend": self.llm.name,
+            "retrieval_ms": round(retrieval_ms, 2),
+            "ttft_ms": round(((first_token_at or finished) - started) * 1000, 2),
+            "total_ms": round((finished - started) * 1000, 2),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens(answer) if answer else 0,
+        }
+        self._record(metrics)
+        yield {"type": "done", "citations": citations, "metrics": metrics}
+
+    def answer(self, question: str, **kwargs) -> Dict[str, Any]:
+        """Versão sem streaming: acumula os eventos em uma resposta única."""
+        result: Dict[str, Any] = {"question": question, "answer": ""}
+        parts = []
+        for event in self.stream_answer(question, **kwargs):
+            if event["type"] == "token":
+                parts.append(event["text"])
+            elif event["type"] == "sources":
+                result["sources"] = event["sources"]
+                result["packing"] = event["packing"]
+            else:
+                result["citations"] = event["citations"]
+                result["metrics"] = event["metrics"]
+        result["answer"] = "".join(parts).strip()
+        return result
+
+    def _record(self, metrics: Dict[str, Any]) -> None:
+        with self._lock:
+            self.metrics["requests"] += 1
+            self.metrics["ttft_ms_total"] += metrics["ttft_ms"]
+            self.metrics["prompt_tokens_total"] += metrics["prompt_tokens"]
+            self.metrics["completion_tokens_total"] += metrics["completion_tokens"]
+
+    def stats(self) -> Dict[str, Any]:
+        """Médias de TTFT e tokens por requisição."""
+        requests = self.metrics["requests"]
+        if not requests:
+            return {"requests": 0, "llm_backend": self.llm.name}
+        return {
+            "requests": requests,
+            "llm_backend": self.llm.name,
+            "avg_ttft_ms": round(self.metrics["ttft_ms_total"] / requests, 2),
+            "avg_prompt_tokens": round(self.metrics["prompt_tokens_total"] / requests, 1),
+            "avg_completion_tokens": round(self.metrics["completion_tokens_total"] / requests, 1),
+        }
@@ -0,0 +1,435 @@
+"""
+Benchmarks da busca na LOA 2026.
+
+Executa o conjunto de queries de benchmark_queries.json contra a coleção
+indexada e reporta qualidade (recall@k por página, MRR) e latência.
+
+Uso:
+    python benchmark.py rerank [--k 5] [--runs 3]
+    python benchmark.py vector-store [--k 10] [--sample 200]
+    python benchmark.py quantization [--k 10] [--dimensions 768,512,256]
+    python benchmark.py ingest [--pdf LOA.pdf] [--page-limits 100,400,0] [--queue-size 4]
+    python benchmark.py serialization [--k 5] [--runs 3]
+    python benchmark.py corpus [--page-limits 0]
+
+O benchmark `ingest` indexa em um diretório temporário (gera embeddings
+reais no Gemini). Sem PDF disponível, usa o texto do content_list.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+
+QUERIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_queries.json")
+CHROMA_PERSIST_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "chroma_db"
+)
+PDF_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "Arquivo completo LOA 2026",
+    "LOA-2026-numerado.pdf"
+)
+CONTENT_LIST_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "Arquivo completo LOA 2026",
+    "Dados LOA 2026",
+    "LOA-2026 (1)_content_list.json"
+)
+
+
+def load_queries(path: str = QUERIES_PATH) -> List[Dict[str, Any]]:
+    """Carrega o conjunto de queries com as páginas relevantes."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def quality(results: List[Dict[str, Any]], relevant_pages: List[int]) -> Dict[str, float]:
+    """Calcula hit@k e reciprocal rank considerando a página como relevância."""
+    relevant = set(relevant_pages)
+    for rank, result in enumerate(results, start=1):
+        if result["metadata"].get("page") in relevant:
+            return {"hit": 1.0, "rr": 1.0 / rank}
+    return {"hit": 0.0, "rr": 0.0}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil simples (nearest-rank)."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run_variant(
+    name: str,
+    search: Callable[[str], Dict[str, Any]],
+    queries: List[Dict[str, Any]],
+    runs: int
+) -> Dict[str, Any]:
+    """Executa uma variante de busca sobre todas as queries."""
+    latencies = []
+    hits = []
+    rrs = []
+    for run in range(runs):
+        for item in queries:
+            started = time.perf_counter()
+            response = search(item["query"])
+            latencies.append((time.perf_counter() - started) * 1000)
+            if run == 0:
+                q = quality(response["results"], item["relevant_pages"])
+                hits.append(q["hit"])
+                rrs.append(q["rr"])
+
+    return {
+        "variant": name,
+        "recall_at_k": round(statistics.mean(hits), 3),
+        "mrr": round(statistics.mean(rrs), 3),
+        "latency_p50_ms": round(percentile(latencies, 50), 2),
+        "latency_p95_ms": round(percentile(latencies, 95), 2),
+    }
+
+
+def bench_rerank(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Compara a ordem do HNSW com o reranking local."""
+    from loa_vectorizer import create_vectorizer
+
+    vectorizer = create_vectorizer(persist_dir=args.persist_dir)
+    vectorizer.refresh_indexes()
+    queries = load_queries()
+
+    variants = {
+        "hnsw": lambda q: vectorizer.search(q, n_results=args.k, include_text=False),
+        "rerank": lambda q: vectorizer.search(
+            q, n_results=args.k, include_text=False, rerank=True, rerank_factor=args.factor
+        ),
+    }
+    return [run_variant(name, fn, queries, args.runs) for name, fn in variants.items()]
+
+
+def load_collection_vectors(persist_dir: str) -> Dict[str, Any]:
+    """Lê vetores, documentos e metadados da coleção Chroma existente."""
+    import numpy as np
+    from vector_store import ChromaVectorStore
+
+    chroma = ChromaVectorStore(persist_dir, collection_metadata={"hnsw:space": "cosine"})
+    data = chroma.collection.get(include=["embeddings", "documents", "metadatas"])
+    return {
+        "store": chroma,
+        "ids": data["ids"],
+        "embeddings": np.asarray(data["embeddings"], dtype=np.float32),
+        "documents": data["documents"],
+        "metadatas": data["metadatas"]
+    }
+
+
+def sample_queries(embeddings, size: int, seed: int = 42):
+    """Gera queries a partir de vetores reais da coleção com um pequeno ruído."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(embeddings), size=min(size, len(embeddings)), replace=False)
+    noise = rng.normal(scale=0.01, size=(len(rows), embeddings.shape[1])).astype(np.float32)
+    return embeddings[rows] + noise
+
+
+def time_queries(store, queries, k: int, batch: bool = False) -> Dict[str, Any]:
+    """Mede latência por query (ou do lote inteiro) e retorna os ids encontrados."""
+    latencies = []
+    found = []
+    if batch:
+        started = time.perf_counter()
+        response = store.query(query_embeddings=queries.tolist(), n_results=k)
+        latencies.append((time.perf_counter() - started) * 1000 / len(queries))
+        found = response["ids"]
+    else:
+        for query in queries:
+            started = time.perf_counter()
+            response = store.query(query_embeddings=[query.tolist()], n_results=k)
+            latencies.append((time.perf_counter() - started) * 1000)
+            found.append(response["ids"][0])
+    return {"latencies": latencies, "ids": found}
+
+
+def recall(found: List[List[str]], truth: List[List[str]]) -> float:
+    """Recall@k médio de `found` em relação à busca exata."""
+    return statistics.mean(
+        len(set(f) & set(t)) / len(t) for f, t in zip(found, truth) if t
+    )
+
+
+def bench_vector_store(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Compara Chroma (HNSW) e NumPy (exato, float32/float16) na coleção real."""
+    from vector_store import NumpyVectorStore
+
+    data = load_collection_vectors(args.persist_dir)
+    queries = sample_queries(data["embeddings"], args.sample)
+
+    stores = {"chroma": data["store"]}
+    for dtype in ("float32", "float16"):
+        store = NumpyVectorStore(tempfile.mkdtemp(prefix=f"loa_numpy_{dtype}_"),
+                                 dimension=data["embeddings"].shape[1], dtype=dtype)
+        store.add(data["ids"], data["embeddings"], data["documents"], data["metadatas"])
+        stores[f"numpy_{dtype}"] = store
+
+    truth = time_queries(stores["numpy_float32"], queries, args.k)["ids"]
+
+    rows = []
+    for name, store in stores.items():
+        timing = time_queries(store, queries, args.k)
+        rows.append({
+            "backend": name,
+            "vectors": len(data["ids"]),
+            f"recall_at_{args.k}": round(recall(timing["ids"], truth), 4),
+            "latency_p50_ms": round(percentile(timing["latencies"], 50), 3),
+            "latency_p95_ms": round(percentile(timing["latencies"], 95), 3),
+        })
+        if name.startswith("numpy"):
+            batched = time_queries(store, queries, args.k, batch=True)
+            rows.append({
+                "backend": f"{name}_batch",
+                "vectors": len(data["ids"]),
+                f"recall_at_{args.k}": round(recall(batched["ids"], truth), 4),
+                "latency_per_query_ms": round(batched["latencies"][0], 3),
+            })
+    return rows
+
+
+def bench_quantization(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Memória economizada vs recall@k perdido com float16/int8 e truncamento de dimensões."""
+    from loa_vectorizer import LOAVectorizer
+    from vector_store import NumpyVectorStore, VECTOR_DTYPES
+
+    data = load_collection_vectors(args.persist_dir)
+    queries = load_queries()
+    vectorizer = LOAVectorizer(persist_dir=tempfile.mkdtemp(prefix="loa_quant_"), vector_backend="numpy")
+    query_vectors = vectorizer.get_embeddings([item["query"] for item in queries])
+
+    full_dimension = data["embeddings"].shape[1]
+    variants = [(full_dimension, "float32")] + [
+        (dimension, dtype)
+        for dimension in [int(value) for value in args.dimensions.split(",")]
+        for dtype in VECTOR_DTYPES
+        if dimension <= full_dimension and (dimension, dtype) != (full_dimension, "float32")
+    ]
+
+    truth = None
+    baseline_bytes = None
+    rows = []
+    for dimension, dtype in variants:
+        store = NumpyVectorStore(tempfile.mkdtemp(prefix=f"loa_{dtype}_{dimension}_"),
+                                 dimension=dimension, dtype=dtype)
+        store.add(data["ids"], data["embeddings"], data["documents"], data["metadatas"])
+        response = store.query(query_embeddings=query_vectors, n_results=args.k)
+        if truth is None:
+            truth, baseline_bytes = response["ids"], store.memory_bytes()
+
+        hits = [
+            quality([{"metadata": meta} for meta in metadatas], item["relevant_pages"])["hit"]
+            for metadatas, item in zip(response["metadatas"], queries)
+        ]
+        rows.append({
+            "dtype": dtype,
+            "dimension": dimension,
+            "vectors": len(data["ids"]),
+            "bytes": store.memory_bytes(),
+            "memory_saved": round(1 - store.memory_bytes() / baseline_bytes, 4),
+            f"recall_at_{args.k}": round(recall(response["ids"], truth), 4),
+            f"page_hit_at_{args.k}": round(statistics.mean(hits), 4),
+        })
+    return rows
+
+
+def content_list_pages(path: str, max_pages: int = 0) -> Iterator[Tuple[int, str]]:
+    """Texto por página reconstruído do content_list (substituto do PDF)."""
+    from content_list import load_content_list, iter_items
+
+    page, lines = None, []
+    for item in iter_items(load_content_list(path)):
+        if item.page != page:
+            if lines:
+                yield page, "\n".join(lines)
+            if max_pages and item.page > max_pages:
+                return
+            page, lines = item.page, []
+        lines.append(item.text)
+    if lines:
+        yield page, "\n".join(lines)
+
+
+def bench_ingest(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Vazão e pico de memória do pipeline de indexação em streaming."""
+    from loa_vectorizer import LOAVectorizer
+
+    use_pdf = os.path.exists(args.pdf)
+    if not use_pdf:
+        print(f"PDF não encontrado em {args.pdf}; usando o content_list")
+
+    rows = []
+    for limit in [int(value) for value in args.page_limits.split(",")]:
+        with tempfile.TemporaryDirectory() as persist_dir:
+            vectorizer = LOAVectorizer(persist_dir=persist_dir, vector_backend="numpy")
+            if use_pdf:
+                pages = vectorizer.iter_pdf_pages(args.pdf, max_pages=limit or None)
+            else:
+                pages = content_list_pages(CONTENT_LIST_PATH, max_pages=limit)
+            result = vectorizer.index_pages(pages, queue_size=args.queue_size)
+            stats = result.get("pipeline", {})
+            rows.append({
+                "source": "pdf" if use_pdf else "content_list",
+                "page_limit": limit or "all",
+                "chunks": result.get("total_chunks", 0),
+                **stats,
+                "peak_rss_delta_mb": round(stats.get("peak_rss_mb", 0) - stats.get("baseline_rss_mb", 0), 1),
+            })
+            vectorizer.document_store.close()
+    return rows
+
+
+def bench_serialization(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """
+    CPU por resposta e bytes trafegados: SearchResponse + jsonable_encoder +
+    json (caminho antigo) vs dict direto no json_dumps, com e sem texto.
+    """
+    from fastapi.encoders import jsonable_encoder
+    from loa_vectorizer import create_vectorizer
+    from main import SearchResponse, search_payload
+    from serialization import json_dumps, compress, ENCODINGS, JSON_BACKEND
+
+    def legacy(payload):
+        model = SearchResponse(**payload)
+        return json.dumps(
+            jsonable_encoder(model), ensure_ascii=False, allow_nan=False,
+            indent=None, separators=(",", ":")
+        ).encode("utf-8")
+
+    vectorizer = create_vectorizer(persist_dir=args.persist_dir)
+    vectorizer.refresh_indexes()
+    queries = [item["query"] for item in load_queries()]
+
+    rows = []
+    for include_text in (False, True):
+        payloads = [
+            search_payload(q, vectorizer.search(q, n_results=args.k, include_text=include_text, use_router=False))
+            for q in queries
+        ]
+        cpu = {}
+        for name, encode in (("pydantic+json", legacy), (f"dict+{JSON_BACKEND}", json_dumps)):
+            started = time.process_time()
+            for _ in range(args.runs):
+                for payload in payloads:
+                    encode(payload)
+            cpu[name] = (time.process_time() - started) * 1000 / (args.runs * len(payloads))
+
+        bodies = [json_dumps(payload) for payload in payloads]
+        raw = statistics.mean(len(body) for body in bodies)
+        row = {
+            "include_text": include_text,
+            "queries": len(payloads),
+            **{f"cpu_ms_{name}": round(value, 4) for name, value in cpu.items()},
+            "cpu_ms_saved": round(cpu["pydantic+json"] - cpu[f"dict+{JSON_BACKEND}"], 4),
+            "bytes_raw": round(raw),
+        }
+        for encoding in ENCODINGS:
+            started = time.process_time()
+            sizes = [len(compress(body, encoding)) for body in bodies]
+            row[f"bytes_{encoding}"] = round(statistics.mean(sizes))
+            row[f"ratio_{encoding}"] = round(statistics.mean(sizes) / raw, 3) if raw else 0.0
+            row[f"cpu_ms_{encoding}"] = round((time.process_time() - started) * 1000 / len(bodies), 4)
+        rows.append(row)
+    return rows
+
+
+def deep_size(value: Any, seen: Optional[set] = None) -> int:
+    """Bytes de um objeto e de tudo que ele referencia (dicts, listas, strings)."""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(deep_size(item, seen) for item in value)
+    return size
+
+
+def bench_corpus(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Memória por chunk: lista de dicts (id, text, metadata) vs corpus colunar."""
+    from corpus import Corpus
+    from ingestion import IngestPipeline
+    from loa_vectorizer import LOAVectorizer
+    from content_list import load_content_list, iter_items
+    from table_rows import iter_row_units
+
+    rows = []
+    for limit in [int(value) for value in args.page_limits.split(",")]:
+        with tempfile.TemporaryDirectory() as persist_dir:
+            vectorizer = LOAVectorizer(persist_dir=persist_dir, vector_backend="numpy")
+            pages = content_list_pages(CONTENT_LIST_PATH, max_pages=limit)
+            chunks = [chunk.to_dict() for chunk in IngestPipeline(vectorizer, dedup=False).iter_chunks(pages)]
+            chunks.extend(
+                vectorizer._create_row_chunk(unit).to_dict()
+                for unit in iter_row_units(iter_items(load_content_list(CONTENT_LIST_PATH)))
+                if not limit or unit["page"] <= limit
+            )
+            vectorizer.document_store.close()
+
+        started = time.perf_counter()
+        corpus = Corpus.build(chunks)
+        build_s = time.perf_counter() - started
+        before = deep_size(chunks)
+        after = corpus.memory_bytes()
+        rows.append({
+            "page_limit": limit or "all",
+            "chunks": len(chunks),
+            "bytes_before": before,
+            "bytes_after": after,
+            "bytes_per_chunk_before": round(before / len(chunks), 1) if chunks else 0.0,
+            "bytes_per_chunk_after": round(after / len(chunks), 1) if chunks else 0.0,
+            "ratio": round(after / before, 3) if before else 0.0,
+            "text_bytes": corpus.stats()["text_bytes"],
+            "build_s": round(build_s, 3),
+        })
+    return rows
+
+
+BENCHMARKS = {
+    "corpus": bench_corpus,
+    "ingest": bench_ingest,
+    "quantization": bench_quantization,
+    "rerank": bench_rerank,
+    "serialization": bench_serialization,
+    "vector-store": bench_vector_store,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks da busca LOA 2026")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--k", type=int, default=5, help="Resultados por query")
+    parser.add_argument("--runs", type=int, default=3, help="Repetições para latência")
+    parser.add_argument("--factor", type=int, default=4, help="Fator de over-fetch do reranking")
+    parser.add_argument("--sample", type=int, default=200, help="Queries amostradas da coleção")
+    parser.add_argument("--persist-dir", default=CHROMA_PERSIST_DIR)
+    parser.add_argument("--dimensions", default="768,512,256,128",
+                        help="Dimensões truncadas separadas por vírgula (quantization)")
+    parser.add_argument("--pdf", default=PDF_PATH, help="PDF da LOA (ingest)")
+    parser.add_argument("--page-limits", default="0",
+                        help="Limites de páginas separados por vírgula, 0 = documento todo (ingest, corpus)")
+    parser.add_argument("--queue-size", type=int, default=4, help="Lotes em espera entre estágios (ingest)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Benchmark: {args.benchmark}")
+    print("=" * 60)
+    for row in BENCHMARKS[args.benchmark](args):
+        print(json.dumps(row, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
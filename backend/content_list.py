@@ -0,0 +1,176 @@
+"""
+Leitura do content_list da LOA 2026 (extração estruturada do PDF).
+
+O arquivo `*_content_list.json` traz os blocos do documento na ordem de
+leitura: textos (com `text_level` para títulos) e tabelas, cujo corpo vem
+como HTML (`<table><tr><td>`). Este módulo converte esses blocos em
+estruturas tipadas: itens de texto e linhas de tabela com página, legenda,
+cabeçalhos e células.
+"""
+
+import json
+import re
+import hashlib
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import List, Dict, Any, Iterator, Optional, Union
+
+
+class _TableParser(HTMLParser):
+    """Converte o HTML de uma tabela em lista de linhas de células."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows: List[List[str]] = []
+        self._row: List[str] = []
+        self._cell: List[str] = []
+        self._colspan = 1
+        self._in_cell = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._row = []
+        elif tag in ("td", "th"):
+            self._in_cell = True
+            self._cell = []
+            try:
+                self._colspan = max(1, int(dict(attrs).get("colspan") or 1))
+            except ValueError:
+                self._colspan = 1
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th") and self._in_cell:
+            text = re.sub(r"\s+", " ", "".join(self._cell)).strip()
+            # Células mescladas ocupam várias colunas: repete vazias para manter o alinhamento
+            self._row.extend([text] + [""] * (self._colspan - 1))
+            self._in_cell = False
+        elif tag == "tr":
+            if self._row:
+                self.rows.append(self._row)
+            self._row = []
+
+    def handle_data(self, data):
+        if self._in_cell:
+            self._cell.append(data)
+
+
+def parse_table(html: str) -> List[List[str]]:
+    """
+    Converte o `table_body` HTML em linhas de células de texto.
+
+    Args:
+        html: HTML da tabela
+
+    Returns:
+        Lista de linhas, cada uma uma lista de células
+    """
+    parser = _TableParser()
+    parser.feed(html or "")
+    parser.close()
+    return parser.rows
+
+
+@dataclass
+class TextItem:
+    """Bloco de texto do documento (título quando `level` não é None)."""
+    page: int
+    text: str
+    level: Any = None
+
+
+@dataclass
+class TableRow:
+    """Linha de uma tabela, com o contexto da tabela de origem."""
+    page: int
+    table_id: str
+    row_index: int
+    caption: str
+    headers: List[str] = field(default_factory=list)
+    cells: List[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        """Células não vazias unidas por espaço."""
+        return " ".join(cell for cell in self.cells if cell)
+
+
+ContentItem = Union[TextItem, TableRow]
+
+
+def load_content_list(path: str) -> List[Dict[str, Any]]:
+    """Carrega os blocos brutos do content_list."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_items(items: List[Dict[str, Any]]) -> Iterator[ContentItem]:
+    """
+    Percorre o content_list na ordem do documento.
+
+    Textos viram TextItem; cada tabela vira uma sequência de TableRow (a
+    primeira linha da tabela é usada como cabeçalho e não é emitida).
+    Imagens e tabelas sem corpo são ignoradas.
+
+    Args:
+        items: Blocos brutos de load_content_list()
+    """
+    table_count: Dict[int, int] = {}
+    for item in items:
+        page = int(item.get("page_idx", 0)) + 1
+        item_type = item.get("type")
+
+        if item_type == "text":
+            text = (item.get("text") or "").strip()
+            if text:
+                yield TextItem(page=page, text=text, level=item.get("text_level"))
+
+        elif item_type == "table" and item.get("table_body"):
+            rows = parse_table(item["table_body"])
+            if not rows:
+                continue
+            table_index = table_count.get(page, 0)
+            table_count[page] = table_index + 1
+            caption = " ".join(c.strip() for c in item.get("table_caption") or [] if c.strip())
+            headers = rows[0]
+            for row_index, cells in enumerate(rows[1:], start=1):
+                yield TableRow(
+                    page=page,
+                    table_id=f"p{page}_t{table_index}",
+                    row_index=row_index,
+                    caption=caption,
+                    headers=headers,
+                    cells=cells
+                )
+
+
+def parse_brl(value: str) -> float:
+    """Converte um valor no formato da LOA ("1.234.567" ou "1.234,56") em float."""
+    value = value.strip()
+    if "," in value:
+        whole, _, cents = value.rpartition(",")
+        return float(whole.replace(".", "") + "." + cents)
+    return float(value.replace(".", ""))
+
+
+class ContentListSource:
+    """
+    Um content_list lido uma única vez: sha256 do conteúdo e itens tipados
+    (parseados só na primeira leitura de `items`).
+
+    Permite que vários consumidores (agregados, autocompletar, tabelas)
+    comparem o fingerprint e compartilhem os itens sem reler o arquivo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._data = f.read()
+        self.fingerprint = hashlib.sha256(self._data).hexdigest()
+        self._items: Optional[List[ContentItem]] = None
+
+    @property
+    def items(self) -> List[ContentItem]:
+        if self._items is None:
+            self._items = list(iter_items(json.loads(self._data)))
+            self._data = b""
+        return self._items
@@ -0,0 +1,212 @@
+"""
+Representação colunar dos chunks em memória.
+
+Em vez de um dict de metadados (e uma string de texto) por chunk, o corpus
+guarda:
+
+- `page`, `chunk_index` e `total_value` em arrays tipados (`array`);
+- os demais campos de metadados codificados por dicionário: um array de
+  códigos por campo e o vocabulário com cada valor distinto uma única vez
+  (seção, tipo, programa e regional se repetem em milhares de chunks);
+- todos os textos em um único buffer UTF-8 com os offsets de cada chunk;
+- os IDs internados, com a posição de cada um.
+
+A posição de um chunk no corpus é o identificador compartilhado pelos
+índices em memória (metadados, adjacência, glossário), que guardam só
+arrays de posições. Dicts de metadados e textos são montados sob demanda.
+"""
+
+import sys
+import math
+from array import array
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence
+
+# Campos numéricos em arrays tipados (valor ausente = sentinela)
+INT_FIELDS = ("page", "chunk_index")
+FLOAT_FIELDS = ("total_value",)
+MISSING_INT = -(2 ** 31)
+
+
+class _View(Sequence):
+    """Sequência somente leitura calculada a partir do corpus (textos ou metadados)."""
+
+    def __init__(self, corpus: "Corpus", getter):
+        self._corpus = corpus
+        self._getter = getter
+
+    def __len__(self) -> int:
+        return len(self._corpus)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._getter(i) for i in range(*position.indices(len(self)))]
+        return self._getter(int(position))
+
+
+class Corpus:
+    """Chunks (id, texto, metadados) em colunas."""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.position: Dict[str, int] = {}
+        self.numbers: Dict[str, array] = {field: array("i") for field in INT_FIELDS}
+        self.numbers.update({field: array("d") for field in FLOAT_FIELDS})
+        # campo -> códigos por chunk (0 = ausente) e vocabulário (índice 0 reservado)
+        self.codes: Dict[str, array] = {}
+        self.vocabulary: Dict[str, List[Any]] = {}
+        self._lookup: Dict[str, Dict[Any, int]] = {}
+        self._text = bytearray()
+        self._offsets = array("q", [0])
+        self.texts = _View(self, self.text)
+        self.metadatas = _View(self, self.metadata)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self.position
+
+    @classmethod
+    def build(cls, chunks: Iterable[Dict[str, Any]]) -> "Corpus":
+        """Corpus a partir de dicts com id, text e metadata (na ordem dada)."""
+        corpus = cls()
+        for chunk in chunks:
+            corpus.append(chunk["id"], chunk["text"], chunk["metadata"])
+        return corpus
+
+    def append(self, chunk_id: str, text: str, metadata: Dict[str, Any]) -> int:
+        """
+        Acrescenta um chunk e retorna sua posição.
+
+        Um ID repetido recebe uma nova posição (a mais recente prevalece em
+        `position`), como no store append-only.
+        """
+        row = len(self.ids)
+        chunk_id = sys.intern(chunk_id)
+        self.ids.append(chunk_id)
+        self.position[chunk_id] = row
+
+        encoded = text.encode("utf-8")
+        self._text += encoded
+        self._offsets.append(self._offsets[-1] + len(encoded))
+
+        pending = dict(metadata)
+        for field in INT_FIELDS:
+            value = pending.get(field)
+            if type(value) is int and MISSING_INT < value < 2 ** 31:
+                del pending[field]
+                self.numbers[field].append(value)
+            else:
+                self.numbers[field].append(MISSING_INT)
+        for field in FLOAT_FIELDS:
+            value = pending.get(field)
+            if type(value) is float and not math.isnan(value):
+                del pending[field]
+                self.numbers[field].append(value)
+            else:
+                self.numbers[field].append(math.nan)
+
+        for field, value in pending.items():
+            if field not in self.codes:
+                self.codes[field] = array("I", [0]) * row
+                self.vocabulary[field] = [None]
+                self._lookup[field] = {}
+            lookup = self._lookup[field]
+            # Strings são a chave direta; outros tipos levam o tipo (True != 1)
+            if type(value) is str:
+                key = value = sys.intern(value)
+            else:
+                try:
+                    key = (type(value), value)
+                    hash(key)
+                except TypeError:
+                    key = (type(value), repr(value))
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(self.vocabulary[field])
+                self.vocabulary[field].append(value)
+            self.codes[field].append(code)
+        for field, codes in self.codes.items():
+            if len(codes) == row:
+                codes.append(0)
+        return row
+
+    def text(self, row: int) -> str:
+        return self._text[self._offsets[row]:self._offsets[row + 1]].decode("utf-8")
+
+    @staticmethod
+    def _present(numbers: array, value: Any) -> bool:
+        return value == value if numbers.typecode == "d" else value != MISSING_INT
+
+    def value(self, row: int, field: str) -> Any:
+        """Valor de um campo de metadados (None se ausente)."""
+        numbers = self.numbers.get(field)
+        if numbers is not None:
+            value = numbers[row]
+            if self._present(numbers, value):
+                return value
+        codes = self.codes.get(field)
+        return self.vocabulary[field][codes[row]] if codes is not None else None
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        """Dict de metadados do chunk (montado a cada chamada)."""
+        metadata = {}
+        for field, numbers in self.numbers.items():
+            value = numbers[row]
+            if self._present(numbers, value):
+                metadata[field] = value
+        for field, codes in self.codes.items():
+            code = codes[row]
+            if code:
+                metadata[field] = self.vocabulary[field][code]
+        return metadata
+
+    def column(self, field: str) -> List[Any]:
+        """Valores de um campo para todos os chunks (None onde ausente)."""
+        values: List[Any] = [None] * len(self.ids)
+        numbers = self.numbers.get(field)
+        if numbers is not None:
+            for row, value in enumerate(numbers):
+                if self._present(numbers, value):
+                    values[row] = value
+        codes = self.codes.get(field)
+        if codes is not None:
+            vocabulary = self.vocabulary[field]
+            for row, code in enumerate(codes):
+                if code:
+                    values[row] = vocabulary[code]
+        return values
+
+    def chunk(self, row: int) -> Dict[str, Any]:
+        return {"id": self.ids[row], "text": self.text(row), "metadata": self.metadata(row)}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(len(self.ids)):
+            yield self.chunk(row)
+
+    def get(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        row = self.position.get(chunk_id)
+        return self.chunk(row) if row is not None else None
+
+    def memory_bytes(self) -> int:
+        """Bytes ocupados pelo corpus (IDs, posições, colunas, vocabulários e textos)."""
+        total = sys.getsizeof(self.ids) + sys.getsizeof(self.position)
+        total += sum(sys.getsizeof(chunk_id) for chunk_id in self.ids)
+        total += sys.getsizeof(self._text) + sys.getsizeof(self._offsets)
+        for numbers in self.numbers.values():
+            total += sys.getsizeof(numbers)
+        for field, codes in self.codes.items():
+            total += sys.getsizeof(codes) + sys.getsizeof(self.vocabulary[field])
+            total += sys.getsizeof(self._lookup[field])
+            total += sum(sys.getsizeof(value) for value in self.vocabulary[field][1:])
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        size = self.memory_bytes()
+        return {
+            "chunks": len(self.ids),
+            "bytes": size,
+            "bytes_per_chunk": round(size / len(self.ids), 1) if self.ids else 0.0,
+            "text_bytes": len(self._text),
+            "fields": len(self.numbers) + len(self.codes),
+        }
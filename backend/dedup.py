@@ -0,0 +1,297 @@
+"""
+Detecção de conteúdo repetido na LOA 2026 durante a indexação.
+
+A LOA repete cabeçalhos, rodapés e legendas de tabela ("R$ 1,00 RECURSOS
+DE TODAS AS FONTES", a lista de secretarias...) em centenas de páginas.
+Este módulo:
+
+- remove linhas de "mobília" (no início ou no fim da página) que se repetem
+  em muitas páginas;
+- agrupa chunks quase idênticos via SimHash, mantendo um chunk canônico
+  que lista todas as páginas de origem.
+"""
+
+import re
+import hashlib
+from typing import List, Dict, Any, Tuple, Optional, Iterable, Set
+
+from lexical_index import fold
+
+
+# Número de página isolado: "12", "- 12 -", "12/480", "página 12", "pág. 12 de 480"
+PAGE_NUMBER_PATTERN = re.compile(r"^(?:pag(?:ina)?\.?\s*)?[-–]?\s*(\d+)\s*[-–]?(?:\s*(?:/|de)\s*\d+)?$")
+PAGE_NUMBER_IN_LINE = re.compile(r"\bpag(?:ina)?\.?\s*(\d+)(?:\s*(?:/|de)\s*\d+)?\b")
+HAS_LETTER = re.compile(r"[a-z]")
+
+# Linhas do início e do fim de cada página candidatas a cabeçalho/rodapé
+EDGE_LINES = 5
+
+
+def _normalize_line(line: str, page_num: Optional[int] = None) -> str:
+    """
+    Normaliza uma linha para comparação entre páginas.
+
+    Só o número da própria página é mascarado (linha que é apenas ele, ou
+    "página N" com N = `page_num`); qualquer outro número é comparado
+    exatamente, para que linhas de dados (código de programa, ano, valores)
+    nunca pareçam repetidas.
+    """
+    line = re.sub(r"\s+", " ", fold(line)).strip()
+    if page_num is None:
+        return line
+    match = PAGE_NUMBER_PATTERN.match(line)
+    if match:
+        return "#" if int(match.group(1)) == page_num else line
+    return PAGE_NUMBER_IN_LINE.sub(
+        lambda m: "pagina #" if int(m.group(1)) == page_num else m.group(0), line
+    )
+
+
+def _is_furniture_candidate(line: str) -> bool:
+    """Número de página mascarado ou linha com texto; linhas só numéricas são dados."""
+    return line == "#" or bool(HAS_LETTER.search(line))
+
+
+def _edge_lines(text: str, edge: int) -> Tuple[List[str], Set[int]]:
+    """Linhas da página e os índices das `edge` primeiras e últimas não vazias."""
+    lines = text.splitlines()
+    filled = [index for index, line in enumerate(lines) if line.strip()]
+    return lines, set(filled[:edge] + filled[-edge:])
+
+
+def line_digest(line: str) -> bytes:
+    """Digest de tamanho fixo (8 bytes) de uma linha normalizada."""
+    return hashlib.blake2b(line.encode("utf-8"), digest_size=8).digest()
+
+
+def count_page_lines(pages: Iterable[Tuple[int, str]], edge: int = EDGE_LINES) -> Tuple[Dict[bytes, int], int]:
+    """
+    Conta em quantas páginas cada linha normalizada aparece.
+
+    Só as `edge` primeiras e últimas linhas de cada página (onde ficam
+    cabeçalhos e rodapés) são contadas, e por um digest de 8 bytes: a
+    memória não cresce com o tamanho do texto do documento.
+
+    Args:
+        pages: Pares (número da página, texto)
+        edge: Linhas consideradas no início e no fim de cada página
+
+    Returns:
+        Tupla (contagem por digest de linha, número de páginas)
+    """
+    page_count: Dict[bytes, int] = {}
+    total = 0
+    for page_num, text in pages:
+        total += 1
+        lines, edges = _edge_lines(text, edge)
+        seen = set()
+        for index in edges:
+            line = _normalize_line(lines[index], page_num)
+            if line and _is_furniture_candidate(line):
+                seen.add(line_digest(line))
+        for digest in seen:
+            page_count[digest] = page_count.get(digest, 0) + 1
+    return page_count, total
+
+
+def furniture_lines(
+    page_count: Dict[bytes, int],
+    total_pages: int,
+    min_ratio: float = 0.3,
+    min_pages: int = 5
+) -> Set[bytes]:
+    """Digests das linhas que se repetem em pelo menos max(min_pages, min_ratio × páginas)."""
+    threshold = max(min_pages, int(total_pages * min_ratio))
+    return {digest for digest, count in page_count.items() if count >= threshold}
+
+
+def strip_lines(
+    text: str,
+    furniture: Set[bytes],
+    page_num: Optional[int] = None,
+    edge: int = EDGE_LINES,
+    removed: Optional[Set[str]] = None
+) -> str:
+    """
+    Remove das bordas de uma página as linhas de mobília.
+
+    Args:
+        removed: Se dado, recebe as linhas normalizadas removidas
+    """
+    if not furniture:
+        return text
+    lines, edges = _edge_lines(text, edge)
+    kept = []
+    for index, line in enumerate(lines):
+        if index in edges:
+            normalized = _normalize_line(line, page_num)
+            if line_digest(normalized) in furniture:
+                if removed is not None:
+                    removed.add(normalized)
+                continue
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def strip_page_furniture(
+    pages: Dict[int, str],
+    min_ratio: float = 0.3,
+    min_pages: int = 5
+) -> Tuple[Dict[int, str], List[str]]:
+    """
+    Remove linhas que se repetem em grande parte das páginas.
+
+    Args:
+        pages: Texto de cada página, indexado pelo número da página
+        min_ratio: Fração mínima de páginas em que a linha aparece
+        min_pages: Número mínimo absoluto de páginas
+
+    Returns:
+        Tupla (páginas limpas, linhas normalizadas removidas)
+    """
+    page_count, total = count_page_lines(pages.items())
+    furniture = furniture_lines(page_count, total, min_ratio, min_pages)
+    if not furniture:
+        return pages, []
+
+    removed: Set[str] = set()
+    cleaned = {page_num: strip_lines(text, furniture, page_num, removed=removed) for page_num, text in pages.items()}
+    return cleaned, sorted(removed)
+
+
+class SimHashDeduplicator:
+    """
+    Agrupa chunks quase duplicados com SimHash de 64 bits.
+
+    Candidatos são encontrados por bandas (4 × 16 bits): pelo princípio da
+    casa dos pombos, dois hashes com distância de Hamming <= 3 coincidem em
+    pelo menos uma banda.
+    """
+
+    BITS = 64
+    BANDS = 4
+    MAX_DISTANCE = 3
+    SHINGLE_SIZE = 3
+
+    def __init__(self, max_distance: Optional[int] = None):
+        self.max_distance = self.MAX_DISTANCE if max_distance is None else max_distance
+
+    def simhash(self, text: str) -> int:
+        """Calcula o SimHash do texto sobre shingles de palavras."""
+        words = re.findall(r"\w+", fold(text))
+        if len(words) < self.SHINGLE_SIZE:
+            shingles = [" ".join(words)]
+        else:
+            shingles = [
+                " ".join(words[i:i + self.SHINGLE_SIZE])
+                for i in range(len(words) - self.SHINGLE_SIZE + 1)
+            ]
+
+        weights = [0] * self.BITS
+        for shingle in shingles:
+            value = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+            for bit in range(self.BITS):
+                weights[bit] += 1 if value >> bit & 1 else -1
+
+        return sum(1 << bit for bit in range(self.BITS) if weights[bit] > 0)
+
+    def _bands(self, value: int) -> List[Tuple[int, int]]:
+        width = self.BITS // self.BANDS
+        mask = (1 << width) - 1
+        return [(band, value >> (band * width) & mask) for band in range(self.BANDS)]
+
+    def new_index(self) -> "SimHashIndex":
+        """Cria um índice incremental (para deduplicar chunks em streaming)."""
+        return SimHashIndex(self)
+
+    def collapse(self, chunks: List[Any], embedding_dimension: int = 768) -> Tuple[List[Any], Dict[str, Any]]:
+        """
+        Agrupa chunks quase duplicados em um chunk canônico.
+
+        O canônico é a primeira ocorrência; seus metadados recebem
+        `source_pages` (páginas de todas as cópias, separadas por vírgula,
+        pois o ChromaDB não aceita listas) e `duplicate_count`.
+
+        Args:
+            chunks: LOAChunks na ordem do documento
+            embedding_dimension: Dimensão dos embeddings (para estimar economia)
+
+        Returns:
+            Tupla (chunks canônicos, relatório de economia)
+        """
+        index = self.new_index()
+        canonical_of = [index.find_or_add(chunk.text, i) for i, chunk in enumerate(chunks)]
+
+        members: Dict[int, List[int]] = {}
+        for i, canonical in enumerate(canonical_of):
+            members.setdefault(i if canonical is None else canonical, []).append(i)
+
+        result = []
+        text_bytes_saved = 0
+        for i, chunk in enumerate(chunks):
+            if canonical_of[i] is not None:
+                text_bytes_saved += len(chunk.text.encode("utf-8"))
+                continue
+            group = members[i]
+            if len(group) > 1:
+                pages = sorted({chunks[j].metadata.get("page") for j in group})
+                chunk.metadata["source_pages"] = ",".join(str(page) for page in pages)
+                chunk.metadata["duplicate_count"] = len(group)
+            result.append(chunk)
+
+        return result, self.report(
+            chunks_before=len(chunks),
+            chunks_after=len(result),
+            duplicate_groups=sum(1 for group in members.values() if len(group) > 1),
+            text_bytes_saved=text_bytes_saved,
+            embedding_dimension=embedding_dimension
+        )
+
+    @staticmethod
+    def report(
+        chunks_before: int,
+        chunks_after: int,
+        duplicate_groups: int,
+        text_bytes_saved: int,
+        embedding_dimension: int = 768
+    ) -> Dict[str, Any]:
+        """Relatório de economia da deduplicação."""
+        saved = chunks_before - chunks_after
+        embedding_bytes_saved = saved * embedding_dimension * 4
+        return {
+            "chunks_before": chunks_before,
+            "chunks_after": chunks_after,
+            "duplicate_groups": duplicate_groups,
+            "embeddings_saved": saved,
+            "embedding_bytes_saved": embedding_bytes_saved,
+            "text_bytes_saved": text_bytes_saved,
+            "index_bytes_saved": embedding_bytes_saved + text_bytes_saved,
+        }
+
+
+class SimHashIndex:
+    """
+    Índice incremental de SimHashes.
+
+    Guarda só os hashes (inteiros) e as chaves dos canônicos, então pode
+    acompanhar um stream de chunks com memória pequena.
+    """
+
+    def __init__(self, deduplicator: SimHashDeduplicator):
+        self.deduplicator = deduplicator
+        self.buckets: Dict[Tuple[int, int], List[Tuple[int, Any]]] = {}
+
+    def find_or_add(self, text: str, key: Any) -> Optional[Any]:
+        """
+        Retorna a chave do canônico de que o texto é quase-duplicata, ou None
+        (e registra o texto como novo canônico com a chave `key`).
+        """
+        value = self.deduplicator.simhash(text)
+        bands = self.deduplicator._bands(value)
+        for band in bands:
+            for other, other_key in self.buckets.get(band, ()):
+                if bin(value ^ other).count("1") <= self.deduplicator.max_distance:
+                    return other_key
+        for band in bands:
+            self.buckets.setdefault(band, []).append((value, key))
+        return None
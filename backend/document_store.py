@@ -0,0 +1,244 @@
+"""
+Armazenamento local dos chunks da LOA 2026 em SQLite.
+
+Mapeia ID do chunk e página para texto e metadados, permitindo buscas
+diretas (citações, intervalos de páginas) sem passar pelo índice HNSW
+nem pelo provedor de embeddings.
+"""
+
+import json
+import uuid
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+
+
+class DocumentStore:
+    """
+    Store de documentos com índice por página.
+
+    Usa uma única conexão SQLite (WAL + mmap) protegida por lock, pois é
+    acessada tanto pelas requisições quanto pela thread de indexação.
+    """
+
+    MMAP_SIZE = 256 * 1024 * 1024
+
+    def __init__(self, db_path: str):
+        """
+        Abre (ou cria) o store.
+
+        Args:
+            db_path: Caminho do arquivo SQLite
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA mmap_size={self.MMAP_SIZE}")
+        self._version: Optional[str] = None
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                page INTEGER NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_page ON chunks (page, chunk_index, id);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def add_chunks(self, chunks: Iterable[Dict[str, Any]]) -> int:
+        """
+        Insere ou substitui chunks no store.
+
+        Args:
+            chunks: Dicts com id, text e metadata (formato de LOAChunk.to_dict)
+
+        Returns:
+            Número de chunks gravados
+        """
+        rows = [
+            (
+                chunk["id"],
+                int(chunk["metadata"].get("page", 0)),
+                int(chunk["metadata"].get("chunk_index", 0)),
+                chunk["text"],
+                json.dumps(chunk["metadata"], ensure_ascii=False)
+            )
+            for chunk in chunks
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, page, chunk_index, text, metadata) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def get(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna um chunk pelo ID, ou None se não existir."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, text, metadata FROM chunks WHERE id = ?",
+                (chunk_id,)
+            ).fetchone()
+        return self._row_to_chunk(row) if row else None
+
+    def get_many(self, chunk_ids: List[str]) -> List[Dict[str, Any]]:
+        """Retorna vários chunks pelo ID, preservando a ordem pedida."""
+        if not chunk_ids:
+            return []
+        placeholders = ",".join("?" * len(chunk_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, text, metadata FROM chunks WHERE id IN ({placeholders})",
+                chunk_ids
+            ).fetchall()
+        by_id = {row[0]: self._row_to_chunk(row) for row in rows}
+        return [by_id[chunk_id] for chunk_id in chunk_ids if chunk_id in by_id]
+
+    def get_pages(self, start_page: int, end_page: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Retorna todos os chunks de um intervalo de páginas (inclusivo).
+
+        Args:
+            start_page: Primeira página
+            end_page: Última página (padrão: igual à primeira)
+
+        Returns:
+            Chunks ordenados por página e chunk_index
+        """
+        end_page = start_page if end_page is None else end_page
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, text, metadata FROM chunks "
+                "WHERE page BETWEEN ? AND ? ORDER BY page, chunk_index, id",
+                (start_page, end_page)
+            ).fetchall()
+        return [self._row_to_chunk(row) for row in rows]
+
+    def iter_chunks(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Itera sobre todos os chunks na ordem do documento."""
+        last_key = (-1, -1, "")
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, text, metadata, page, chunk_index FROM chunks "
+                    "WHERE (page, chunk_index, id) > (?, ?, ?) "
+                    "ORDER BY page, chunk_index, id LIMIT ?",
+                    (*last_key, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._row_to_chunk(row)
+            last_key = (rows[-1][3], rows[-1][4], rows[-1][0])
+
+    def backup(self, path: str) -> None:
+        """
+        Copia o banco para `path` com a API de backup do SQLite.
+
+        A cópia é consistente mesmo com o store em uso (é feita sob o lock).
+        """
+        target = sqlite3.connect(path)
+        try:
+            with self._lock:
+                self._conn.backup(target)
+        finally:
+            target.close()
+
+    def restore(self, path: str) -> Optional[str]:
+        """
+        Substitui o conteúdo do store pelo de um arquivo gerado por backup().
+
+        A versão do índice em uso é mantida: os vetores e índices em memória
+        ainda não correspondem ao backup, e quem restaura publica a versão
+        dele com `set_index_version` depois de carregá-los.
+
+        Returns:
+            Versão do índice gravada no backup (None em backups sem ela)
+        """
+        current = self.index_version()
+        source = sqlite3.connect(path)
+        try:
+            with self._lock:
+                source.backup(self._conn)
+                # Backups antigos podem não ter a tabela meta
+                self._create_schema()
+                row = self._conn.execute("SELECT value FROM meta WHERE key = 'index_version'").fetchone()
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('index_version', ?)", (current,))
+                self._conn.commit()
+                self._version = current
+        finally:
+            source.close()
+        return row[0] if row else None
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """Valor de uma chave da tabela meta, ou None."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def index_version(self) -> str:
+        """
+        Versão do conteúdo indexado (usada nos ETags da API).
+
+        Fica na tabela meta, então sobrevive a reinícios e viaja nos
+        snapshots; é criada na primeira leitura e mantida em memória.
+        """
+        if self._version is None:
+            version = self.get_meta("index_version")
+            if version is None:
+                return self.bump_index_version()
+            self._version = version
+        return self._version
+
+    def bump_index_version(self) -> str:
+        """Gera uma nova versão (chamar após cada indexação concluída)."""
+        return self.set_index_version(uuid.uuid4().hex[:16])
+
+    def set_index_version(self, version: str) -> str:
+        """Publica uma versão específica (ex: a de um snapshot restaurado)."""
+        self.set_meta("index_version", version)
+        self._version = version
+        return version
+
+    def count(self) -> int:
+        """Retorna o número de chunks armazenados."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove todos os chunks."""
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Fecha a conexão."""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row_to_chunk(row: tuple) -> Dict[str, Any]:
+        return {
+            "id": row[0],
+            "text": row[1],
+            "metadata": json.loads(row[2])
+        }
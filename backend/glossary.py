@@ -0,0 +1,179 @@
+"""
+Anotação de termos do glossário nos resultados de busca.
+
+Os termos vêm de `data/glossary.ts` (o mesmo glossário do frontend) e são
+carregados uma vez em um autômato Aho-Corasick. Cada texto é percorrido uma
+única vez, qualquer que seja o número de termos, e o resultado são os
+offsets de cada ocorrência; o frontend só renderiza esses spans em vez de
+procurar os termos em cada resultado.
+
+A comparação ignora acentos e caixa e só aceita ocorrências em limite de
+palavra ("ISS" não casa dentro de "comissão").
+"""
+
+import os
+import re
+import unicodedata
+from array import array
+from collections import deque
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+GLOSSARY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    "glossary.ts"
+)
+
+CONCEPT_PATTERN = re.compile(
+    r"id:\s*'(?P<id>[^']+)',\s*term:\s*'(?P<term>[^']+)'(?P<body>.*?)categoria:\s*'(?P<categoria>[^']+)'",
+    re.DOTALL
+)
+
+
+@lru_cache(maxsize=4096)
+def _fold_char(char: str) -> str:
+    """Um caractere minúsculo e sem acento (sempre um caractere, para manter offsets)."""
+    decomposed = unicodedata.normalize("NFD", char.lower())
+    base = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return base[0] if len(base) == 1 else char
+
+
+def fold_same_length(text: str) -> str:
+    return "".join(_fold_char(c) for c in text)
+
+
+def load_glossary_terms(path: str = GLOSSARY_PATH) -> List[Dict[str, Any]]:
+    """
+    Lê os conceitos de glossary.ts.
+
+    Termos no formato "SIGLA - Nome" também casam pela sigla e pelo nome.
+
+    Returns:
+        Dicts com id, term, categoria e patterns
+    """
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+
+    terms = []
+    for match in CONCEPT_PATTERN.finditer(source):
+        term = match.group("term")
+        patterns = [term]
+        if " - " in term:
+            patterns.extend(part.strip() for part in term.split(" - ", 1))
+        terms.append({
+            "id": match.group("id"),
+            "term": term,
+            "categoria": match.group("categoria"),
+            "patterns": patterns,
+        })
+    return terms
+
+
+class GlossaryAnnotator:
+    """Autômato Aho-Corasick sobre os termos do glossário."""
+
+    def __init__(self, terms: Iterable[Dict[str, Any]] = ()):
+        self.terms: List[Dict[str, Any]] = []
+        # Nó -> transições; falha; saídas (índice do termo, comprimento do padrão)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, int]]] = [[]]
+        self.build(terms)
+
+    @classmethod
+    def from_file(cls, path: str = GLOSSARY_PATH) -> "GlossaryAnnotator":
+        return cls(load_glossary_terms(path))
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def build(self, terms: Iterable[Dict[str, Any]]) -> "GlossaryAnnotator":
+        self.terms = list(terms)
+        self._goto, self._fail, self._output = [{}], [0], [[]]
+
+        for index, term in enumerate(self.terms):
+            for pattern in set(fold_same_length(p) for p in term["patterns"]):
+                node = 0
+                for char in pattern:
+                    if char not in self._goto[node]:
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._output.append([])
+                        self._goto[node][char] = len(self._goto) - 1
+                    node = self._goto[node][char]
+                self._output[node].append((index, len(pattern)))
+
+        # Links de falha em largura; cada nó herda as saídas do seu link
+        # (filhos da raiz falham para a raiz)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+        return self
+
+    def annotate(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Ocorrências dos termos no texto, sem sobreposição (a mais longa vence).
+
+        Returns:
+            Dicts com id, start e end (offsets no texto original)
+        """
+        return self.unpack(self.pack(text))
+
+    def pack(self, text: str) -> Optional[array]:
+        """
+        Como `annotate`, mas compacto: (termo, início, fim) achatados em um
+        array, ou None sem ocorrências. É a forma guardada por chunk no índice.
+        """
+        if not text or not self.terms:
+            return None
+
+        folded = fold_same_length(text)
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        node = 0
+        for position, char in enumerate(folded):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for index, length in output[node]:
+                start, end = position - length + 1, position + 1
+                if (start == 0 or not folded[start - 1].isalnum()) and \
+                        (end == len(folded) or not folded[end].isalnum()):
+                    matches.append((start, -end, index))
+
+        spans = array("I")
+        last_end = -1
+        for start, negative_end, index in sorted(matches):
+            if start < last_end:
+                continue
+            last_end = -negative_end
+            spans.extend((index, start, last_end))
+        return spans or None
+
+    def unpack(self, spans: Optional[array]) -> List[Dict[str, Any]]:
+        """Spans compactos (`pack`) como dicts com id, start e end."""
+        if not spans:
+            return []
+        return [
+            {"id": self.terms[spans[i]]["id"], "start": spans[i + 1], "end": spans[i + 2]}
+            for i in range(0, len(spans), 3)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"terms": len(self.terms), "states": len(self._goto)}
+
+
+def create_annotator(path: Optional[str] = None) -> Optional[GlossaryAnnotator]:
+    """Annotator do glossário (GLOSSARY_PATH), ou None se o arquivo não existir."""
+    path = path or os.getenv("GLOSSARY_PATH") or GLOSSARY_PATH
+    if not os.path.exists(path):
+        return None
+    return GlossaryAnnotator.from_file(path)
@@ -0,0 +1,123 @@
+"""
+Validadores HTTP (ETag) ligados à versão do índice.
+
+Toda resposta de leitura da API depende só da URL e do conteúdo indexado,
+então um ETag fraco com a versão do índice basta como validador: ele muda a
+cada (re)indexação concluída. Requisições GET com `If-None-Match` igual à
+versão atual recebem 304 sem que o endpoint (e a busca) seja executado;
+`Cache-Control: public` permite que o nginx e o navegador guardem as
+respostas entre uma indexação e outra.
+"""
+
+import os
+from typing import Callable, Optional
+
+
+def make_etag(version: str) -> str:
+    return f'W/"{version}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparação fraca de If-None-Match (lista de ETags ou "*")."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class IndexETagMiddleware:
+    """
+    Middleware ASGI que aplica ETag/Cache-Control conforme a versão do índice.
+
+    - GET/HEAD em `cacheable` recebem ETag e `Cache-Control: public`, e são
+      respondidos com 304 quando o cliente já tem a versão atual;
+    - caminhos em `private` (admin, debug, status) recebem `no-store`;
+    - todas as respostas da API levam `X-Index-Version`.
+
+    `get_version` retorna None quando não há versão estável (vetorizador
+    indisponível ou indexação em andamento); nesse caso nada é cacheado.
+    """
+
+    MAX_AGE = 60
+    STALE_WHILE_REVALIDATE = 300
+
+    def __init__(
+        self,
+        app,
+        get_version: Callable[[], Optional[str]],
+        cacheable: tuple = ("/api/",),
+        private: tuple = (),
+        max_age: Optional[int] = None
+    ):
+        self.app = app
+        self.get_version = get_version
+        self.cacheable = tuple(cacheable)
+        self.private = tuple(private)
+        self.max_age = int(os.getenv("CACHE_MAX_AGE", str(self.MAX_AGE)) if max_age is None else max_age)
+        self.cache_control = (
+            f"public, max-age={self.max_age}, stale-while-revalidate={self.STALE_WHILE_REVALIDATE}"
+        ).encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path.startswith(self.private):
+            await self.app(scope, receive, self._with_headers(send, [(b"cache-control", b"no-store")]))
+            return
+
+        try:
+            version = self.get_version()
+        except Exception:
+            version = None
+        if version is None:
+            await self.app(scope, receive, self._with_headers(send, [(b"cache-control", b"no-store")]))
+            return
+
+        version_header = (b"x-index-version", version.encode("latin-1"))
+        if scope["method"] not in ("GET", "HEAD") or not path.startswith(self.cacheable):
+            await self.app(scope, receive, self._with_headers(send, [version_header]))
+            return
+
+        etag = make_etag(version)
+        cache_headers = [
+            (b"etag", etag.encode("latin-1")),
+            (b"cache-control", self.cache_control),
+            version_header,
+        ]
+
+        for name, value in scope.get("headers", ()):
+            if name == b"if-none-match":
+                if etag_matches(value.decode("latin-1"), etag):
+                    await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+                break
+
+        await self.app(scope, receive, self._with_headers(send, cache_headers, only_ok=True))
+
+    @staticmethod
+    def _with_headers(send, extra: list, only_ok: bool = False):
+        """Envolve `send` acrescentando headers ao início da resposta."""
+        async def wrapped(message):
+            if message["type"] == "http.response.start":
+                if only_ok and message["status"] != 200:
+                    # Erros não são cacheáveis; só informam a versão
+                    headers = [(b"cache-control", b"no-store")] + [h for h in extra if h[0] == b"x-index-version"]
+                else:
+                    headers = extra
+                existing = {name for name, _ in message.get("headers", [])}
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [h for h in headers if h[0] not in existing],
+                }
+            await send(message)
+        return wrapped
@@ -0,0 +1,363 @@
+"""
+Pipeline de indexação em streaming: páginas → chunks → embeddings → store.
+
+Cada estágio roda em sua própria thread e se comunica com o seguinte por
+filas limitadas (`queue.Queue(maxsize)`): quando o Gemini ou o disco ficam
+para trás, o estágio anterior bloqueia em vez de acumular. Assim só alguns
+lotes ficam em memória ao mesmo tempo e o pico de RSS não cresce com o
+tamanho do documento. Cada lote é gravado assim que tem embeddings, então
+uma indexação interrompida mantém o que já foi processado.
+
+A remoção de cabeçalhos/rodapés precisa das contagens de linhas de todas
+as páginas; por isso a extração faz uma pré-passada que grava o texto das
+páginas em um arquivo temporário e mantém em memória só as contagens.
+"""
+
+import os
+import json
+import time
+import queue
+import tempfile
+import threading
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from dedup import count_page_lines, furniture_lines, strip_lines, SimHashDeduplicator
+
+_END = object()
+
+
+def current_rss_mb() -> float:
+    """RSS atual do processo em MB (/proc/self/statm; pico via getrusage como fallback)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss é em KB no Linux e em bytes no macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if peak > 1 << 32 else peak / 1024
+
+
+class _RSSSampler(threading.Thread):
+    """Amostra o RSS periodicamente e guarda o pico."""
+
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.baseline = current_rss_mb()
+        self.peak = self.baseline
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, current_rss_mb())
+
+
+class IngestPipeline:
+    """
+    Indexação em estágios concorrentes com backpressure.
+
+    Estágios:
+    1. extração + chunking + deduplicação (thread produtora)
+    2. embeddings em lote (`get_embeddings`)
+    3. gravação no backend vetorial e no DocumentStore (thread chamadora)
+
+    Quase-duplicatas são detectadas com um índice SimHash incremental: a
+    primeira ocorrência é gravada e as seguintes só acrescentam páginas ao
+    canônico, atualizado no fim da indexação.
+    """
+
+    BATCH_SIZE = 50
+    QUEUE_SIZE = 4
+    PUT_TIMEOUT = 0.5
+
+    def __init__(
+        self,
+        vectorizer,
+        batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        dedup: bool = True
+    ):
+        """
+        Args:
+            vectorizer: LOAVectorizer (chunking, embeddings e stores)
+            batch_size: Chunks por lote de embeddings/gravação
+            queue_size: Lotes máximos em cada fila entre estágios
+            dedup: Se True, descarta quase-duplicatas antes dos embeddings
+        """
+        self.vectorizer = vectorizer
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.queue_size = queue_size or self.QUEUE_SIZE
+        self.dedup = dedup
+        self._reset()
+
+    def _reset(self) -> None:
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self.pages = 0
+        self.furniture: List[str] = []
+        self.chunks_before = 0
+        self.text_bytes_saved = 0
+        # canônico (id, página) -> páginas das cópias descartadas
+        self.duplicates: Dict[Tuple[str, int], List[int]] = {}
+        self.busy = {"extract": 0.0, "embed": 0.0, "store": 0.0}
+
+    # ------------------------------------------------------------------
+    # Estágio 1: páginas e chunks
+    # ------------------------------------------------------------------
+
+    def iter_pages(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        """
+        Remove cabeçalhos/rodapés das páginas em streaming.
+
+        A pré-passada grava as páginas em um arquivo temporário (uma linha
+        JSON por página) enquanto conta as linhas; a segunda passada relê o
+        arquivo e limpa cada página.
+        """
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+            def spooled():
+                for page_num, text in pages:
+                    if not text or not text.strip():
+                        continue
+                    spool.write(json.dumps([page_num, text], ensure_ascii=False) + "\n")
+                    yield page_num, text
+
+            page_count, total = count_page_lines(spooled())
+            furniture = furniture_lines(page_count, total)
+            del page_count
+            self.pages = total
+
+            removed: set = set()
+            spool.seek(0)
+            for line in spool:
+                page_num, text = json.loads(line)
+                text = strip_lines(text, furniture, page_num, removed=removed)
+                if text.strip():
+                    yield page_num, text
+            self.furniture = sorted(removed)
+            if removed:
+                print(f"Linhas repetidas removidas (cabeçalhos/rodapés): {len(removed)}")
+
+    def iter_chunks(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Any]:
+        """Gera os LOAChunks do documento (sem quase-duplicatas se dedup=True)."""
+        index = self.vectorizer.deduplicator.new_index() if self.dedup else None
+        global_chunk_index = 0
+
+        for page_num, text in self.iter_pages(pages):
+            page_chunks = self.vectorizer._create_chunks_from_text(
+                text=text,
+                page_num=page_num,
+                start_index=global_chunk_index
+            )
+            global_chunk_index += len(page_chunks)
+
+            for chunk in page_chunks:
+                self.chunks_before += 1
+                if index is not None:
+                    canonical = index.find_or_add(chunk.text, (chunk.id, page_num))
+                    if canonical is not None:
+                        self.duplicates.setdefault(canonical, []).append(page_num)
+                        self.text_bytes_saved += len(chunk.text.encode("utf-8"))
+                        continue
+                yield chunk
+
+    def _produce(self, chunks: Iterable[Any], out: queue.Queue) -> None:
+        batch = []
+        started = time.perf_counter()
+        try:
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    self.busy["extract"] += time.perf_counter() - started
+                    if not self._put(out, batch):
+                        return
+                    started = time.perf_counter()
+                    batch = []
+            self.busy["extract"] += time.perf_counter() - started
+            if batch:
+                self._put(out, batch)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(out, _END, force=True)
+
+    # ------------------------------------------------------------------
+    # Estágio 2: embeddings
+    # ------------------------------------------------------------------
+
+    def _embed(self, source: queue.Queue, out: queue.Queue) -> None:
+        try:
+            while True:
+                batch = source.get()
+                if batch is _END or self._stop.is_set():
+                    break
+                started = time.perf_counter()
+                embeddings = self.vectorizer.get_embeddings([chunk.text for chunk in batch])
+                self.busy["embed"] += time.perf_counter() - started
+                if not self._put(out, (batch, embeddings)):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(out, _END, force=True)
+            self._drain(source)
+
+    # ------------------------------------------------------------------
+    # Coordenação
+    # ------------------------------------------------------------------
+
+    def _put(self, target: queue.Queue, item: Any, force: bool = False) -> bool:
+        """Coloca na fila esperando por espaço; desiste se o pipeline foi interrompido."""
+        while True:
+            try:
+                target.put(item, timeout=self.PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                if self._stop.is_set():
+                    if not force:
+                        return False
+                    # Libera espaço para o marcador de fim
+                    self._drain(target)
+
+    @staticmethod
+    def _drain(source: queue.Queue) -> None:
+        while True:
+            try:
+                source.get_nowait()
+            except queue.Empty:
+                return
+
+    def _fail(self, error: BaseException) -> None:
+        self._errors.append(error)
+        self._stop.set()
+
+    def run(self, pages: Iterable[Tuple[int, str]]) -> Dict[str, Any]:
+        """
+        Indexa as páginas (pares (número, texto)) e retorna as estatísticas.
+
+        Lotes que falham na gravação são registrados e ignorados, como na
+        indexação em lote; erros de extração ou embeddings interrompem o
+        pipeline e são relançados depois que as threads terminam.
+        """
+        self._reset()
+        return self._run(self.iter_chunks(pages))
+
+    def run_chunks(self, chunks: Iterable[Any]) -> Dict[str, Any]:
+        """
+        Indexa chunks já montados (ex: unidades de linha de tabela).
+
+        Não passa pela limpeza de páginas nem pela deduplicação: os chunks
+        são gravados como vieram.
+        """
+        self._reset()
+        return self._run(chunks)
+
+    def _run(self, chunks: Iterable[Any]) -> Dict[str, Any]:
+        chunk_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        embedded_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        sampler = _RSSSampler()
+        sampler.start()
+        started = time.perf_counter()
+
+        producer = threading.Thread(target=self._produce, args=(chunks, chunk_queue), daemon=True)
+        embedder = threading.Thread(target=self._embed, args=(chunk_queue, embedded_queue), daemon=True)
+        producer.start()
+        embedder.start()
+
+        total_inserted = 0
+        total_chunks = 0
+        batch_number = 0
+        store = self.vectorizer.store
+        try:
+            while True:
+                item = embedded_queue.get()
+                if item is _END:
+                    break
+                batch, embeddings = item
+                batch_number += 1
+                total_chunks += len(batch)
+                batch_started = time.perf_counter()
+                try:
+                    store.add(
+                        ids=[chunk.id for chunk in batch],
+                        embeddings=embeddings,
+                        documents=[chunk.text for chunk in batch],
+                        metadatas=[chunk.metadata for chunk in batch]
+                    )
+                    self.vectorizer.document_store.add_chunks(chunk.to_dict() for chunk in batch)
+                    total_inserted += len(batch)
+                    print(f"Batch {batch_number}: {len(batch)} chunks inseridos ({total_inserted} no total)")
+                except Exception as e:
+                    print(f"Erro ao inserir batch {batch_number}: {e}")
+                self.busy["store"] += time.perf_counter() - batch_started
+        except BaseException as e:
+            self._fail(e)
+            self._drain(embedded_queue)
+        finally:
+            producer.join()
+            embedder.join()
+
+        if not self._errors and self.duplicates:
+            self._update_canonicals()
+
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+
+        if self._errors:
+            raise self._errors[0]
+
+        return {
+            "total_chunks": total_chunks,
+            "total_inserted": total_inserted,
+            "dedup": self._dedup_report(total_chunks),
+            "pipeline": {
+                "pages": self.pages,
+                "batch_size": self.batch_size,
+                "queue_size": self.queue_size,
+                "elapsed_s": round(elapsed, 3),
+                "pages_per_s": round(self.pages / elapsed, 2) if elapsed else 0.0,
+                "chunks_per_s": round(total_chunks / elapsed, 2) if elapsed else 0.0,
+                "stage_busy_s": {stage: round(value, 3) for stage, value in self.busy.items()},
+                "baseline_rss_mb": round(sampler.baseline, 1),
+                "peak_rss_mb": round(sampler.peak, 1),
+            }
+        }
+
+    def _update_canonicals(self) -> None:
+        """Acrescenta `source_pages`/`duplicate_count` aos canônicos que tiveram cópias."""
+        groups = {
+            chunk_id: (sorted({page, *copies}), len(copies) + 1)
+            for (chunk_id, page), copies in self.duplicates.items()
+        }
+        ids = list(groups)
+        for i in range(0, len(ids), self.batch_size):
+            chunks = self.vectorizer.document_store.get_many(ids[i:i + self.batch_size])
+            for chunk in chunks:
+                pages, count = groups[chunk["id"]]
+                chunk["metadata"]["source_pages"] = ",".join(str(page) for page in pages)
+                chunk["metadata"]["duplicate_count"] = count
+            if not chunks:
+                continue
+            self.vectorizer.store.update_metadata(
+                ids=[chunk["id"] for chunk in chunks],
+                metadatas=[chunk["metadata"] for chunk in chunks]
+            )
+            self.vectorizer.document_store.add_chunks(chunks)
+
+    def _dedup_report(self, chunks_after: int) -> Optional[Dict[str, Any]]:
+        if not self.dedup:
+            return None
+        return SimHashDeduplicator.report(
+            chunks_before=self.chunks_before,
+            chunks_after=chunks_after,
+            duplicate_groups=len(self.duplicates),
+            text_bytes_saved=self.text_bytes_saved,
+            embedding_dimension=self.vectorizer.EMBEDDING_DIMENSION
+        )
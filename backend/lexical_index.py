@@ -0,0 +1,258 @@
+"""
+Índice léxico da LOA 2026 com offsets de termos.
+
+Mantém, para cada termo normalizado (minúsculo e sem acentos), as posições
+de início/fim de cada ocorrência em cada chunk. Esses offsets permitem gerar
+snippets destacados no servidor sem reprocessar o texto completo a cada busca.
+"""
+
+import re
+import math
+import unicodedata
+from array import array
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Palavras muito frequentes que não ajudam a localizar o trecho relevante
+STOPWORDS = {
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no",
+    "na", "nos", "nas", "para", "por", "com", "um", "uma", "que", "qual",
+    "quais", "quanto", "quanta", "foi", "sao", "ao", "aos", "se", "sobre",
+}
+
+
+def fold(text: str) -> str:
+    """Normaliza texto para comparação: minúsculo e sem acentos."""
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """Divide o texto em tokens normalizados com seus offsets no texto original."""
+    return [
+        (fold(match.group()), match.start(), match.end())
+        for match in TOKEN_PATTERN.finditer(text)
+    ]
+
+
+class LexicalIndex:
+    """
+    Índice invertido termo -> chunk -> offsets.
+
+    Usado para localizar ocorrências dos termos da query dentro de cada
+    chunk retornado pela busca e montar snippets com destaque.
+    """
+
+    SNIPPET_SIZE = 240
+    MAX_FRAGMENTS = 2
+    FRAGMENT_SEPARATOR = " … "
+
+    def __init__(self):
+        # termo -> chunk -> offsets (início, fim) achatados em um único array
+        self.postings: Dict[str, Dict[str, array]] = {}
+        self.chunks = 0
+
+    def __len__(self) -> int:
+        return len(self.postings)
+
+    def add(self, chunk_id: str, text: str) -> None:
+        """Indexa os termos de um chunk."""
+        self.chunks += 1
+        for term, start, end in tokenize(text):
+            if term in STOPWORDS:
+                continue
+            spans = self.postings.setdefault(term, {}).get(chunk_id)
+            if spans is None:
+                spans = self.postings[term][chunk_id] = array("I")
+            spans.append(start)
+            spans.append(end)
+
+    def build(self, items: Iterable[Tuple[str, str]]) -> "LexicalIndex":
+        """Reconstrói o índice a partir de pares (chunk_id, texto)."""
+        # Monta um índice novo e troca no fim (buscas concorrentes usam o anterior)
+        fresh = LexicalIndex()
+        for chunk_id, text in items:
+            fresh.add(chunk_id, text)
+        self.postings, self.chunks = fresh.postings, fresh.chunks
+        return self
+
+    def query_terms(self, query: str) -> List[str]:
+        """Extrai os termos úteis da query, sem repetição."""
+        terms = []
+        for term, _, _ in tokenize(query):
+            if term not in STOPWORDS and term not in terms:
+                terms.append(term)
+        return terms
+
+    def match_all(self, terms: List[str]) -> Dict[str, int]:
+        """
+        Retorna os chunks que contêm todos os termos, com o número de ocorrências.
+
+        Usado para consultas estruturadas (código, nome de órgão) sem embeddings.
+        """
+        if not terms:
+            return {}
+        postings = sorted((self.postings.get(term, {}) for term in terms), key=len)
+        matches = {}
+        for chunk_id in postings[0]:
+            if all(chunk_id in other for other in postings[1:]):
+                matches[chunk_id] = sum(len(other[chunk_id]) // 2 for other in postings)
+        return matches
+
+    def match_any(self, terms: List[str]) -> Dict[str, float]:
+        """
+        Retorna os chunks que contêm algum dos termos, com pontuação
+        ocorrências × idf (termos raros pesam mais).
+
+        Usado quando a busca vetorial não está disponível (provedor de
+        embeddings fora do ar).
+        """
+        scores: Dict[str, float] = {}
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + max(self.chunks, len(postings)) / len(postings))
+            for chunk_id, spans in postings.items():
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * (1 + math.log(len(spans) // 2))
+        return scores
+
+    def offsets(self, chunk_id: str, terms: List[str]) -> List[Tuple[int, int, str]]:
+        """Retorna as ocorrências (início, fim, termo) dos termos no chunk, ordenadas."""
+        hits = []
+        for term in terms:
+            spans = self.postings.get(term, {}).get(chunk_id, ())
+            for index in range(0, len(spans), 2):
+                hits.append((spans[index], spans[index + 1], term))
+        hits.sort()
+        return hits
+
+    def snippet(
+        self,
+        chunk_id: str,
+        text: str,
+        query: str,
+        size: Optional[int] = None,
+        max_fragments: Optional[int] = None,
+        annotations: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Gera um snippet do chunk centrado nas ocorrências dos termos da query.
+
+        Args:
+            chunk_id: ID do chunk (chave no índice)
+            text: Texto completo do chunk
+            query: Query de busca
+            size: Tamanho aproximado de cada fragmento em caracteres
+            max_fragments: Número máximo de fragmentos
+            annotations: Spans pré-calculados sobre o texto completo (dicts com
+                start/end, ex: termos do glossário) a reposicionar no snippet
+
+        Returns:
+            Dict com "snippet" e "highlights" (offsets [início, fim] relativos ao snippet);
+            com `annotations`, também "annotations" com os spans que cabem no snippet
+        """
+        size = size or self.SNIPPET_SIZE
+        max_fragments = max_fragments or self.MAX_FRAGMENTS
+        terms = self.query_terms(query)
+
+        hits = self.offsets(chunk_id, terms)
+        if not hits and terms:
+            # Chunk fora do índice (ex: inserido após o último refresh)
+            hits = [
+                (start, end, term) for term, start, end in tokenize(text)
+                if term in terms
+            ]
+
+        if not hits:
+            return self._assemble(text, [(0, min(len(text), size))], [], annotations)
+
+        windows = self._select_windows(hits, len(text), size, max_fragments)
+        return self._assemble(text, windows, hits, annotations)
+
+    def _select_windows(
+        self,
+        hits: List[Tuple[int, int, str]],
+        text_length: int,
+        size: int,
+        max_fragments: int
+    ) -> List[Tuple[int, int]]:
+        """Escolhe as janelas que cobrem mais termos distintos da query."""
+        candidates = []
+        right = 0
+        for left in range(len(hits)):
+            right = max(right, left)
+            while right + 1 < len(hits) and hits[right + 1][1] - hits[left][0] <= size:
+                right += 1
+            covered = hits[left:right + 1]
+            score = (len({term for _, _, term in covered}), len(covered))
+            candidates.append((score, hits[left][0], covered[-1][1]))
+
+        candidates.sort(key=lambda c: (-c[0][0], -c[0][1], c[1]))
+
+        windows: List[Tuple[int, int]] = []
+        for _, first, last in candidates:
+            # Centraliza as ocorrências dentro da janela
+            padding = max(0, size - (last - first)) // 2
+            start = max(0, first - padding)
+            end = min(text_length, start + size)
+            start = max(0, end - size)
+            if any(start < w_end and end > w_start for w_start, w_end in windows):
+                continue
+            windows.append((start, end))
+            if len(windows) >= max_fragments:
+                break
+
+        return sorted(windows)
+
+    def _assemble(
+        self,
+        text: str,
+        windows: List[Tuple[int, int]],
+        hits: List[Tuple[int, int, str]],
+        annotations: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Monta o snippet final e recalcula os offsets de destaque."""
+        parts = []
+        highlights = []
+        moved = []
+        cursor = 0
+
+        last_end = 0
+        for index, (start, end) in enumerate(windows):
+            start, end = self._snap_to_words(text, start, end)
+            start = max(start, last_end)
+            last_end = end
+            prefix = self.FRAGMENT_SEPARATOR if index > 0 or start > 0 else ""
+            fragment = text[start:end]
+            base = cursor + len(prefix)
+
+            for hit_start, hit_end, _ in hits:
+                if hit_start >= start and hit_end <= end:
+                    highlights.append([base + hit_start - start, base + hit_end - start])
+            for span in annotations or ():
+                if span["start"] >= start and span["end"] <= end:
+                    moved.append({**span, "start": base + span["start"] - start, "end": base + span["end"] - start})
+
+            parts.append(prefix + fragment)
+            cursor = base + len(fragment)
+
+        if windows and last_end < len(text):
+            parts.append(self.FRAGMENT_SEPARATOR)
+
+        result = {"snippet": "".join(parts), "highlights": highlights}
+        if annotations is not None:
+            result["annotations"] = moved
+        return result
+
+    @staticmethod
+    def _snap_to_words(text: str, start: int, end: int, slack: int = 20) -> Tuple[int, int]:
+        """Expande a janela (até `slack` caracteres) para não cortar palavras ao meio."""
+        limit = max(0, start - slack)
+        while start > limit and not text[start - 1].isspace():
+            start -= 1
+        limit = min(len(text), end + slack)
+        while end < limit and not text[end].isspace():
+            end += 1
+        return start, end
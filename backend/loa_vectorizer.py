@@ -8,14 +8,33 @@ utilizando embeddings do Google Gemini e ChromaDB para persistência.
 import os
 import re
 import json
-from typing import List, Dict, Any, Optional
+import time
+import numpy as np
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
 from dataclasses import dataclass
 import google.generativeai as genai
-import chromadb
-from chromadb.config import Settings
 from PyPDF2 import PdfReader
 from dotenv import load_dotenv
 
+from lexical_index import LexicalIndex, fold
+from document_store import DocumentStore
+from adjacency import AdjacencyIndex, stitch
+from reranker import FeatureReranker
+from dedup import SimHashDeduplicator
+from ingestion import IngestPipeline
+from vector_store import create_vector_store, truncate_normalize, match_where
+from cache import LRUCache
+from content_list import load_content_list, iter_items, TextItem, TableRow, ContentListSource
+from regional_rollup import RegionalRollup
+from query_router import QueryRouter, Route
+from metadata_index import MetadataIndex
+from corpus import Corpus
+from suggest import Suggester, extract_entities
+from glossary import create_annotator
+from table_rows import iter_row_units, TableIndex
+from profiling import span
+from resilience import ResilientProvider, ProviderUnavailable
+
 load_dotenv()
 
 # Configura a API key (deve estar em .env ou variável de ambiente)
@@ -30,6 +49,8 @@ else:
 @dataclass
 class LOAChunk:
     """Representa um chunk de texto da LOA com metadados enriquecidos."""
+    __slots__ = ("id", "text", "metadata")
+
     id: str
     text: str
     metadata: Dict[str, Any]
@@ -74,49 +95,367 @@ class LOAVectorizer:
     VALUE_PATTERN = r"R\$\s*([\d\.]+),(\d{2})"
     REGIONAL_PATTERN = r"REGIONAL\s+(\d+)"
 
-    def __init__(self, api_key: Optional[str] = None, persist_dir: str = "./chroma_db"):
+    # Reranking (segundo estágio)
+    RERANK_FACTOR = 4
+    RERANK_BUDGET_MS = 50.0
+
+    # Embeddings de queries
+    EMBEDDING_BATCH_SIZE = 100
+    QUERY_CACHE_SIZE = 2048
+
+    # Máximo de chunks considerados por uma consulta roteada (sem embeddings)
+    ROUTER_MAX_CANDIDATES = 200
+
+    # Prazo total (s) e retentativas por chamada de embedding: a busca tem um
+    # prazo curto e degrada para o índice léxico; a indexação espera mais
+    QUERY_EMBED_DEADLINE = 2.0
+    QUERY_EMBED_RETRIES = 1
+    INDEX_EMBED_DEADLINE = 120.0
+    INDEX_EMBED_RETRIES = 6
+
+    # Linhas de tabela por unidade indexada a partir do content_list (0 desliga;
+    # ligado, as páginas com tabela deixam de ser indexadas pelo texto do PDF)
+    TABLE_ROW_GROUP = 0
+
+    # Chave (tabela meta do store de documentos) das tabelas de documentos avulsos
+    DOCUMENT_TABLES_KEY = "document_tables"
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        persist_dir: str = "./chroma_db",
+        vector_backend: Optional[str] = None,
+        content_list_path: Optional[str] = None
+    ):
         """
         Inicializa o vetorizador.
 
         Args:
             api_key: Chave da API Gemini (opcional, usa padrão se não fornecida)
             persist_dir: Diretório para persistência do ChromaDB
+            vector_backend: "chroma" (HNSW) ou "numpy" (busca exata em processo);
+                padrão: variável VECTOR_BACKEND ou "chroma"
+            content_list_path: content_list JSON da LOA (tabelas estruturadas),
+                usado para os agregados por regional
         """
         # Configuração já feita no topo do arquivo
 
-        # Inicializa ChromaDB
-        self.chroma_client = chromadb.PersistentClient(path=persist_dir)
-        self.collection = self.chroma_client.get_or_create_collection(
-            name="loa_2026",
-            metadata={
+        # Formato dos vetores armazenados: dimensões mantidas (truncamento +
+        # renormalização) e tipo (float32, float16 ou int8 no backend numpy)
+        self.vector_dimension = int(os.getenv("VECTOR_DIMENSION") or self.EMBEDDING_DIMENSION)
+        self.vector_dtype = os.getenv("VECTOR_DTYPE", "float32")
+
+        # Inicializa o backend vetorial
+        self.store = create_vector_store(
+            backend=vector_backend or os.getenv("VECTOR_BACKEND", "chroma"),
+            persist_dir=persist_dir,
+            collection_metadata={
                 "description": "LOA 2026 - Lei Orçamentária Anual de Fortaleza",
                 "embedding_model": self.EMBEDDING_MODEL,
                 "hnsw:space": "cosine"
-            }
+            },
+            dimension=self.vector_dimension,
+            dtype=self.vector_dtype
+        )
+        # Um store numpy existente mantém o formato com que foi criado
+        if self.store.name == "numpy":
+            self.vector_dimension = self.store.dimension
+            self.vector_dtype = self.store.dtype.name
+
+        # Store local de documentos (busca por ID/página sem embeddings)
+        self.document_store = DocumentStore(os.path.join(persist_dir, "loa_documents.sqlite3"))
+
+        # Índices auxiliares em memória (reconstruídos por refresh_indexes)
+        # sobre o corpus colunar compartilhado
+        self.corpus = Corpus()
+        self.lexical_index = LexicalIndex()
+        self.adjacency = AdjacencyIndex()
+        self.metadata_index = MetadataIndex()
+        self.reranker = FeatureReranker(self.lexical_index)
+        self.deduplicator = SimHashDeduplicator()
+        self.query_embedding_cache = LRUCache(self.QUERY_CACHE_SIZE)
+
+        # Chamadas ao Gemini com prazo, retentativas e circuit breaker
+        self.embedding_provider = ResilientProvider("gemini-embeddings")
+        self.query_embed_deadline = float(os.getenv("EMBED_QUERY_DEADLINE", str(self.QUERY_EMBED_DEADLINE)))
+        self.query_embed_retries = int(os.getenv("EMBED_QUERY_RETRIES", str(self.QUERY_EMBED_RETRIES)))
+        self.index_embed_deadline = float(os.getenv("EMBED_INDEX_DEADLINE", str(self.INDEX_EMBED_DEADLINE)))
+        self.index_embed_retries = int(os.getenv("EMBED_INDEX_RETRIES", str(self.INDEX_EMBED_RETRIES)))
+
+        # Agregados por regional (calculados a partir do content_list)
+        self.content_list_path = content_list_path
+        self.regional_rollup = RegionalRollup()
+
+        # Roteador de consultas estruturadas (página, programa, regional, órgão)
+        self.router = QueryRouter()
+
+        # Autocompletar de entidades (/api/suggest)
+        self.suggester = Suggester()
+        self._suggest_source: Optional[str] = None
+
+        # Termos do glossário (data/glossary.ts) anotados em cada chunk
+        self.glossary = create_annotator()
+        # Spans compactos por posição do corpus (ver GlossaryAnnotator.pack)
+        self.glossary_spans: List[Any] = []
+
+        # Tabelas completas do content_list (referência das unidades de linha);
+        # `_table_source` é o fingerprint carregado, "" sem content_list e None
+        # enquanto não verificado
+        self.table_index = TableIndex()
+        self._table_source: Optional[str] = None
+
+    def refresh_indexes(self) -> Dict[str, Any]:
+        """
+        Reconstrói os índices auxiliares em memória a partir do store de documentos.
+
+        Se o store estiver vazio mas a coleção não (coleções indexadas antes
+        da existência do store), ele é preenchido a partir do backend vetorial.
+
+        Returns:
+            Estatísticas dos índices reconstruídos
+        """
+        if self.document_store.count() == 0 and self.store.count() > 0:
+            data = self.store.get_all()
+            self.document_store.add_chunks(
+                {"id": chunk_id, "text": doc, "metadata": meta}
+                for chunk_id, doc, meta in zip(data["ids"], data["documents"], data["metadatas"])
+            )
+
+        # Corpus colunar compartilhado pelos índices em memória (posição = chunk)
+        corpus = Corpus.build(self.document_store.iter_chunks())
+        self.store.attach_corpus(corpus)
+        self.lexical_index.build(zip(corpus.ids, corpus.texts))
+        self.adjacency.build(corpus)
+        self.metadata_index.build(corpus)
+
+        # content_list lido e parseado uma vez para agregados, autocompletar e tabelas
+        source = self.read_content_list()
+        rollup_report = self.refresh_regional_rollup(source)
+        self.router.set_gazetteer(self.regional_rollup.entity_names())
+        self.refresh_suggestions(corpus, source)
+        self.corpus, self.glossary_spans = corpus, self.annotate_corpus(corpus)
+        self.refresh_tables(source)
+
+        return {
+            "indexed_chunks": len(corpus),
+            "corpus": corpus.stats(),
+            "lexical_terms": len(self.lexical_index),
+            "metadata_index": self.metadata_index.stats()["distinct_values"],
+            "regional_rollup": rollup_report,
+            "router_gazetteer": len(self.router.gazetteer),
+            "suggest_entities": len(self.suggester),
+            "glossary_chunks": sum(1 for spans in self.glossary_spans if spans),
+            "tables": len(self.table_index)
+        }
+
+    def read_content_list(self) -> Optional[ContentListSource]:
+        """content_list configurado (fingerprint e itens sob demanda), ou None."""
+        if not self.content_list_path or not os.path.exists(self.content_list_path):
+            return None
+        return ContentListSource(self.content_list_path)
+
+    def refresh_regional_rollup(self, source: Optional[ContentListSource] = None) -> Optional[Dict[str, Any]]:
+        """
+        Atualiza os agregados por regional a partir do content_list.
+
+        O arquivo é identificado pelo sha256 do conteúdo: se não mudou desde
+        a última atualização, nada é recalculado; se mudou, só as regionais
+        com entradas alteradas têm a visão refeita.
+
+        Args:
+            source: content_list já lido (padrão: lê o configurado)
+
+        Returns:
+            Relatório da atualização, ou None sem content_list configurado
+        """
+        source = source or self.read_content_list()
+        if source is None:
+            return None
+
+        if source.fingerprint == self.regional_rollup.source_fingerprint:
+            return {"changed_pages": 0, "refreshed_regionals": [], "skipped": True}
+
+        report = self.regional_rollup.update(source.items, source.fingerprint, self.extract_regional)
+        print(f"Agregados regionais: {len(report['refreshed_regionals'])} regionais atualizadas")
+        return report
+
+    def refresh_suggestions(self, corpus: Corpus, source: Optional[ContentListSource] = None) -> None:
+        """
+        Reconstrói o autocompletar de entidades.
+
+        Usa as linhas de tabela e títulos do content_list (refeito só quando
+        o arquivo muda); sem content_list, as linhas do texto dos chunks.
+
+        Args:
+            corpus: Corpus dos chunks indexados
+            source: content_list já lido (padrão: lê o configurado)
+        """
+        source = source or self.read_content_list()
+        if source is not None:
+            fingerprint = source.fingerprint
+            if fingerprint == self._suggest_source:
+                return
+            items = source.items
+        else:
+            fingerprint = None
+            items = (
+                TextItem(page=int(corpus.value(row, "page") or 0), text=line.strip())
+                for row in range(len(corpus))
+                for line in corpus.text(row).splitlines()
+                if line.strip()
+            )
+        self.suggester.build(extract_entities(items))
+        self._suggest_source = fingerprint
+
+    def annotate_corpus(self, corpus: Corpus) -> List[Any]:
+        """
+        Pré-calcula os spans dos termos do glossário em cada chunk do corpus.
+
+        Uma passada do autômato por chunk na indexação; na busca, os spans
+        só são reposicionados no snippet.
+        """
+        if self.glossary is None:
+            return []
+        return [self.glossary.pack(text) for text in corpus.texts]
+
+    def glossary_for(self, chunk_id: str, text: str) -> List[Dict[str, Any]]:
+        """Spans do glossário no texto do chunk (pré-calculados ou, fora do índice, na hora)."""
+        if self.glossary is None:
+            return []
+        corpus, spans = self.corpus, self.glossary_spans
+        row = corpus.position.get(chunk_id)
+        if row is None or row >= len(spans):
+            return self.glossary.annotate(text)
+        return self.glossary.unpack(spans[row])
+
+    def refresh_tables(self, source: Optional[ContentListSource] = None) -> None:
+        """
+        Reconstrói o índice de tabelas completas: as da LOA só quando o
+        content_list muda; as dos documentos avulsos a partir do store de
+        documentos (sobrevivem a reinícios e viajam nos snapshots).
+
+        Args:
+            source: content_list já lido (padrão: lê o configurado)
+        """
+        self.table_index.set_document_tables(json.loads(self.document_store.get_meta(self.DOCUMENT_TABLES_KEY) or "{}"))
+        source = source or self.read_content_list()
+        if source is None:
+            # Lembra a ausência: get_table não relê o disco a cada id desconhecido
+            if self._table_source is None:
+                self._table_source = ""
+            return
+        if source.fingerprint == self._table_source:
+            return
+        self.table_index.build(source.items)
+        self._table_source = source.fingerprint
+
+    def get_table(self, table_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna a tabela completa referenciada por uma unidade de linha.
+
+        Args:
+            table_id: ID da tabela (metadado `table_id`, ex: "p13_t0")
+
+        Returns:
+            Dict com table_id, page, caption, headers e rows, ou None
+        """
+        if self._table_source is None:
+            self.refresh_tables()
+        return self.table_index.get(table_id)
+
+    def suggest(self, query: str, limit: int = 8, kinds: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Sugestões de entidades para o texto digitado (ver suggest.Suggester)."""
+        started = time.perf_counter()
+        suggestions = self.suggester.suggest(query, limit=limit, kinds=kinds)
+        return {
+            "query": query,
+            "suggestions": suggestions,
+            "took_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    def get_regional(self, regional: int) -> Optional[Dict[str, Any]]:
+        """Retorna os totais pré-calculados de uma regional (1 a 12)."""
+        return self.regional_rollup.get(regional)
+
+    def _embed_content(self, content: Any, query: bool) -> Any:
+        """Chama o Gemini pelo provedor resiliente (prazo e retentativas da busca ou da indexação)."""
+        return self.embedding_provider.call(
+            lambda: genai.embed_content(model=self.EMBEDDING_MODEL, content=content)["embedding"],
+            deadline=self.query_embed_deadline if query else self.index_embed_deadline,
+            retries=self.query_embed_retries if query else self.index_embed_retries,
+            # A indexação espera o circuito reabrir (dentro do prazo); a busca degrada na
+            # hora, inclusive com erros não transitórios (ex: chave inválida)
+            wait_open=not query,
+            fail_fast=query
         )
 
-    def get_embedding(self, text: str) -> List[float]:
+    def get_embedding(self, text: str, query: bool = False) -> List[float]:
         """
         Gera embedding usando Gemini.
 
         Args:
             text: Texto para gerar embedding
+            query: Usa o prazo curto da busca em vez do prazo da indexação
 
         Returns:
             Lista de floats representando o embedding
+
+        Raises:
+            ProviderUnavailable: Gemini indisponível (nunca retorna um vetor de zeros)
         """
-        try:
-            result = genai.embed_content(
-                model=self.EMBEDDING_MODEL,
-                content=text
-            )
-            return result['embedding']
-        except Exception as e:
-            print(f"Erro ao gerar embedding: {e}")
-            import traceback
-            traceback.print_exc()
-            # Fallback: retorna embedding zero
-            return [0.0] * self.EMBEDDING_DIMENSION
+        return self._embed_content(text, query)
+
+    def get_embeddings(self, texts: List[str], query: bool = False) -> List[List[float]]:
+        """
+        Gera embeddings para vários textos em chamadas em lote ao Gemini.
+
+        Args:
+            texts: Textos para gerar embedding
+            query: Usa o prazo curto da busca em vez do prazo da indexação
+
+        Returns:
+            Lista de embeddings, na mesma ordem dos textos
+
+        Raises:
+            ProviderUnavailable: Gemini indisponível; a indexação é interrompida
+                em vez de gravar vetores inválidos
+        """
+        embeddings = []
+        for i in range(0, len(texts), self.EMBEDDING_BATCH_SIZE):
+            batch = texts[i:i + self.EMBEDDING_BATCH_SIZE]
+            try:
+                embeddings.extend(self._embed_content(batch, query))
+            except ProviderUnavailable:
+                raise
+            except Exception as e:
+                # Só na indexação: na busca (fail_fast) todo erro já é ProviderUnavailable
+                print(f"Erro ao gerar embeddings em lote: {e}")
+                # Fallback: uma chamada por texto (isola o texto rejeitado)
+                embeddings.extend(self.get_embedding(text, query) for text in batch)
+        return embeddings
+
+    def get_query_embeddings(self, queries: List[str]) -> List[List[float]]:
+        """
+        Retorna embeddings de queries, usando o cache LRU e um único lote
+        para as queries ainda não vistas.
+
+        O cache guarda os vetores já no formato do store (truncados e, fora
+        do float32, em float16), que é o que a busca consome.
+
+        Raises:
+            ProviderUnavailable: alguma query fora do cache e Gemini indisponível
+        """
+        keys = [query.strip() for query in queries]
+        cached = {key: self.query_embedding_cache.get(key) for key in set(keys)}
+        missing = [key for key, value in cached.items() if value is None]
+
+        if missing:
+            cache_dtype = np.float32 if self.vector_dtype == "float32" else np.float16
+            for key, embedding in zip(missing, self.get_embeddings(missing, query=True)):
+                cached[key] = truncate_normalize(embedding, self.vector_dimension)[0].astype(cache_dtype)
+                self.query_embedding_cache.put(key, cached[key])
+
+        return [cached[key] for key in keys]
 
     def detect_section(self, text: str) -> Optional[str]:
         """Detecta a seção do documento baseado em padrões."""
@@ -199,15 +538,16 @@ class LOAVectorizer:
 
         return "texto"
 
-    def extract_text_from_pdf(self, pdf_path: str) -> List[LOAChunk]:
+    def iter_pdf_pages(self, pdf_path: str, max_pages: Optional[int] = None) -> Iterator[Tuple[int, str]]:
         """
-        Extrai texto do PDF e cria chunks com metadados.
+        Lê o PDF página a página.
 
         Args:
             pdf_path: Caminho para o arquivo PDF
+            max_pages: Lê só as primeiras N páginas (None = todas)
 
-        Returns:
-            Lista de LOAChunk
+        Yields:
+            Pares (número da página, texto extraído)
         """
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF não encontrado: {pdf_path}")
@@ -215,29 +555,26 @@ class LOAVectorizer:
         print(f"Processando PDF: {pdf_path}")
         reader = PdfReader(pdf_path)
         total_pages = len(reader.pages)
+        if max_pages:
+            total_pages = min(total_pages, max_pages)
         print(f"Total de páginas: {total_pages}")
 
-        chunks = []
-        global_chunk_index = 0
-
-        for page_num, page in enumerate(reader.pages, start=1):
+        for page_num in range(1, total_pages + 1):
             if page_num % 10 == 0:
                 print(f"Processando página {page_num}/{total_pages}...")
+            yield page_num, reader.pages[page_num - 1].extract_text() or ""
 
-            text = page.extract_text()
-            if not text or not text.strip():
-                continue
-
-            # Cria chunks da página
-            page_chunks = self._create_chunks_from_text(
-                text=text,
-                page_num=page_num,
-                start_index=global_chunk_index
-            )
+    def extract_text_from_pdf(self, pdf_path: str) -> List[LOAChunk]:
+        """
+        Extrai texto do PDF e cria chunks com metadados.
 
-            chunks.extend(page_chunks)
-            global_chunk_index += len(page_chunks)
+        Args:
+            pdf_path: Caminho para o arquivo PDF
 
+        Returns:
+            Lista de LOAChunk
+        """
+        chunks = list(IngestPipeline(self, dedup=False).iter_chunks(self.iter_pdf_pages(pdf_path)))
         print(f"Total de chunks criados: {len(chunks)}")
         return chunks
 
@@ -314,86 +651,296 @@ class LOAVectorizer:
             metadata=metadata
         )
 
-    def index_pdf(self, pdf_path: str, batch_size: int = 50) -> Dict[str, Any]:
+    def _create_row_chunk(self, unit: Dict[str, Any]) -> LOAChunk:
+        """Cria o LOAChunk de uma unidade de linha(s) de tabela (ver table_rows)."""
+        if unit["row_start"] == unit["row_end"]:
+            suffix = f"row_{unit['row_start']}"
+            title = f"Página {unit['page']} - Tabela {unit['table_id']} - Linha {unit['row_start']}"
+        else:
+            suffix = f"rows_{unit['row_start']}_{unit['row_end']}"
+            title = f"Página {unit['page']} - Tabela {unit['table_id']} - Linhas {unit['row_start']} a {unit['row_end']}"
+
+        metadata = self.enrich_metadata({
+            "page": unit["page"],
+            "source": "LOA-2026-numerado.pdf",
+            "title": title
+        }, unit["text"])
+        metadata.update({
+            "chunk_type": "linha_tabela",
+            "chunk_index": unit["row_start"],
+            "table_id": unit["table_id"],
+            "row_start": unit["row_start"],
+            "row_end": unit["row_end"]
+        })
+        if unit["caption"]:
+            metadata["table_caption"] = unit["caption"]
+
+        return LOAChunk(
+            id=f"loa_table_{unit['table_id']}_{suffix}",
+            text=unit["text"],
+            metadata=metadata
+        )
+
+    @staticmethod
+    def _replace_table_pages(
+        pages: Iterable[Tuple[int, str]],
+        items: List[Any]
+    ) -> Iterator[Tuple[int, str]]:
+        """
+        Troca o texto do PDF das páginas com tabela pelos textos do content_list.
+
+        As tabelas dessas páginas já entram como unidades de linha; indexar
+        também o texto extraído do PDF duplicaria as tabelas no índice.
+        """
+        table_pages = {item.page for item in items if isinstance(item, TableRow)}
+        texts: Dict[int, List[str]] = {}
+        for item in items:
+            if isinstance(item, TextItem) and item.page in table_pages:
+                texts.setdefault(item.page, []).append(item.text)
+        for page_num, text in pages:
+            if page_num in table_pages:
+                text = "\n\n".join(texts.get(page_num, []))
+            yield page_num, text
+
+    def _index_table_rows(
+        self,
+        items: List[Any],
+        group_size: int,
+        batch_size: int,
+        queue_size: Optional[int]
+    ) -> Dict[str, Any]:
+        """
+        Indexa uma unidade por linha (ou grupo de linhas) das tabelas do content_list.
+
+        Returns:
+            Estatísticas da indexação das linhas
+        """
+        units = iter_row_units(items, group_size)
+        pipeline = IngestPipeline(self, batch_size=batch_size, queue_size=queue_size, dedup=False)
+        report = pipeline.run_chunks(self._create_row_chunk(unit) for unit in units)
+        print(f"Linhas de tabela indexadas: {report['total_inserted']} unidades ({group_size} linha(s) cada)")
+        return {
+            "group_size": group_size,
+            "total_units": report["total_chunks"],
+            "total_inserted": report["total_inserted"],
+            "elapsed_s": report["pipeline"]["elapsed_s"]
+        }
+
+    def index_pdf(
+        self,
+        pdf_path: str,
+        batch_size: int = 50,
+        dedup: bool = True,
+        queue_size: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        table_rows: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
-        Indexa o PDF completo no ChromaDB.
+        Indexa o PDF completo em streaming (ver ingestion.IngestPipeline).
 
         Args:
             pdf_path: Caminho para o PDF
-            batch_size: Tamanho do batch para inserção
+            batch_size: Chunks por lote de embeddings/inserção
+            dedup: Se True, descarta quase duplicatas antes de gerar embeddings
+            queue_size: Lotes máximos em espera entre estágios
+            max_pages: Indexa só as primeiras N páginas (None = todas)
+            table_rows: Linhas de tabela por unidade (ver index_pages)
 
         Returns:
             Estatísticas da indexação
         """
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(f"PDF não encontrado: {pdf_path}")
+        return self.index_pages(
+            self.iter_pdf_pages(pdf_path, max_pages),
+            batch_size=batch_size,
+            dedup=dedup,
+            queue_size=queue_size,
+            table_rows=table_rows
+        )
+
+    def index_pages(
+        self,
+        pages: Iterable[Tuple[int, str]],
+        batch_size: int = 50,
+        dedup: bool = True,
+        queue_size: Optional[int] = None,
+        table_rows: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Indexa páginas (pares (número, texto)) pelo pipeline em streaming.
+
+        Os lotes são gravados no backend vetorial e no DocumentStore à
+        medida que recebem embeddings; só alguns lotes ficam em memória.
+
+        Com content_list configurado e `table_rows` > 0 (padrão
+        TABLE_ROW_GROUP, desligado), as tabelas são indexadas linha a linha
+        (`table_rows` linhas por unidade): cada unidade leva a legenda e os
+        cabeçalhos da tabela e aponta para ela pelo metadado `table_id` (ver
+        get_table). As páginas com tabela passam a ser indexadas só pelos
+        textos do content_list, sem repetir as tabelas do PDF.
+
+        Returns:
+            Estatísticas da indexação (inclui "pipeline": vazão e pico de RSS)
+        """
         print("=" * 60)
         print("INICIANDO INDEXAÇÃO DO LOA 2026")
         print("=" * 60)
+        print(f"Inserindo no backend '{self.store.name}' em batches de {batch_size}...")
 
-        # Extrai chunks
-        chunks = self.extract_text_from_pdf(pdf_path)
+        if table_rows is None:
+            table_rows = int(os.getenv("TABLE_ROW_GROUP", str(self.TABLE_ROW_GROUP)))
+        source = self.read_content_list() if table_rows > 0 else None
+        if source is not None:
+            pages = self._replace_table_pages(pages, source.items)
 
-        if not chunks:
+        pipeline = IngestPipeline(self, batch_size=batch_size, queue_size=queue_size, dedup=dedup)
+        report = pipeline.run(pages)
+
+        if not report["total_chunks"]:
             return {"error": "Nenhum chunk extraído do PDF"}
 
-        # Prepara dados para inserção
-        documents = []
-        embeddings = []
-        metadatas = []
-        ids = []
+        dedup_report = report["dedup"]
+        if dedup_report:
+            print(
+                f"Quase-duplicatas agrupadas: {dedup_report['embeddings_saved']} embeddings "
+                f"economizados (~{dedup_report['index_bytes_saved'] / 1024:.0f} KB)"
+            )
+
+        stats = report["pipeline"]
+        print("=" * 60)
+        print(f"INDEXAÇÃO CONCLUÍDA: {report['total_inserted']} chunks indexados")
+        print(
+            f"{stats['pages']} páginas em {stats['elapsed_s']:.1f}s "
+            f"({stats['chunks_per_s']:.1f} chunks/s, pico de RSS {stats['peak_rss_mb']:.0f} MB)"
+        )
+        print("=" * 60)
 
-        print(f"\nGerando embeddings para {len(chunks)} chunks...")
+        rows_report = self._index_table_rows(source.items, table_rows, batch_size, queue_size) \
+            if source is not None else None
 
-        for i, chunk in enumerate(chunks):
-            if (i + 1) % 50 == 0:
-                print(f"Processando embedding {i + 1}/{len(chunks)}...")
+        self.refresh_indexes()
+        self.document_store.bump_index_version()
 
-            documents.append(chunk.text)
-            metadatas.append(chunk.metadata)
-            ids.append(chunk.id)
+        return {
+            "total_chunks": report["total_chunks"],
+            "total_inserted": report["total_inserted"],
+            "collection_name": "loa_2026",
+            "embedding_model": self.EMBEDDING_MODEL,
+            "dedup": dedup_report,
+            "table_rows": rows_report,
+            "pipeline": stats
+        }
 
-            # Gera embedding
-            embedding = self.get_embedding(chunk.text)
-            embeddings.append(embedding)
+    def iter_document_pages(self, path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Páginas de um documento avulso (PDF, content_list JSON ou Markdown).
 
-        # Insere em batches
-        print(f"\nInserindo no ChromaDB em batches de {batch_size}...")
+        No content_list, os textos são agrupados por página; as tabelas
+        ficam para as unidades de linha (ver index_document).
+        """
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".pdf":
+            yield from self.iter_pdf_pages(path)
+        elif extension == ".json":
+            page, lines = None, []
+            for item in iter_items(load_content_list(path)):
+                if not isinstance(item, TextItem):
+                    continue
+                if page is not None and item.page != page:
+                    yield page, "\n\n".join(lines)
+                    lines = []
+                page = item.page
+                lines.append(item.text)
+            if lines:
+                yield page, "\n\n".join(lines)
+        elif extension == ".md":
+            with open(path, encoding="utf-8") as f:
+                yield 1, f.read()
+        else:
+            raise ValueError(f"Tipo de documento não suportado: {extension}")
+
+    def index_document(
+        self,
+        path: str,
+        document_id: str,
+        batch_size: int = 50,
+        queue_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Indexa um documento avulso (decreto, emenda) ao lado da LOA.
 
-        total_inserted = 0
-        for i in range(0, len(ids), batch_size):
-            batch_end = min(i + batch_size, len(ids))
-            batch_ids = ids[i:batch_end]
-            batch_docs = documents[i:batch_end]
-            batch_embeddings = embeddings[i:batch_end]
-            batch_metas = metadatas[i:batch_end]
+        Os chunks recebem o prefixo `doc_{document_id}_` no ID e o metadado
+        `document` (filtrável na busca); as tabelas de um content_list viram
+        unidades de linha, com `table_id` prefixado pelo documento (sem
+        colidir com as tabelas da LOA) e a tabela completa disponível em
+        `get_table`. Os índices em memória são reconstruídos no fim, sem
+        interromper as buscas.
 
-            try:
-                self.collection.add(
-                    documents=batch_docs,
-                    embeddings=batch_embeddings,
-                    metadatas=batch_metas,
-                    ids=batch_ids
-                )
-                total_inserted += len(batch_ids)
-                print(f"Batch {i // batch_size + 1}: {len(batch_ids)} chunks inseridos")
-            except Exception as e:
-                print(f"Erro ao inserir batch {i // batch_size + 1}: {e}")
+        Args:
+            path: Arquivo .pdf, .json (content_list) ou .md
+            document_id: Identificador estável do documento (ex: nome + hash)
 
-        print("=" * 60)
-        print(f"INDEXAÇÃO CONCLUÍDA: {total_inserted} chunks indexados")
-        print("=" * 60)
+        Returns:
+            Estatísticas da indexação
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Documento não encontrado: {path}")
+
+        source = os.path.basename(path)
+
+        def tag(chunk: LOAChunk) -> LOAChunk:
+            local_id = chunk.id[4:] if chunk.id.startswith("loa_") else chunk.id
+            chunk.id = f"doc_{document_id}_{local_id}"
+            chunk.metadata["document"] = document_id
+            chunk.metadata["source"] = source
+            if "table_id" in chunk.metadata:
+                chunk.metadata["table_id"] = f"{document_id}_{chunk.metadata['table_id']}"
+            return chunk
+
+        pipeline = IngestPipeline(self, batch_size=batch_size, queue_size=queue_size, dedup=False)
+        rows = [item for item in iter_items(load_content_list(path)) if isinstance(item, TableRow)] \
+            if path.lower().endswith(".json") else []
+
+        def chunks() -> Iterator[LOAChunk]:
+            for chunk in pipeline.iter_chunks(self.iter_document_pages(path)):
+                yield tag(chunk)
+            for unit in iter_row_units(rows):
+                yield tag(self._create_row_chunk(unit))
+
+        report = pipeline.run_chunks(chunks())
+        print(f"Documento {source}: {report['total_inserted']} chunks indexados ({document_id})")
+
+        if rows:
+            tables = json.loads(self.document_store.get_meta(self.DOCUMENT_TABLES_KEY) or "{}")
+            for table_id, table in TableIndex.collect(rows).items():
+                table_id = f"{document_id}_{table_id}"
+                tables[table_id] = {**table, "table_id": table_id, "document": document_id}
+            self.document_store.set_meta(self.DOCUMENT_TABLES_KEY, json.dumps(tables, ensure_ascii=False))
+
+        self.refresh_indexes()
+        self.document_store.bump_index_version()
 
         return {
-            "total_chunks": len(chunks),
-            "total_inserted": total_inserted,
-            "collection_name": "loa_2026",
-            "embedding_model": self.EMBEDDING_MODEL
+            "document": document_id,
+            "source": source,
+            "total_chunks": report["total_chunks"],
+            "total_inserted": report["total_inserted"],
+            "pipeline": report["pipeline"]
         }
 
     def search(
         self,
         query: str,
         n_results: int = 5,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        include_text: bool = True,
+        snippet_size: Optional[int] = None,
+        context_window: int = 0,
+        rerank: bool = False,
+        rerank_factor: Optional[int] = None,
+        rerank_budget_ms: Optional[float] = None,
+        use_router: bool = True
     ) -> Dict[str, Any]:
         """
         Busca documentos semanticamente.
@@ -402,55 +949,505 @@ class LOAVectorizer:
             query: Query de busca
             n_results: Número de resultados
             filters: Filtros opcionais para metadados
+            include_text: Se True, inclui o texto completo de cada chunk
+            snippet_size: Tamanho aproximado do snippet em caracteres
+            context_window: Número de chunks vizinhos (de cada lado) unidos a cada hit
+            rerank: Se True, busca n_results × rerank_factor candidatos e reordena localmente
+            rerank_factor: Fator de over-fetch para o reranking
+            rerank_budget_ms: Orçamento de latência do reranking (ms)
+            use_router: Se True, consultas diretas (página, programa, regional,
+                órgão) são atendidas pelos stores estruturados, sem embedding
 
         Returns:
             Resultados da busca
         """
-        # Gera embedding da query
-        query_embedding = self.get_embedding(query)
+        return self.search_batch(
+            [{"query": query, "n_results": n_results, "filters": filters}],
+            include_text=include_text,
+            snippet_size=snippet_size,
+            context_window=context_window,
+            rerank=rerank,
+            rerank_factor=rerank_factor,
+            rerank_budget_ms=rerank_budget_ms,
+            use_router=use_router
+        )[0]
+
+    def search_batch(
+        self,
+        queries: List[Dict[str, Any]],
+        include_text: bool = True,
+        snippet_size: Optional[int] = None,
+        context_window: int = 0,
+        rerank: bool = False,
+        rerank_factor: Optional[int] = None,
+        rerank_budget_ms: Optional[float] = None,
+        use_router: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Executa várias buscas com um único lote de embeddings.
+
+        Consultas diretas reconhecidas pelo roteador são atendidas sem
+        embedding; as demais queries com o mesmo filtro são resolvidas em uma
+        única consulta multi-query ao backend vetorial. Cada resposta indica
+        a rota usada em `route`.
+
+        Args:
+            queries: Dicts com query, n_results (opcional) e filters (opcional)
+            Demais argumentos: como em search(), aplicados a todas as queries
+
+        Returns:
+            Um resultado (no formato de search()) por query, na mesma ordem
+        """
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        fallbacks = set()
+        if use_router:
+            for index, item in enumerate(queries):
+                # Filtros explícitos pedem busca semântica filtrada
+                if item.get("filters"):
+                    continue
+                with span("router.classify") as current:
+                    route = self.router.classify(item["query"])
+                    current.set(route=route.kind)
+                if route.kind == "vector":
+                    continue
+                with span("router.lookup", route=route.kind):
+                    responses[index] = self._route_search(
+                        route,
+                        item["query"],
+                        n_results=item.get("n_results", 5),
+                        include_text=include_text,
+                        snippet_size=snippet_size,
+                        context_window=context_window
+                    )
+                if responses[index] is None:
+                    fallbacks.add(index)
+                else:
+                    self.router.record(route.kind)
+
+        pending = [index for index, response in enumerate(responses) if response is None]
+        if not pending:
+            return responses
+
+        with span("embed", queries=len(pending)) as current:
+            misses = self.query_embedding_cache.misses
+            try:
+                embeddings = dict(zip(pending, self.get_query_embeddings([queries[i]["query"] for i in pending])))
+            except ProviderUnavailable as e:
+                # Gemini indisponível: as queries já no cache seguem pela busca
+                # vetorial; as demais são atendidas pelo índice léxico na hora
+                current.set(degraded=e.reason)
+                embeddings = {}
+                for index in pending:
+                    embedding = self.query_embedding_cache.get(queries[index]["query"].strip())
+                    if embedding is not None:
+                        embeddings[index] = embedding
+                        continue
+                    with span("degraded.lexical"):
+                        responses[index] = self._degraded_search(
+                            queries[index],
+                            e.reason,
+                            include_text=include_text,
+                            snippet_size=snippet_size,
+                            context_window=context_window
+                        )
+                    self.router.record("lexical", fallback=index in fallbacks)
+                pending = list(embeddings)
+            current.set(cache_misses=self.query_embedding_cache.misses - misses)
+        for index in pending:
+            self.router.record("vector", fallback=index in fallbacks)
+        if not pending:
+            return responses
+        factor = (rerank_factor or self.RERANK_FACTOR) if rerank else 1
+
+        # Agrupa por filtro para aproveitar a consulta multi-query
+        groups: Dict[str, List[int]] = {}
+        for index in pending:
+            key = json.dumps(queries[index].get("filters"), sort_keys=True)
+            groups.setdefault(key, []).append(index)
+
+        for indices in groups.values():
+            fetch_k = max(queries[i].get("n_results", 5) for i in indices) * factor
+            with span("vector_store.query", backend=self.store.name, queries=len(indices), n_results=fetch_k):
+                results = self.store.query(
+                    query_embeddings=[embeddings[i] for i in indices],
+                    n_results=fetch_k,
+                    where=queries[indices[0]].get("filters")
+                )
+            for column, index in enumerate(indices):
+                limit = queries[index].get("n_results", 5) * factor
+                responses[index] = self._finalize(
+                    queries[index]["query"],
+                    self._candidates(results, column)[:limit],
+                    n_results=queries[index].get("n_results", 5),
+                    include_text=include_text,
+                    snippet_size=snippet_size,
+                    context_window=context_window,
+                    rerank=rerank,
+                    rerank_budget_ms=rerank_budget_ms
+                )
+                responses[index]["route"] = {"type": "vector"}
+
+        return responses
+
+    def _route_search(
+        self,
+        route: Route,
+        query: str,
+        n_results: int,
+        include_text: bool,
+        snippet_size: Optional[int],
+        context_window: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Atende uma query roteada pelos stores estruturados, sem embeddings.
+
+        Returns:
+            Resposta no formato de search(), ou None se a rota não encontrou
+            nada (a query então segue para a busca vetorial)
+        """
+        structured = None
+        if route.kind == "page":
+            chunks = self.document_store.get_pages(route.value)
+        elif route.kind == "program":
+            chunks = self._structured_lookup(
+                "program_code", route.value, [route.value],
+                prefer=re.compile(
+                    rf"PROGRAMA\s*N?[º°]?\s*{route.value}\b|^\s*{route.value}\b",
+                    re.IGNORECASE | re.MULTILINE
+                )
+            )
+        elif route.kind == "regional":
+            pattern = re.compile(rf"\bREGIONAL\s+0?{route.value}\b", re.IGNORECASE)
+            chunks = [
+                chunk for chunk in self._structured_lookup(
+                    "regional", route.value, ["regional", str(route.value)], prefer=pattern
+                )
+                if pattern.search(chunk["text"])
+            ]
+            view = self.regional_rollup.get(route.value)
+            if view is not None:
+                structured = {
+                    "regional": view["regional"],
+                    "total": view["total"],
+                    "total_subprodutos": view["total_subprodutos"],
+                    "orgaos": view["orgaos"][:5],
+                    "detail": f"/api/regionals/{route.value}"
+                }
+        else:
+            chunks = self._lexical_lookup(list(route.terms))
 
-        # Executa busca
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
+        if not chunks:
+            return None
+
+        candidates = [
+            {"id": chunk["id"], "text": chunk["text"], "metadata": chunk["metadata"],
+             "score": 1.0, "distance": 0.0}
+            for chunk in chunks[:n_results]
+        ]
+        response = self._finalize(
+            query,
+            candidates,
             n_results=n_results,
-            where=filters
+            include_text=include_text,
+            snippet_size=snippet_size,
+            context_window=context_window,
+            rerank=False,
+            rerank_budget_ms=None
         )
+        response["route"] = {"type": route.kind, "value": route.value}
+        if structured is not None:
+            response["structured"] = structured
+        return response
 
-        # Formata resultados
-        formatted_results = []
-        if results['documents'] and results['documents'][0]:
-            for i, (doc, meta, distance) in enumerate(zip(
-                results['documents'][0],
-                results['metadatas'][0],
-                results.get('distances', [[]])[0]
-            )):
-                formatted_results.append({
-                    "rank": i + 1,
+    def _degraded_search(
+        self,
+        item: Dict[str, Any],
+        reason: str,
+        include_text: bool,
+        snippet_size: Optional[int],
+        context_window: int
+    ) -> Dict[str, Any]:
+        """
+        Busca sem embedding, usada quando o provedor está indisponível.
+
+        Os chunks com algum termo da query são ranqueados por ocorrências ×
+        idf e os filtros são aplicados aos metadados; responde em
+        milissegundos, sem esperar o Gemini. A rota indica `degraded: true`.
+        """
+        query = item["query"]
+        n_results = item.get("n_results", 5)
+        filters = item.get("filters")
+        scores = self.lexical_index.match_any(self.lexical_index.query_terms(query))
+        ranked = sorted(scores, key=lambda chunk_id: (-scores[chunk_id], chunk_id))
+        best = scores[ranked[0]] if ranked else 1.0
+
+        candidates = []
+        for start in range(0, len(ranked), self.ROUTER_MAX_CANDIDATES):
+            for chunk in self.document_store.get_many(ranked[start:start + self.ROUTER_MAX_CANDIDATES]):
+                if filters and not match_where(chunk["metadata"], filters):
+                    continue
+                score = scores[chunk["id"]] / best
+                candidates.append({
+                    "id": chunk["id"], "text": chunk["text"], "metadata": chunk["metadata"],
+                    "score": score, "distance": 1 - score
+                })
+                if len(candidates) >= n_results:
+                    break
+            # Sem filtros, o primeiro bloco já tem os melhores candidatos
+            if len(candidates) >= n_results or not filters:
+                break
+
+        response = self._finalize(
+            query,
+            candidates,
+            n_results=n_results,
+            include_text=include_text,
+            snippet_size=snippet_size,
+            context_window=context_window,
+            rerank=False,
+            rerank_budget_ms=None
+        )
+        response["route"] = {"type": "lexical", "degraded": True, "reason": reason}
+        return response
+
+    def _lexical_lookup(self, terms: List[str], prefer: Optional[re.Pattern] = None) -> List[Dict[str, Any]]:
+        """
+        Chunks que contêm todos os termos, do maior para o menor número de
+        ocorrências; os que casam com `prefer` vêm primeiro.
+        """
+        matches = self.lexical_index.match_all([fold(term) for term in terms])
+        ranked = sorted(matches, key=lambda chunk_id: (-matches[chunk_id], chunk_id))
+        chunks = self.document_store.get_many(ranked[:self.ROUTER_MAX_CANDIDATES])
+        if prefer is not None:
+            chunks.sort(key=lambda chunk: prefer.search(chunk["text"]) is None)
+        return chunks
+
+    def _structured_lookup(
+        self,
+        field: str,
+        value: Any,
+        terms: List[str],
+        prefer: Optional[re.Pattern] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Chunks cujo metadado `field` é `value` (índice de metadados, em ordem
+        de página), seguidos dos que só mencionam os termos no texto.
+        """
+        tagged = self.metadata_index.select({field: [value]})[:self.ROUTER_MAX_CANDIDATES]
+        seen = set(tagged)
+        chunks = self.document_store.get_many(tagged)
+        chunks += [chunk for chunk in self._lexical_lookup(terms, prefer) if chunk["id"] not in seen]
+        return chunks
+
+    def browse(
+        self,
+        filters: Dict[str, List[Any]],
+        mode: str = "and",
+        page_start: Optional[int] = None,
+        page_end: Optional[int] = None,
+        offset: int = 0,
+        limit: int = 50,
+        include_text: bool = False,
+        preview_size: int = 240
+    ) -> Dict[str, Any]:
+        """
+        Lista chunks por metadados (programa, regional, seção, tipo, página).
+
+        Atendido só pelos índices invertidos e pelo store de documentos:
+        não gera embeddings nem consulta o índice vetorial.
+
+        Args:
+            filters: Campo -> valores aceitos (OR dentro do campo)
+            mode: "and" ou "or" entre campos
+            page_start: Página inicial (opcional)
+            page_end: Página final (opcional)
+            offset: Deslocamento na lista ordenada por página
+            limit: Máximo de chunks retornados
+            include_text: Inclui o texto completo (senão, um preview)
+            preview_size: Tamanho do preview em caracteres
+
+        Returns:
+            Dict com total, ids da página de resultados e chunks
+        """
+        start_time = time.perf_counter()
+        ids = self.metadata_index.select(filters, mode, page_start, page_end)
+        lookup_ms = (time.perf_counter() - start_time) * 1000
+
+        chunks = []
+        for chunk in self.document_store.get_many(ids[offset:offset + limit]):
+            item = {"id": chunk["id"], "page": chunk["metadata"].get("page"), "metadata": chunk["metadata"]}
+            if include_text:
+                item["text"] = chunk["text"]
+            else:
+                item["preview"] = chunk["text"][:preview_size]
+            chunks.append(item)
+
+        return {
+            "total": len(ids),
+            "offset": offset,
+            "limit": limit,
+            "mode": mode,
+            "filters": filters,
+            "lookup_ms": round(lookup_ms, 4),
+            "chunks": chunks
+        }
+
+    @staticmethod
+    def _candidates(results: Dict[str, Any], column: int) -> List[Dict[str, Any]]:
+        """Converte uma coluna do resultado do backend vetorial em candidatos."""
+        candidates = []
+        if results['documents'] and results['documents'][column]:
+            for chunk_id, doc, meta, distance in zip(
+                results['ids'][column],
+                results['documents'][column],
+                results['metadatas'][column],
+                results['distances'][column]
+            ):
+                candidates.append({
+                    "id": chunk_id,
                     "text": doc,
                     "metadata": meta,
                     "score": 1 - distance,  # Converte distância para similaridade
                     "distance": distance
                 })
+        return candidates
 
-        return {
+    def _finalize(
+        self,
+        query: str,
+        candidates: List[Dict[str, Any]],
+        n_results: int,
+        include_text: bool,
+        snippet_size: Optional[int],
+        context_window: int,
+        rerank: bool,
+        rerank_budget_ms: Optional[float]
+    ) -> Dict[str, Any]:
+        """Aplica reranking, snippets e expansão de contexto aos candidatos."""
+        rerank_info = None
+        if rerank and candidates:
+            with span("rerank", candidates=len(candidates)):
+                candidates, rerank_info = self.reranker.rerank(
+                    query,
+                    candidates,
+                    k=n_results,
+                    budget_ms=rerank_budget_ms if rerank_budget_ms is not None else self.RERANK_BUDGET_MS
+                )
+        candidates = candidates[:n_results]
+
+        with span("snippets", results=len(candidates)):
+            formatted_results = self._format_results(query, candidates, include_text, snippet_size)
+
+        if context_window > 0 and formatted_results:
+            with span("expand_context", window=context_window):
+                formatted_results = self._expand_context(formatted_results, context_window)
+
+        response = {
             "query": query,
             "total_results": len(formatted_results),
             "results": formatted_results
         }
+        if rerank_info is not None:
+            response["rerank"] = rerank_info
+        return response
+
+    def _format_results(
+        self,
+        query: str,
+        candidates: List[Dict[str, Any]],
+        include_text: bool,
+        snippet_size: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        """Monta os resultados com snippet, destaques e termos do glossário."""
+        formatted_results = []
+        for i, candidate in enumerate(candidates):
+            glossary_spans = self.glossary_for(candidate["id"], candidate["text"])
+            snippet = self.lexical_index.snippet(
+                candidate["id"], candidate["text"], query, size=snippet_size, annotations=glossary_spans
+            )
+            result = {
+                "rank": i + 1,
+                "id": candidate["id"],
+                "snippet": snippet["snippet"],
+                "highlights": snippet["highlights"],
+                "glossary": snippet["annotations"],
+                "metadata": candidate["metadata"],
+                "score": candidate["score"],
+                "distance": candidate["distance"]
+            }
+            if "rerank_score" in candidate:
+                result["rerank_score"] = candidate["rerank_score"]
+            if include_text:
+                result["text"] = candidate["text"]
+                result["text_glossary"] = glossary_spans
+            formatted_results.append(result)
+        return formatted_results
+
+    def _expand_context(self, results: List[Dict[str, Any]], window: int) -> List[Dict[str, Any]]:
+        """
+        Une cada hit aos chunks vizinhos usando o índice de adjacência.
+
+        Hits já contidos na passagem de um hit melhor ranqueado são descartados.
+        """
+        passages = self.adjacency.expand([r["id"] for r in results], window)
+        needed = [chunk_id for passage in passages for chunk_id in passage]
+        texts = {chunk["id"]: chunk for chunk in self.document_store.get_many(needed)}
+
+        expanded = []
+        for result, passage in zip(results, passages):
+            if not passage:
+                continue
+            chunks = [texts[chunk_id] for chunk_id in passage if chunk_id in texts]
+            result["context"] = {
+                "chunk_ids": [chunk["id"] for chunk in chunks],
+                "pages": sorted({chunk["metadata"].get("page") for chunk in chunks}),
+                "text": stitch([chunk["text"] for chunk in chunks])
+            }
+            result["rank"] = len(expanded) + 1
+            expanded.append(result)
+
+        return expanded
+
+    def get_chunk(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna o texto completo e os metadados de um chunk pelo ID.
+
+        Consulta apenas o store local (sem HNSW nem embeddings).
+
+        Args:
+            chunk_id: ID do chunk (ex: "loa_page_254_chunk_1")
+
+        Returns:
+            Dict com id, text e metadata, ou None se não existir
+        """
+        return self.document_store.get(chunk_id)
+
+    def get_pages(self, start_page: int, end_page: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Retorna todos os chunks de uma página ou intervalo de páginas.
+
+        Args:
+            start_page: Primeira página
+            end_page: Última página, inclusiva (opcional)
+
+        Returns:
+            Lista de chunks ordenados por página
+        """
+        return self.document_store.get_pages(start_page, end_page)
 
     def get_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas da coleção."""
         try:
-            count = self.collection.count()
+            count = self.store.count()
 
             # Obtém alguns exemplos para análise
-            sample = self.collection.get(limit=5, include=["metadatas"])
+            sample = self.store.peek(limit=5)
 
             # Analiza tipos de chunks
             chunk_types = {}
             sections = {}
-            if sample.get("metadatas"):
-                for meta in sample["metadatas"]:
+            if sample:
+                for meta in sample:
                     chunk_type = meta.get("chunk_type", "unknown")
                     chunk_types[chunk_type] = chunk_types.get(chunk_type, 0) + 1
                     section = meta.get("section", "unknown")
@@ -461,6 +1458,13 @@ class LOAVectorizer:
                 "total_documents": count,
                 "embedding_model": self.EMBEDDING_MODEL,
                 "embedding_dimension": self.EMBEDDING_DIMENSION,
+                "index_version": self.document_store.index_version(),
+                "vector_backend": self.store.name,
+                "vector_dimension": self.vector_dimension,
+                "vector_dtype": self.vector_dtype if self.store.name == "numpy" else "float32",
+                "vector_bytes": self.store.memory_bytes() if hasattr(self.store, "memory_bytes") else None,
+                "corpus": self.corpus.stats(),
+                "router": self.router.stats(),
                 "sample_chunk_types": chunk_types,
                 "sample_sections": sections
             }
@@ -470,16 +1474,22 @@ class LOAVectorizer:
     def clear_collection(self) -> Dict[str, Any]:
         """Limpa a coleção (cuidado: irreversível)."""
         try:
-            count_before = self.collection.count()
-            self.chroma_client.delete_collection("loa_2026")
-            self.collection = self.chroma_client.get_or_create_collection(
-                name="loa_2026",
-                metadata={
-                    "description": "LOA 2026 - Lei Orçamentária Anual de Fortaleza",
-                    "embedding_model": self.EMBEDDING_MODEL,
-                    "hnsw:space": "cosine"
-                }
-            )
+            count_before = self.store.count()
+            self.store.clear()
+            self.document_store.clear()
+            self.corpus = Corpus()
+            self.lexical_index.build([])
+            self.adjacency.build(self.corpus)
+            self.metadata_index.build(self.corpus)
+            self.regional_rollup.clear()
+            self.suggester.build([])
+            self._suggest_source = None
+            self.glossary_spans = []
+            self.document_store.set_meta(self.DOCUMENT_TABLES_KEY, "{}")
+            self.table_index.build([])
+            self.table_index.set_document_tables({})
+            self._table_source = None
+            self.document_store.bump_index_version()
             return {
                 "status": "cleared",
                 "documents_deleted": count_before
@@ -489,9 +1499,12 @@ class LOAVectorizer:
 
 
 # Funções de conveniência para uso direto
-def create_vectorizer(persist_dir: str = "./chroma_db") -> LOAVectorizer:
+def create_vectorizer(
+    persist_dir: str = "./chroma_db",
+    content_list_path: Optional[str] = None
+) -> LOAVectorizer:
     """Cria uma instância do vetorizador."""
-    return LOAVectorizer(persist_dir=persist_dir)
+    return LOAVectorizer(persist_dir=persist_dir, content_list_path=content_list_path)
 
 
 def index_loa_pdf(pdf_path: str) -> Dict[str, Any]:
@@ -547,4 +1560,4 @@ if __name__ == "__main__":
     for r in results['results'][:3]:
         print(f"\n[Score: {r['score']:.3f}] Página {r['metadata'].get('page', '?')}")
         print(f"Tipo: {r['metadata'].get('chunk_type', 'N/A')}")
-        print(f"Texto: {r['text'][:200]}...")
+        print(f"Trecho: {r['snippet']}")
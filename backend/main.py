@@ -6,17 +6,32 @@ de Fortaleza 2026 usando embeddings do Google Gemini e ChromaDB.
 """
 
 import os
+import json
+import time
 import asyncio
+import threading
 from typing import List, Optional, Dict, Any
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, Query, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query, BackgroundTasks, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
 from pydantic import BaseModel, Field
 import uvicorn
 
 from loa_vectorizer import LOAVectorizer, create_vectorizer
+from answering import AnswerService
+from profiling import Profiler, ProfilingMiddleware, span
+from serialization import FastJSONResponse, CompressionMiddleware
+from http_cache import IndexETagMiddleware
+from query_log import QueryLog, QUERY_LOG_FILE, top_queries as logged_top_queries
+from suggest import KINDS as SUGGEST_KINDS
+from warmup import Warmup
+from watcher import IngestWatcher, INGEST_STATE_FILE
+from snapshot import (
+    export_snapshot, import_snapshot, list_snapshots, snapshot_name,
+    SnapshotError, SNAPSHOT_SUFFIX
+)
 
 
 # Configurações
@@ -45,26 +60,98 @@ PDF_PATH = os.path.join(
     "Arquivo completo LOA 2026",
     "LOA-2026-numerado.pdf"
 )
+CONTENT_LIST_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "Arquivo completo LOA 2026",
+    "Dados LOA 2026",
+    "LOA-2026 (1)_content_list.json"
+)
 CHROMA_PERSIST_DIR = os.path.join(
     os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
     "chroma_db"
 )
 
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "snapshots"
+)
+
+# Snapshot carregado na inicialização quando a coleção está vazia (opcional)
+SNAPSHOT_BOOTSTRAP = os.getenv("SNAPSHOT_BOOTSTRAP")
+
+# Pasta monitorada para decretos e emendas (.pdf, .json, .md)
+INGEST_DIR = os.getenv("INGEST_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "ingest"
+)
+
+# Log de queries persistido (usado pelo aquecimento na inicialização)
+QUERY_LOG_PATH = os.path.join(CHROMA_PERSIST_DIR, QUERY_LOG_FILE)
+
+# Queries do log usadas para ponderar o ranking do /api/suggest
+SUGGEST_POPULARITY_QUERIES = 1000
+
+# Limite de páginas por requisição em /api/pages
+MAX_PAGE_RANGE = 50
+
+# Limite de queries por requisição em /api/search/batch
+MAX_BATCH_QUERIES = 50
+
 
 # Instância global do vetorizador
 vectorizer: Optional[LOAVectorizer] = None
+answer_service: Optional[AnswerService] = None
 indexing_status: Dict[str, Any] = {
     "is_indexing": False,
     "progress": 0,
     "message": "",
     "last_error": None
 }
+warmup = Warmup(query_log_path=QUERY_LOG_PATH)
+warmup_task: Optional[asyncio.Task] = None
+query_log = QueryLog(QUERY_LOG_PATH)
+query_log_task: Optional[asyncio.Task] = None
+# Um escritor do índice por vez: reindexação, restauração de snapshot, limpeza
+# e a ingestão da pasta monitorada
+index_write_lock = threading.Lock()
+ingest_watcher = IngestWatcher(INGEST_DIR, os.path.join(CHROMA_PERSIST_DIR, INGEST_STATE_FILE), lock=index_write_lock)
+ingest_task: Optional[asyncio.Task] = None
+
+
+def acquire_index_writer() -> None:
+    """Reserva a escrita no índice ou responde 409 se outro escritor está ativo."""
+    if not index_write_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Índice em atualização (ingestão de documento em andamento); tente após a conclusão")
+
+
+async def watch_ingest_dir():
+    """Verifica a pasta de ingestão periodicamente e indexa os documentos novos fora do event loop."""
+    while True:
+        await asyncio.sleep(ingest_watcher.poll_interval)
+        # Não concorre com reindexação ou restauração de snapshot (run_once
+        # também pula a rodada se outro escritor tem o index_write_lock)
+        if vectorizer is None or indexing_status["is_indexing"]:
+            continue
+        try:
+            await asyncio.to_thread(ingest_watcher.run_once, vectorizer)
+        except Exception as e:
+            print(f"Erro ao verificar a pasta de ingestão: {e}")
+
+
+async def flush_query_log_periodically():
+    """Grava o buffer do log de queries em lotes, fora do event loop."""
+    while True:
+        await asyncio.sleep(query_log.flush_interval)
+        try:
+            await asyncio.to_thread(query_log.flush)
+        except Exception as e:
+            print(f"Erro ao gravar log de queries: {e}")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gerencia o ciclo de vida da aplicação."""
-    global vectorizer
+    global vectorizer, answer_service, warmup_task, query_log_task, ingest_task
 
     # Startup
     print("=" * 60)
@@ -72,21 +159,56 @@ async def lifespan(app: FastAPI):
     print("=" * 60)
 
     try:
-        vectorizer = create_vectorizer(persist_dir=CHROMA_PERSIST_DIR)
+        vectorizer = create_vectorizer(persist_dir=CHROMA_PERSIST_DIR, content_list_path=CONTENT_LIST_PATH)
         stats = vectorizer.get_stats()
         doc_count = stats.get("total_documents", 0)
 
         print(f"Coleção 'loa_2026' carregada: {doc_count} documentos")
 
+        if doc_count == 0 and SNAPSHOT_BOOTSTRAP:
+            if os.path.exists(SNAPSHOT_BOOTSTRAP):
+                print(f"Restaurando snapshot {SNAPSHOT_BOOTSTRAP}...")
+                restored = import_snapshot(vectorizer, SNAPSHOT_BOOTSTRAP)
+                doc_count = restored["chunks"]
+            else:
+                print(f"ATENÇÃO: SNAPSHOT_BOOTSTRAP não encontrado: {SNAPSHOT_BOOTSTRAP}")
+
+        index_stats = vectorizer.refresh_indexes()
+        print(f"Índice léxico: {index_stats['lexical_terms']} termos")
+        ingest_watcher.reconcile(vectorizer)
+        vectorizer.suggester.set_popularity(logged_top_queries(QUERY_LOG_PATH, SUGGEST_POPULARITY_QUERIES))
+        print(f"Autocompletar: {index_stats['suggest_entities']} entidades")
+        if index_stats["regional_rollup"] is None:
+            print(f"ATENÇÃO: content_list não encontrado em {CONTENT_LIST_PATH}; /api/regionals indisponível.")
+
+        try:
+            answer_service = AnswerService(vectorizer)
+            print(f"Respostas (/api/answer): backend '{answer_service.llm.name}'")
+        except Exception as e:
+            print(f"ATENÇÃO: /api/answer indisponível: {e}")
+            answer_service = None
+
         if doc_count == 0:
             print("ATENÇÃO: Coleção vazia. Use POST /api/reindex para indexar o PDF.")
+            warmup.status = "ready"
         else:
-            print("API pronta para consultas!")
+            # Aquece índice e caches em background; /api/health responde
+            # "warming" (503) até terminar
+            print(f"Aquecendo índice e caches (top {warmup.top_n} queries)...")
+            warmup_task = asyncio.create_task(asyncio.to_thread(warmup.run, vectorizer))
 
     except Exception as e:
         print(f"ERRO ao iniciar vetorizador: {e}")
         print("A API iniciará mas as funções de busca estarão indisponíveis.")
         vectorizer = None
+        warmup.status = "failed"
+
+    query_log_task = asyncio.create_task(flush_query_log_periodically())
+
+    if ingest_watcher.enabled:
+        os.makedirs(INGEST_DIR, exist_ok=True)
+        ingest_task = asyncio.create_task(watch_ingest_dir())
+        print(f"Pasta de ingestão monitorada: {INGEST_DIR} (a cada {ingest_watcher.poll_interval:.0f}s)")
 
     print("=" * 60)
 
@@ -94,6 +216,12 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     print("Encerrando API...")
+    query_log_task.cancel()
+    if ingest_task is not None:
+        ingest_task.cancel()
+    query_log.flush()
+    if warmup_task is not None and not warmup_task.done():
+        await warmup_task
 
 
 # Cria a aplicação FastAPI
@@ -101,7 +229,8 @@ app = FastAPI(
     title=API_TITLE,
     version=API_VERSION,
     description=API_DESCRIPTION,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configura CORS
@@ -113,6 +242,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def current_index_version() -> Optional[str]:
+    """Versão do índice para os ETags (None durante indexação/restauração)."""
+    if vectorizer is None or indexing_status["is_indexing"]:
+        return None
+    return vectorizer.document_store.index_version()
+
+
+# ETag com a versão do índice nas leituras; 304 sem executar o endpoint
+CACHEABLE_PREFIXES = ("/api/search", "/api/suggest", "/api/chunks", "/api/tables", "/api/pages", "/api/browse", "/api/regionals")
+PRIVATE_PREFIXES = ("/api/admin", "/api/debug", "/api/indexing-status", "/api/health", "/api/stats")
+app.add_middleware(
+    IndexETagMiddleware,
+    get_version=current_index_version,
+    cacheable=CACHEABLE_PREFIXES,
+    private=PRIVATE_PREFIXES
+)
+
+# Compressão brotli/gzip negociada para respostas acima de COMPRESSION_MIN_SIZE bytes
+app.add_middleware(CompressionMiddleware)
+
+# Perfil opcional por requisição: header X-Debug-Profile com o valor de
+# DEBUG_PROFILE_TOKEN ou amostragem com PROFILE_SAMPLE_RATE (desligado por padrão)
+PROFILED_PREFIXES = ("/api/search", "/api/browse", "/api/answer")
+profiler = Profiler()
+app.add_middleware(ProfilingMiddleware, profiler=profiler, prefixes=PROFILED_PREFIXES)
+
 
 # Modelos Pydantic para request/response
 
@@ -124,6 +279,63 @@ class SearchRequest(BaseModel):
         None,
         description="Filtros opcionais (ex: {'section': 'RECEITA'})"
     )
+    include_text: bool = Field(
+        False,
+        description="Inclui o texto completo de cada chunk (por padrão retorna apenas o snippet)"
+    )
+    snippet_size: int = Field(240, description="Tamanho aproximado do snippet em caracteres", ge=60, le=1000)
+    context_window: int = Field(
+        0,
+        description="Número de chunks vizinhos (de cada lado) unidos a cada resultado",
+        ge=0,
+        le=5
+    )
+    rerank: bool = Field(False, description="Aplica reranking local sobre os candidatos do HNSW")
+    rerank_factor: int = Field(4, description="Fator de over-fetch de candidatos para o reranking", ge=1, le=10)
+    rerank_budget_ms: float = Field(
+        50.0,
+        description="Orçamento de latência do reranking em ms (estourado, mantém a ordem original)",
+        gt=0,
+        le=1000
+    )
+    use_router: bool = Field(
+        True,
+        description="Atende consultas diretas (página, programa, regional, órgão) sem busca vetorial"
+    )
+
+
+class SuggestResponse(BaseModel):
+    """Modelo para resposta do autocompletar."""
+    query: str
+    suggestions: List[Dict[str, Any]]
+    took_ms: float
+
+
+class BatchQuery(BaseModel):
+    """Uma query dentro de uma busca em lote."""
+    query: str = Field(..., description="Query de busca em linguagem natural", min_length=1)
+    n_results: int = Field(5, description="Número de resultados a retornar", ge=1, le=20)
+    filters: Optional[Dict[str, Any]] = Field(None, description="Filtros opcionais desta query")
+
+
+class BatchSearchRequest(BaseModel):
+    """Modelo para requisição de busca em lote."""
+    queries: List[BatchQuery] = Field(..., description="Queries a executar", min_length=1)
+    include_text: bool = Field(False, description="Inclui o texto completo de cada chunk")
+    snippet_size: int = Field(240, description="Tamanho aproximado do snippet em caracteres", ge=60, le=1000)
+    context_window: int = Field(0, description="Chunks vizinhos unidos a cada resultado", ge=0, le=5)
+    rerank: bool = Field(False, description="Aplica reranking local sobre os candidatos")
+    use_router: bool = Field(True, description="Atende consultas diretas sem busca vetorial")
+
+
+class AnswerRequest(BaseModel):
+    """Modelo para requisição de resposta fundamentada."""
+    question: str = Field(..., description="Pergunta em linguagem natural", min_length=1)
+    n_results: int = Field(8, description="Número de trechos recuperados", ge=1, le=20)
+    filters: Optional[Dict[str, Any]] = Field(None, description="Filtros opcionais da busca")
+    token_budget: int = Field(1500, description="Orçamento de tokens do contexto no prompt", ge=200, le=8000)
+    max_output_tokens: int = Field(512, description="Máximo de tokens da resposta", ge=32, le=2048)
+    stream: bool = Field(True, description="Resposta em streaming (Server-Sent Events)")
 
 
 class SearchResponse(BaseModel):
@@ -131,6 +343,15 @@ class SearchResponse(BaseModel):
     query: str
     total_results: int
     results: List[Dict[str, Any]]
+    rerank: Optional[Dict[str, Any]] = None
+    route: Optional[Dict[str, Any]] = None
+    structured: Optional[Dict[str, Any]] = None
+
+
+class BatchSearchResponse(BaseModel):
+    """Modelo para resposta de busca em lote."""
+    total_queries: int
+    results: List[SearchResponse]
 
 
 class ReindexResponse(BaseModel):
@@ -145,6 +366,9 @@ class StatsResponse(BaseModel):
     total_documents: int
     embedding_model: str
     embedding_dimension: int
+    index_version: Optional[str] = None
+    router: Optional[Dict[str, Any]] = None
+    answer: Optional[Dict[str, Any]] = None
 
 
 class HealthResponse(BaseModel):
@@ -153,15 +377,69 @@ class HealthResponse(BaseModel):
     collection_loaded: bool
     total_documents: Optional[int] = None
     api_version: str
+    warmup: Optional[Dict[str, Any]] = None
+    embedding_provider: Optional[Dict[str, Any]] = None
 
 
 class SearchResult(BaseModel):
     """Modelo para um resultado de busca."""
     rank: int
-    text: str
+    id: str
+    snippet: str
+    highlights: List[List[int]]
+    glossary: List[Dict[str, Any]] = []
     metadata: Dict[str, Any]
     score: float
     distance: float
+    text: Optional[str] = None
+    text_glossary: Optional[List[Dict[str, Any]]] = None
+
+
+class RegionalResponse(BaseModel):
+    """Modelo para os totais pré-calculados de uma regional."""
+    regional: int
+    name: str
+    total: float
+    total_subprodutos: float
+    orgaos: List[Dict[str, Any]]
+    funcoes_programas: List[Dict[str, Any]]
+    acoes: List[Dict[str, Any]]
+    pages: List[int]
+
+
+class BrowseResponse(BaseModel):
+    """Modelo para a listagem de chunks por metadados."""
+    total: int
+    offset: int
+    limit: int
+    mode: str
+    filters: Dict[str, List[str]]
+    lookup_ms: float
+    chunks: List[Dict[str, Any]]
+
+
+class ChunkResponse(BaseModel):
+    """Modelo para um chunk completo."""
+    id: str
+    text: str
+    metadata: Dict[str, Any]
+
+
+class TableResponse(BaseModel):
+    """Modelo para uma tabela completa do content_list."""
+    table_id: str
+    page: int
+    caption: str
+    headers: List[str]
+    rows: List[Dict[str, Any]]
+
+
+class PageResponse(BaseModel):
+    """Modelo para os chunks de uma página ou intervalo de páginas."""
+    start_page: int
+    end_page: int
+    total_chunks: int
+    chunks: List[ChunkResponse]
 
 
 # Endpoints
@@ -175,9 +453,20 @@ async def root():
         "description": "API de busca semântica na LOA 2026 de Fortaleza",
         "endpoints": {
             "search": "/api/search",
+            "search_batch": "/api/search/batch",
+            "answer": "/api/answer",
+            "chunks": "/api/chunks/{chunk_id}",
+            "tables": "/api/tables/{table_id}",
+            "pages": "/api/pages/{page}",
+            "browse": "/api/browse",
+            "suggest": "/api/suggest",
+            "regionals": "/api/regionals/{n}",
             "stats": "/api/stats",
             "health": "/api/health",
             "reindex": "/api/reindex",
+            "snapshots": "/api/admin/snapshots",
+            "top_queries": "/api/admin/top-queries",
+            "ingest": "/api/admin/ingest",
             "docs": "/docs"
         }
     }
@@ -189,6 +478,13 @@ async def health_check():
     Verifica a saúde da API.
 
     Retorna informações sobre o estado da coleção e se a API está funcionando.
+    Enquanto o aquecimento inicial (índice e cache de queries) não termina,
+    responde 503 com `status: "warming"`.
+
+    `embedding_provider` traz o circuit breaker do Gemini (`state`: closed,
+    open ou half_open, falhas seguidas, tempo até o próximo teste e
+    contadores). Com o circuito aberto o status é `degraded`: a API continua
+    respondendo, com buscas atendidas pelo índice léxico ou pelo cache.
     """
     if vectorizer is None:
         return HealthResponse(
@@ -199,12 +495,23 @@ async def health_check():
 
     try:
         stats = vectorizer.get_stats()
-        return HealthResponse(
-            status="healthy",
+        provider = vectorizer.embedding_provider.stats()
+        if not warmup.ready:
+            status = "warming"
+        else:
+            status = "healthy" if provider["state"] == "closed" else "degraded"
+        health = HealthResponse(
+            status=status,
             collection_loaded=True,
             total_documents=stats.get("total_documents", 0),
-            api_version=API_VERSION
+            api_version=API_VERSION,
+            warmup=warmup.stats(),
+            embedding_provider=provider
         )
+        if not warmup.ready:
+            # Readiness: o balanceador só envia tráfego após o aquecimento
+            return FastJSONResponse(health.model_dump(), status_code=503)
+        return health
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao verificar saúde: {e}")
 
@@ -229,7 +536,10 @@ async def get_stats():
             collection_name=stats.get("collection_name", "loa_2026"),
             total_documents=stats.get("total_documents", 0),
             embedding_model=stats.get("embedding_model", "unknown"),
-            embedding_dimension=stats.get("embedding_dimension", 768)
+            embedding_dimension=stats.get("embedding_dimension", 768),
+            index_version=stats.get("index_version"),
+            router=stats.get("router"),
+            answer=answer_service.stats() if answer_service else None
         )
     except HTTPException:
         raise
@@ -237,6 +547,47 @@ async def get_stats():
         raise HTTPException(status_code=500, detail=f"Erro ao buscar estatísticas: {e}")
 
 
+def search_payload(query: str, results: Dict[str, Any]) -> Dict[str, Any]:
+    """Corpo de SearchResponse montado direto do resultado do vetorizador."""
+    return {
+        "query": query,
+        "total_results": results.get("total_results", 0),
+        "results": results.get("results", []),
+        "rerank": results.get("rerank"),
+        "route": results.get("route"),
+        "structured": results.get("structured")
+    }
+
+
+def degraded_headers(*results: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Respostas degradadas (sem embedding) não devem ficar no cache HTTP."""
+    if any((result.get("route") or {}).get("degraded") for result in results):
+        return {"Cache-Control": "no-store"}
+    return None
+
+
+def log_query(
+    query: str,
+    results: Dict[str, Any],
+    started: float,
+    filters: Optional[Dict[str, Any]],
+    cache_status: str,
+    endpoint: str = "search"
+) -> None:
+    """Registra a busca no ring buffer do log de queries (sem I/O)."""
+    route = (results.get("route") or {}).get("type", "vector")
+    query_log.record(
+        query=query,
+        latency_ms=(time.perf_counter() - started) * 1000,
+        total_results=results.get("total_results", 0),
+        filters=filters,
+        route=route,
+        # Rotas diretas não usam embedding
+        cache=cache_status if route == "vector" else None,
+        endpoint=endpoint
+    )
+
+
 @app.post("/api/search", response_model=SearchResponse, tags=["Search"])
 async def search(request: SearchRequest):
     """
@@ -256,10 +607,41 @@ async def search(request: SearchRequest):
     ## Filtros disponíveis:
 
     - `section`: RECEITA, DESPESA, INVESTIMENTO, GERAL
-    - `chunk_type`: texto, tabela, projeto, programa, regional
+    - `chunk_type`: texto, tabela, projeto, programa, regional, linha_tabela
     - `page`: Número da página específica
     - `program_code`: Código do programa (ex: "0042")
     - `regional`: "Regional 1", "Regional 2", etc.
+
+    Cada resultado traz um `snippet` com os trechos que contêm os termos da
+    query e os offsets de destaque em `highlights`. O texto completo pode ser
+    obtido com `include_text: true` ou via `GET /api/chunks/{id}`.
+
+    `glossary` lista os termos do glossário presentes no snippet
+    (`{id, start, end}`, offsets relativos ao snippet); com `include_text`,
+    `text_glossary` traz os mesmos spans sobre o texto completo. Os spans são
+    calculados na indexação, então o cliente só precisa renderizá-los.
+
+    Com `context_window: N`, cada resultado inclui em `context` a passagem
+    formada pelo chunk e seus N vizinhos de cada lado (sem repetir chunks
+    entre resultados).
+
+    Com `rerank: true`, são buscados `n_results × rerank_factor` candidatos,
+    reordenados localmente (sobreposição de termos, código de programa,
+    números e penalidade para quase-duplicatas) e cortados em `n_results`.
+    Se `rerank_budget_ms` estourar, a ordem do HNSW é mantida.
+
+    Consultas diretas como "programa 2125", "quanto para Regional 5",
+    "página 254" ou o nome de um órgão são atendidas pelos stores
+    estruturados, sem embedding (`route.type` indica a rota; para regionais,
+    `structured` traz os totais pré-calculados). Use `use_router: false`
+    para forçar a busca semântica.
+
+    Se o Gemini estiver lento, fora do ar ou recusar a chamada (prazo
+    `EMBED_QUERY_DEADLINE` estourado, circuito aberto ou erro como chave
+    inválida), queries já no cache seguem pela busca
+    vetorial e as demais são atendidas pelo índice léxico, com
+    `route: {"type": "lexical", "degraded": true, "reason": ...}` e
+    `Cache-Control: no-store`.
     """
     if vectorizer is None:
         raise HTTPException(
@@ -271,17 +653,28 @@ async def search(request: SearchRequest):
         raise HTTPException(status_code=400, detail="Query não pode ser vazia")
 
     try:
-        results = vectorizer.search(
-            query=request.query,
-            n_results=request.n_results,
-            filters=request.filters
-        )
-
-        return SearchResponse(
-            query=request.query,
-            total_results=results.get("total_results", 0),
-            results=results.get("results", [])
-        )
+        started = time.perf_counter()
+        cache_status = "hit" if request.query.strip() in vectorizer.query_embedding_cache else "miss"
+        with span("vectorizer.search"):
+            results = vectorizer.search(
+                query=request.query,
+                n_results=request.n_results,
+                filters=request.filters,
+                include_text=request.include_text,
+                snippet_size=request.snippet_size,
+                context_window=request.context_window,
+                rerank=request.rerank,
+                rerank_factor=request.rerank_factor,
+                rerank_budget_ms=request.rerank_budget_ms,
+                use_router=request.use_router
+            )
+
+        log_query(request.query, results, started, request.filters, cache_status)
+
+        # Os resultados já saem do vetorizador no formato de SearchResponse;
+        # devolver a resposta pronta evita revalidá-los pelo pydantic.
+        with span("response_model"):
+            return FastJSONResponse(search_payload(request.query, results), headers=degraded_headers(results))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na busca: {e}")
 
@@ -291,7 +684,10 @@ async def search_get(
     query: str = Query(..., description="Query de busca"),
     n_results: int = Query(5, ge=1, le=20, description="Número de resultados"),
     section: Optional[str] = Query(None, description="Filtro por seção"),
-    chunk_type: Optional[str] = Query(None, description="Filtro por tipo de chunk")
+    chunk_type: Optional[str] = Query(None, description="Filtro por tipo de chunk"),
+    include_text: bool = Query(False, description="Inclui o texto completo dos chunks"),
+    context_window: int = Query(0, ge=0, le=5, description="Chunks vizinhos unidos a cada resultado"),
+    rerank: bool = Query(False, description="Aplica reranking local")
 ):
     """
     Realiza busca semântica via GET (mais fácil para testes).
@@ -309,10 +705,395 @@ async def search_get(
     return await search(SearchRequest(
         query=query,
         n_results=n_results,
-        filters=filters if filters else None
+        filters=filters if filters else None,
+        include_text=include_text,
+        context_window=context_window,
+        rerank=rerank
     ))
 
 
+@app.post("/api/search/batch", response_model=BatchSearchResponse, tags=["Search"])
+async def search_batch(request: BatchSearchRequest):
+    """
+    Executa várias buscas em uma única requisição.
+
+    Todas as queries são convertidas em embeddings em um único lote e as
+    que compartilham o mesmo filtro são resolvidas em uma só consulta
+    multi-query ao índice vetorial.
+
+    ## Exemplo de uso:
+
+    ```
+    POST /api/search/batch
+    {
+        "queries": [
+            {"query": "Regional 1 saúde", "n_results": 5},
+            {"query": "Regional 1 educação", "n_results": 5},
+            {"query": "investimentos obras", "filters": {"regional": "Regional 2"}}
+        ]
+    }
+    ```
+    """
+    if vectorizer is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Vetorizador não disponível. Verifique se o GEMINI_API_KEY está configurado."
+        )
+
+    if len(request.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {MAX_BATCH_QUERIES} queries por requisição"
+        )
+
+    if any(not item.query.strip() for item in request.queries):
+        raise HTTPException(status_code=400, detail="Query não pode ser vazia")
+
+    try:
+        started = time.perf_counter()
+        cache_status = [
+            "hit" if item.query.strip() in vectorizer.query_embedding_cache else "miss"
+            for item in request.queries
+        ]
+        with span("vectorizer.search_batch", queries=len(request.queries)):
+            batch = vectorizer.search_batch(
+                [item.model_dump() for item in request.queries],
+                include_text=request.include_text,
+                snippet_size=request.snippet_size,
+                context_window=request.context_window,
+                rerank=request.rerank,
+                use_router=request.use_router
+            )
+
+        for item, result, cache in zip(request.queries, batch, cache_status):
+            log_query(item.query, result, started, item.filters, cache, endpoint="batch")
+
+        with span("response_model"):
+            return FastJSONResponse({
+                "total_queries": len(batch),
+                "results": [search_payload(result["query"], result) for result in batch]
+            }, headers=degraded_headers(*batch))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro na busca em lote: {e}")
+
+
+@app.post("/api/answer", tags=["Search"])
+async def answer(request: AnswerRequest):
+    """
+    Responde a pergunta com base nos trechos da LOA, citando os chunks.
+
+    Os hits da busca são empacotados no prompt sob `token_budget` (sem
+    quase-duplicatas, com vizinhos unidos e tabelas compactadas) e a
+    resposta é gerada pelo backend configurado em `ANSWER_BACKEND`.
+
+    Com `stream: true` (padrão) a resposta é um stream SSE com os eventos:
+
+    - `sources`: trechos usados no contexto (enviado antes da geração)
+    - `token`: pedaço da resposta
+    - `done`: citações (`[id do chunk]` encontrados na resposta) e métricas
+      (`ttft_ms`, `prompt_tokens`, `completion_tokens`...)
+    - `error`: falha durante a geração
+
+    ## Exemplo:
+
+    ```
+    POST /api/answer
+    {"question": "Quanto a LOA prevê para o programa Infância Viva?"}
+    ```
+    """
+    if vectorizer is None or answer_service is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Serviço de respostas não disponível. Verifique se o GEMINI_API_KEY está configurado."
+        )
+
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="Pergunta não pode ser vazia")
+
+    options = {
+        "n_results": request.n_results,
+        "filters": request.filters,
+        "token_budget": request.token_budget,
+        "max_output_tokens": request.max_output_tokens
+    }
+
+    if not request.stream:
+        try:
+            return await asyncio.to_thread(answer_service.answer, request.question, **options)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Erro ao gerar resposta: {e}")
+
+    def event_stream():
+        try:
+            for event in answer_service.stream_answer(request.question, **options):
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            error = {"type": "error", "detail": str(e)}
+            yield f"event: error\ndata: {json.dumps(error, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Sem buffer no proxy, para o primeiro token chegar assim que gerado
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/chunks/{chunk_id}", response_model=ChunkResponse, tags=["Search"])
+async def get_chunk(chunk_id: str):
+    """
+    Retorna o texto completo de um chunk pelo ID.
+
+    ## Exemplo:
+
+    `/api/chunks/loa_page_254_chunk_1`
+    """
+    if vectorizer is None:
+        raise HTTPException(status_code=503, detail="Vetorizador não disponível")
+
+    chunk = vectorizer.get_chunk(chunk_id)
+    if chunk is None:
+        raise HTTPException(status_code=404, detail=f"Chunk não encontrado: {chunk_id}")
+
+    return ChunkResponse(**chunk)
+
+
+@app.get("/api/tables/{table_id}", response_model=TableResponse, tags=["Search"])
+async def get_table(table_id: str):
+    """
+    Retorna a tabela completa de onde veio um resultado `linha_tabela`.
+
+    Resultados de linha de tabela trazem em `metadata` o `table_id` e as
+    linhas cobertas (`row_start`/`row_end`); este endpoint devolve a tabela
+    inteira para exibir a linha no contexto.
+
+    ## Exemplo:
+
+    `/api/tables/p13_t0`
+    """
+    if vectorizer is None:
+        raise HTTPException(status_code=503, detail="Vetorizador não disponível")
+
+    table = vectorizer.get_table(table_id)
+    if table is None:
+        raise HTTPException(status_code=404, detail=f"Tabela não encontrada: {table_id}")
+
+    return TableResponse(**table)
+
+
+@app.get("/api/pages/{page}", response_model=PageResponse, tags=["Search"])
+async def get_page(
+    page: int,
+    end: Optional[int] = Query(None, description="Última página do intervalo (inclusiva)")
+):
+    """
+    Retorna todos os chunks de uma página ou de um intervalo de páginas.
+
+    ## Exemplos:
+
+    - `/api/pages/254`
+    - `/api/pages/250?end=260`
+    """
+    if vectorizer is None:
+        raise HTTPException(status_code=503, detail="Vetorizador não disponível")
+
+    end_page = page if end is None else end
+    if page < 1 or end_page < page:
+        raise HTTPException(status_code=400, detail="Intervalo de páginas inválido")
+    if end_page - page + 1 > MAX_PAGE_RANGE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Intervalo máximo de {MAX_PAGE_RANGE} páginas por requisição"
+        )
+
+    chunks = vectorizer.get_pages(page, end_page)
+    return PageResponse(
+        start_page=page,
+        end_page=end_page,
+        total_chunks=len(chunks),
+        chunks=[ChunkResponse(**chunk) for chunk in chunks]
+    )
+
+
+@app.get("/api/browse", response_model=BrowseResponse, tags=["Search"])
+async def browse(
+    program_code: Optional[List[str]] = Query(None, description="Código(s) de programa"),
+    regional: Optional[List[str]] = Query(None, description="Regional(is), 1 a 12"),
+    section: Optional[List[str]] = Query(None, description="Seção (RECEITA, DESPESA, ...)"),
+    chunk_type: Optional[List[str]] = Query(None, description="Tipo de chunk (tabela, texto, ...)"),
+    page: Optional[List[int]] = Query(None, description="Página(s) exata(s)"),
+    document: Optional[List[str]] = Query(None, description="Documento(s) ingerido(s) pela pasta monitorada"),
+    mode: str = Query("and", description="Combinação entre campos: and ou or"),
+    page_start: Optional[int] = Query(None, ge=1, description="Página inicial"),
+    page_end: Optional[int] = Query(None, ge=1, description="Página final (inclusiva)"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    include_text: bool = Query(False, description="Inclui o texto completo de cada chunk")
+):
+    """
+    Lista chunks por metadados, em ordem de página, sem busca semântica.
+
+    Atendido pelos índices invertidos em memória (valor -> chunks): não gera
+    embedding nem consulta o índice vetorial. Valores repetidos ou separados
+    por vírgula no mesmo campo são combinados com OR; campos diferentes com
+    `mode` (and/or).
+
+    ## Exemplos:
+
+    - `/api/browse?program_code=2123`
+    - `/api/browse?regional=5&section=DESPESA`
+    - `/api/browse?program_code=2123,2125&regional=5&mode=or`
+    - `/api/browse?section=RECEITA&page_start=70&page_end=90`
+    """
+    if vectorizer is None:
+        raise HTTPException(status_code=503, detail="Vetorizador não disponível")
+
+    filters = {}
+    for field, values in (
+        ("program_code", program_code),
+        ("regional", regional),
+        ("section", section),
+        ("chunk_type", chunk_type),
+        ("page", page),
+        ("document", document),
+    ):
+        if values:
+            filters[field] = [
+                part.strip() for value in values for part in str(value).split(",") if part.strip()
+            ]
+
+    if not filters and page_start is None and page_end is None:
+        raise HTTPException(status_code=400, detail="Informe ao menos um filtro")
+    if page_start is not None and page_end is not None and page_end < page_start:
+        raise HTTPException(status_code=400, detail="Intervalo de páginas inválido")
+
+    try:
+        return vectorizer.browse(
+            filters,
+            mode=mode,
+            page_start=page_start,
+            page_end=page_end,
+            offset=offset,
+            limit=limit,
+            include_text=include_text
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/suggest", response_model=SuggestResponse, tags=["Search"])
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=200, description="Texto digitado"),
+    limit: int = Query(8, ge=1, le=20, description="Máximo de sugestões"),
+    kind: Optional[str] = Query(
+        None,
+        description="Tipos separados por vírgula: programa, orgao, unidade, acao, regional"
+    )
+):
+    """
+    Autocompletar de programas, órgãos, unidades orçamentárias, ações e
+    regionais, para usar a cada tecla (sem embedding nem busca vetorial).
+
+    A comparação ignora acentos e caixa e aceita o começo de qualquer
+    palavra do nome (`gonzaga` sugere "HOSPITAL DISTRITAL GONZAGA MOTA").
+    As sugestões são ordenadas pela frequência no documento e nas consultas.
+
+    ## Exemplo:
+
+    `/api/suggest?q=infancia vi`
+    """
+    if vectorizer is None:
+        raise HTTPException(status_code=503, detail="Vetorizador não disponível")
+
+    kinds = [value.strip() for value in kind.split(",") if value.strip()] if kind else None
+    if kinds:
+        unknown = set(kinds) - set(SUGGEST_KINDS)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Tipos inválidos: {', '.join(sorted(unknown))} (use {', '.join(SUGGEST_KINDS)})"
+            )
+
+    return FastJSONResponse(vectorizer.suggest(q, limit=limit, kinds=kinds))
+
+
+@app.get("/api/regionals", tags=["Regionais"])
+async def list_regionals():
+    """Retorna o total de cada regional (1 a 12)."""
+    if vectorizer is None:
+        raise HTTPException(status_code=503, detail="Vetorizador não disponível")
+
+    return {"regionals": vectorizer.regional_rollup.summary()}
+
+
+@app.get("/api/regionals/{n}", response_model=RegionalResponse, tags=["Regionais"])
+async def get_regional(n: int):
+    """
+    Retorna os totais pré-calculados de uma regional.
+
+    Os agregados são montados na indexação a partir das tabelas da LOA e
+    servidos da memória, sem busca semântica:
+
+    - `total`: total da tabela "Regionalização das Aplicações por Órgão"
+    - `orgaos`: valor aplicado por órgão na regional
+    - `funcoes_programas`: subprodutos por função × programa (onde a LOA os rotula)
+    - `acoes`: subprodutos por unidade orçamentária × ação
+
+    Cada agregado traz as páginas de origem em `pages`.
+
+    ## Exemplo:
+
+    `/api/regionals/8`
+    """
+    if vectorizer is None:
+        raise HTTPException(status_code=503, detail="Vetorizador não disponível")
+
+    if not 1 <= n <= 12:
+        raise HTTPException(status_code=400, detail="Regional deve estar entre 1 e 12")
+
+    view = vectorizer.get_regional(n)
+    if view is None:
+        raise HTTPException(status_code=404, detail=f"Agregados da Regional {n} não disponíveis")
+
+    return RegionalResponse(**view)
+
+
+def require_profile_access(token: Optional[str]) -> None:
+    """Com DEBUG_PROFILE_TOKEN configurado, os perfis exigem o mesmo header."""
+    if profiler.token and token != profiler.token:
+        raise HTTPException(status_code=403, detail="Header X-Debug-Profile inválido")
+
+
+@app.get("/api/debug/profiles", tags=["Admin"])
+async def list_profiles(
+    limit: int = Query(20, ge=1, le=100),
+    x_debug_profile: Optional[str] = Header(None)
+):
+    """
+    Lista os perfis de requisição mais recentes (ring buffer em memória).
+
+    Uma requisição de busca é perfilada quando traz o header
+    `X-Debug-Profile: <DEBUG_PROFILE_TOKEN>` ou é sorteada pela taxa
+    `PROFILE_SAMPLE_RATE`; a resposta dela traz `X-Profile-Id`.
+    """
+    require_profile_access(x_debug_profile)
+    return {"profiler": profiler.stats(), "profiles": profiler.list(limit)}
+
+
+@app.get("/api/debug/profiles/{profile_id}", tags=["Admin"])
+async def get_profile(profile_id: int, x_debug_profile: Optional[str] = Header(None)):
+    """
+    Retorna a árvore de spans de um perfil: roteador, embedding, consulta
+    ao backend vetorial, reranking, snippets, expansão de contexto e
+    montagem da resposta, cada um com início e duração em ms.
+    """
+    require_profile_access(x_debug_profile)
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Perfil não encontrado: {profile_id}")
+    return profile
+
+
 @app.post("/api/reindex", response_model=ReindexResponse, tags=["Admin"])
 async def reindex(background_tasks: BackgroundTasks):
     """
@@ -321,7 +1102,8 @@ async def reindex(background_tasks: BackgroundTasks):
     **ATENÇÃO**: Esta operação pode levar vários minutos dependendo do tamanho do PDF.
     A operação é executada em background.
 
-    Verifique o progresso com GET /api/indexing-status.
+    Verifique o progresso com GET /api/indexing-status. Responde 409 durante a
+    ingestão de um documento da pasta monitorada.
     """
     global indexing_status
 
@@ -337,6 +1119,9 @@ async def reindex(background_tasks: BackgroundTasks):
             message=f"PDF não encontrado em: {PDF_PATH}"
         )
 
+    # Liberado por run_indexing ao terminar
+    acquire_index_writer()
+
     # Inicia indexação em background
     background_tasks.add_task(run_indexing)
 
@@ -364,10 +1149,13 @@ async def clear_collection():
     if vectorizer is None:
         raise HTTPException(status_code=503, detail="Vetorizador não disponível")
 
+    acquire_index_writer()
     try:
         result = vectorizer.clear_collection()
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
+        # Decretos removidos da coleção voltam a ser ingeridos da pasta
+        await asyncio.to_thread(ingest_watcher.reconcile, vectorizer)
 
         return {
             "status": "success",
@@ -377,12 +1165,125 @@ async def clear_collection():
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao limpar coleção: {e}")
+    finally:
+        index_write_lock.release()
+
+
+@app.get("/api/admin/top-queries", tags=["Admin"])
+async def top_queries(
+    limit: int = Query(20, ge=1, le=200, description="Itens por lista"),
+    since_hours: Optional[float] = Query(None, gt=0, description="Considera só as últimas N horas")
+):
+    """
+    Consultas mais frequentes, consultas sem resultado e consultas mais
+    lentas, a partir do log de queries (gravado e ainda em buffer).
+    """
+    since = time.time() - since_hours * 3600 if since_hours else None
+    report = await asyncio.to_thread(query_log.analyze, limit, since)
+    return {**report, "log": query_log.stats()}
+
+
+@app.get("/api/admin/ingest", tags=["Admin"])
+async def get_ingest_status():
+    """
+    Status da pasta de ingestão (INGEST_DIR) e de cada arquivo.
+
+    Arquivos .pdf, .json (content_list) e .md colocados na pasta são
+    indexados em background, sem interromper as buscas. Status por arquivo:
+    `debouncing` (aguardando a cópia terminar), `queued`, `indexing`,
+    `indexed`, `already_indexed` (mesmo conteúdo já indexado) ou `failed`.
+    Os chunks de cada documento podem ser filtrados por `document`.
+    """
+    return ingest_watcher.stats()
+
+
+def snapshot_path(name: str) -> str:
+    """Caminho de um snapshot em SNAPSHOT_DIR (rejeita nomes com diretório)."""
+    if os.path.basename(name) != name or not name.endswith(SNAPSHOT_SUFFIX):
+        raise HTTPException(status_code=400, detail=f"Nome de snapshot inválido: {name}")
+    path = os.path.join(SNAPSHOT_DIR, name)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"Snapshot {name} não encontrado")
+    return path
+
+
+@app.post("/api/admin/snapshots", tags=["Admin"])
+async def create_snapshot():
+    """
+    Exporta o índice atual (documentos, vetores e rollup) para um snapshot
+    versionado em SNAPSHOT_DIR.
+    """
+    if vectorizer is None:
+        raise HTTPException(status_code=503, detail="Vetorizador não disponível")
+    if indexing_status["is_indexing"]:
+        raise HTTPException(status_code=409, detail="Indexação em andamento; tente após a conclusão")
+
+    out_path = os.path.join(SNAPSHOT_DIR, snapshot_name())
+    try:
+        return await asyncio.to_thread(export_snapshot, vectorizer, out_path)
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/admin/snapshots", tags=["Admin"])
+async def get_snapshots():
+    """Lista os snapshots disponíveis (mais recentes primeiro)."""
+    return {"directory": SNAPSHOT_DIR, "snapshots": list_snapshots(SNAPSHOT_DIR)}
+
+
+@app.get("/api/admin/snapshots/{name}", tags=["Admin"])
+async def download_snapshot(name: str):
+    """Baixa um snapshot (para restaurar em outra réplica)."""
+    return FileResponse(snapshot_path(name), media_type="application/gzip", filename=name)
+
+
+@app.post("/api/admin/snapshots/{name}/restore", tags=["Admin"])
+async def restore_snapshot(name: str):
+    """
+    Substitui o índice atual pelo conteúdo do snapshot.
+
+    Os checksums do manifest são conferidos antes de qualquer alteração.
+    Responde 409 durante uma indexação ou ingestão da pasta monitorada.
+    """
+    global indexing_status
+
+    if vectorizer is None:
+        raise HTTPException(status_code=503, detail="Vetorizador não disponível")
+    if indexing_status["is_indexing"]:
+        raise HTTPException(status_code=409, detail="Indexação em andamento; tente após a conclusão")
+
+    path = snapshot_path(name)
+    acquire_index_writer()
+    indexing_status = {
+        "is_indexing": True,
+        "progress": 0,
+        "message": f"Restaurando snapshot {name}...",
+        "last_error": None
+    }
+    try:
+        result = await asyncio.to_thread(import_snapshot, vectorizer, path)
+        await asyncio.to_thread(ingest_watcher.reconcile, vectorizer)
+        indexing_status["progress"] = 100
+        indexing_status["message"] = "Snapshot restaurado com sucesso!"
+        indexing_status["result"] = result
+        return result
+    except SnapshotError as e:
+        indexing_status["last_error"] = str(e)
+        indexing_status["message"] = "Erro ao restaurar snapshot"
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        indexing_status["last_error"] = str(e)
+        indexing_status["message"] = "Erro ao restaurar snapshot"
+        raise HTTPException(status_code=500, detail=f"Erro ao restaurar snapshot: {e}")
+    finally:
+        indexing_status["is_indexing"] = False
+        index_write_lock.release()
 
 
 # Função para executar indexação em background
 async def run_indexing():
     """Executa a indexação do PDF em background."""
-    global indexing_status, vectorizer
+    global indexing_status, vectorizer, answer_service
 
     indexing_status = {
         "is_indexing": True,
@@ -392,13 +1293,21 @@ async def run_indexing():
     }
 
     try:
-        # Recria vetorizador para garantir estado limpo
-        vectorizer = create_vectorizer(persist_dir=CHROMA_PERSIST_DIR)
+        # Reindexa na instância em uso: as buscas seguem com os índices atuais
+        # (atualizados por refresh_indexes no fim do index_pdf) e o circuit
+        # breaker, o cache de embeddings e a popularidade do autocompletar
+        # são mantidos
+        if vectorizer is None:
+            vectorizer = create_vectorizer(persist_dir=CHROMA_PERSIST_DIR, content_list_path=CONTENT_LIST_PATH)
+            vectorizer.refresh_indexes()
+            if answer_service is not None:
+                answer_service = AnswerService(vectorizer, llm=answer_service.llm)
 
         # Verifica se PDF existe
         if not os.path.exists(PDF_PATH):
             indexing_status["last_error"] = f"PDF não encontrado: {PDF_PATH}"
             indexing_status["is_indexing"] = False
+            index_write_lock.release()
             return
 
         # Executa indexação
@@ -415,9 +1324,9 @@ async def run_indexing():
                 indexing_status["message"] = "Erro na indexação"
             finally:
                 indexing_status["is_indexing"] = False
+                index_write_lock.release()
 
         # Executa em thread separada pois index_pdf é síncrono e demorado
-        import threading
         thread = threading.Thread(target=index_in_thread)
         thread.start()
 
@@ -425,6 +1334,7 @@ async def run_indexing():
         indexing_status["last_error"] = str(e)
         indexing_status["is_indexing"] = False
         indexing_status["message"] = "Erro ao iniciar indexação"
+        index_write_lock.release()
 
 
 # Tratamento de erros global
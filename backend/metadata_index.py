@@ -0,0 +1,143 @@
+"""
+Índices invertidos de metadados da LOA 2026.
+
+Para cada campo filtrável (programa, regional, seção, tipo de chunk, página)
+mantém o mapa valor -> lista ordenada de chunks. Consultas do tipo "todos os
+chunks do programa 2123" são respondidas com interseções/uniões dessas
+listas, sem embeddings e sem passar pelo índice vetorial.
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Iterable, Optional, Sequence
+
+from corpus import Corpus
+
+FILTER_FIELDS = ("program_code", "regional", "section", "chunk_type", "page", "document")
+
+
+class MetadataIndex:
+    """
+    Listas invertidas valor -> posições de chunk ordenadas por (página, chunk_index).
+
+    Os chunks são identificados pela posição no corpus compartilhado (na
+    ordem do documento); cada lista é um array de posições ordenadas, então o
+    resultado de qualquer combinação de filtros já sai em ordem de página.
+    """
+
+    def __init__(self, fields: Iterable[str] = FILTER_FIELDS):
+        self.fields = tuple(fields)
+        self.ids: List[str] = []
+        self.pages = array("i")
+        self.postings: Dict[str, Dict[str, array]] = {field: {} for field in self.fields}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _key(field: str, value: Any) -> str:
+        """Normaliza o valor: maiúsculo; regional só pelo número ("Regional 05" -> "5")."""
+        key = str(value).strip().upper()
+        if field == "regional":
+            digits = re.search(r"\d+", key)
+            if digits:
+                return str(int(digits.group()))
+        return key
+
+    def build(self, corpus: Corpus) -> "MetadataIndex":
+        """
+        Reconstrói os índices a partir do corpus.
+
+        As posições são as do próprio corpus, que deve estar na ordem do
+        documento (como em `DocumentStore.iter_chunks`).
+        """
+        postings = {field: {} for field in self.fields}
+        for field in self.fields:
+            # Chave normalizada calculada uma vez por valor distinto
+            keys: Dict[Any, str] = {}
+            for position, value in enumerate(corpus.column(field)):
+                if value is None or value == "":
+                    continue
+                try:
+                    key = keys.get(value)
+                except TypeError:
+                    continue
+                if key is None:
+                    key = keys[value] = self._key(field, value)
+                positions = postings[field].get(key)
+                if positions is None:
+                    positions = postings[field][key] = array("i")
+                positions.append(position)
+        pages = array("i", (int(page or 0) for page in corpus.column("page")))
+        # Troca no fim: buscas concorrentes continuam lendo o índice anterior
+        self.ids, self.pages, self.postings = corpus.ids, pages, postings
+        return self
+
+    def lookup(self, field: str, value: Any) -> Sequence[int]:
+        """Posições dos chunks com `field == value` (ordenadas)."""
+        return self.postings.get(field, {}).get(self._key(field, value), ())
+
+    def page_range(self, start: Optional[int], end: Optional[int]) -> range:
+        """Posições dos chunks entre as páginas start e end (inclusive)."""
+        low = bisect_left(self.pages, start) if start is not None else 0
+        high = bisect_right(self.pages, end) if end is not None else len(self.pages)
+        return range(low, high)
+
+    def select(
+        self,
+        filters: Dict[str, List[Any]],
+        mode: str = "and",
+        page_start: Optional[int] = None,
+        page_end: Optional[int] = None
+    ) -> List[str]:
+        """
+        IDs dos chunks que atendem os filtros, em ordem de página.
+
+        Args:
+            filters: Campo -> valores aceitos (OR dentro do campo)
+            mode: "and" (todos os campos) ou "or" (qualquer campo)
+            page_start: Página inicial (restringe o resultado)
+            page_end: Página final (restringe o resultado)
+
+        Returns:
+            IDs ordenados por (página, chunk_index)
+        """
+        if mode not in ("and", "or"):
+            raise ValueError(f"Modo inválido: {mode} (use 'and' ou 'or')")
+        unknown = set(filters) - set(self.fields)
+        if unknown:
+            raise ValueError(f"Campos não indexados: {', '.join(sorted(unknown))}")
+
+        groups = []
+        for field, values in filters.items():
+            positions = set()
+            for value in values:
+                positions.update(self.lookup(field, value))
+            groups.append(positions)
+
+        if groups:
+            groups.sort(key=len)
+            if mode == "and":
+                selected = groups[0].intersection(*groups[1:])
+            else:
+                selected = set().union(*groups)
+        else:
+            selected = None
+
+        bounds = self.page_range(page_start, page_end)
+        if selected is None:
+            positions = bounds
+        else:
+            positions = sorted(p for p in selected if bounds.start <= p < bounds.stop)
+        return [self.ids[position] for position in positions]
+
+    def values(self, field: str) -> Dict[str, int]:
+        """Valores indexados de um campo com o número de chunks."""
+        return {value: len(positions) for value, positions in self.postings.get(field, {}).items()}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chunks": len(self.ids),
+            "distinct_values": {field: len(self.postings[field]) for field in self.fields}
+        }
@@ -0,0 +1,233 @@
+"""
+Perfil opcional por requisição (árvore de spans).
+
+Uma requisição é perfilada quando traz o header de admin ou cai na taxa de
+amostragem. Durante ela, `span("nome")` registra início, duração e
+atributos de cada etapa em uma árvore guardada em uma contextvar; ao fim, o
+perfil vai para um ring buffer consultável em `/api/debug/profiles`.
+
+Sem perfil ativo, `span()` só lê a contextvar e devolve um context manager
+vazio compartilhado, então o custo no caminho da busca é desprezível.
+"""
+
+import os
+import time
+import random
+import itertools
+import threading
+from collections import deque
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional
+
+
+class Span:
+    """Etapa cronometrada, com atributos e sub-etapas."""
+
+    __slots__ = ("name", "attrs", "start", "end", "children", "_token")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+        self._token = None
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _current_span.reset(self._token)
+
+    def set(self, **attrs: Any) -> None:
+        """Acrescenta atributos ao span."""
+        self.attrs.update(attrs)
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.perf_counter()
+        node = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+        }
+        if self.attrs:
+            node["attrs"] = self.attrs
+        if self.children:
+            node["children"] = [child.to_dict(origin) for child in self.children]
+        return node
+
+
+class _NoopSpan:
+    """Span usado quando a requisição não está sendo perfilada."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    def set(self, **attrs: Any) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+_current_span: ContextVar[Optional[Span]] = ContextVar("loa_profile_span", default=None)
+
+
+def span(name: str, **attrs: Any):
+    """
+    Abre um span filho do span atual (no-op se não houver perfil ativo).
+
+    Uso:
+        with span("embed", queries=3):
+            ...
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return _NOOP
+    child = Span(name, attrs)
+    parent.children.append(child)
+    return child
+
+
+class Profiler:
+    """Decide quais requisições perfilar e guarda os últimos perfis."""
+
+    HEADER = "X-Debug-Profile"
+    BUFFER_SIZE = 100
+
+    def __init__(
+        self,
+        sample_rate: Optional[float] = None,
+        token: Optional[str] = None,
+        buffer_size: Optional[int] = None
+    ):
+        """
+        Args:
+            sample_rate: Fração das requisições perfiladas (padrão:
+                PROFILE_SAMPLE_RATE ou 0)
+            token: Valor do header de admin que força o perfil (padrão:
+                DEBUG_PROFILE_TOKEN; sem token, o header é ignorado)
+            buffer_size: Número de perfis mantidos
+        """
+        self.sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0") if sample_rate is None else sample_rate)
+        self.token = os.getenv("DEBUG_PROFILE_TOKEN") if token is None else token
+        self.profiles: deque = deque(maxlen=buffer_size or self.BUFFER_SIZE)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """False quando nenhuma requisição pode ser perfilada (sem token e taxa zero)."""
+        return bool(self.token) or self.sample_rate > 0
+
+    def authorized(self, header_value: Optional[str]) -> bool:
+        """True se o header traz o token de admin configurado."""
+        return bool(self.token) and header_value == self.token
+
+    def should_profile(self, header_value: Optional[str]) -> bool:
+        if self.authorized(header_value):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, name: str, **attrs: Any) -> Span:
+        """Cria o span raiz de uma requisição (usar com `with`)."""
+        return Span(name, attrs)
+
+    def next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def record(self, root: Span, reason: str, profile_id: Optional[int] = None) -> int:
+        """Guarda o perfil de uma requisição concluída e retorna seu id."""
+        if profile_id is None:
+            profile_id = self.next_id()
+        with self._lock:
+            self.profiles.append({
+                "id": profile_id,
+                "reason": reason,
+                "timestamp": time.time(),
+                "duration_ms": round(((root.end or time.perf_counter()) - root.start) * 1000, 3),
+                "tree": root.to_dict(root.start),
+            })
+        return profile_id
+
+    def list(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Perfis mais recentes primeiro (só o resumo da raiz)."""
+        with self._lock:
+            recent = list(self.profiles)[-limit:][::-1]
+        return [
+            {key: profile[key] for key in ("id", "reason", "timestamp", "duration_ms")}
+            | {"name": profile["tree"]["name"], "attrs": profile["tree"].get("attrs", {})}
+            for profile in recent
+        ]
+
+    def get(self, profile_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for profile in self.profiles:
+                if profile["id"] == profile_id:
+                    return profile
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "header_enabled": bool(self.token),
+            "stored": len(self.profiles),
+            "capacity": self.profiles.maxlen,
+        }
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI que perfila as requisições escolhidas pelo Profiler.
+
+    Só olha caminho e header; requisições não perfiladas seguem direto para
+    a aplicação. As perfiladas recebem o header `X-Profile-Id`.
+    """
+
+    def __init__(self, app, profiler: Profiler, prefixes: tuple = ("/api/",)):
+        self.app = app
+        self.profiler = profiler
+        self.prefixes = tuple(prefixes)
+        self.header = profiler.HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if (not self.profiler.enabled or scope["type"] != "http"
+                or not scope["path"].startswith(self.prefixes)):
+            await self.app(scope, receive, send)
+            return
+
+        header_value = None
+        for name, value in scope.get("headers", ()):
+            if name == self.header:
+                header_value = value.decode("latin-1")
+                break
+        if not self.profiler.should_profile(header_value):
+            await self.app(scope, receive, send)
+            return
+
+        reason = "header" if self.profiler.authorized(header_value) else "sampled"
+        profile_id = self.profiler.next_id()
+        query = scope.get("query_string", b"").decode("latin-1")
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                root.set(status=message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", str(profile_id).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with self.profiler.start(f"{scope['method']} {scope['path']}", query=query) as root:
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                root.end = time.perf_counter()
+                self.profiler.record(root, reason, profile_id)
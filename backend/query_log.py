@@ -0,0 +1,259 @@
+"""
+Log persistido das consultas feitas à API.
+
+O log é um arquivo JSONL comprimido com gzip (`query_log.jsonl.gz`, ao lado
+do banco): cada linha registra uma busca (query, filtros, latência, número
+de resultados, rota e status do cache de embeddings). Novos lotes são
+acrescentados como membros gzip independentes, que o `gzip.open` lê em
+sequência como um único arquivo.
+
+No caminho da requisição, `QueryLog.record` só acrescenta um dict a um ring
+buffer (`deque` com tamanho máximo); uma tarefa em background chama `flush`
+periodicamente e grava o lote fora do event loop. Se o disco não
+acompanhar, as entradas mais antigas do buffer são descartadas em vez de
+atrasar as buscas.
+
+Quando o arquivo passa de `max_bytes`, ele é rotacionado
+(`query_log.jsonl.gz.1`, `.2`, ... até `backups`), então as leituras do log
+(análises, popularidade do autocompletar, warmup) têm custo limitado.
+"""
+
+import os
+import gzip
+import json
+import time
+import heapq
+import itertools
+import threading
+from collections import Counter, deque
+from typing import List, Dict, Any, Iterator, Optional
+
+QUERY_LOG_FILE = "query_log.jsonl.gz"
+
+
+def log_paths(path: str) -> List[str]:
+    """Arquivos existentes do log, do mais antigo (rotacionado) ao atual."""
+    paths = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        paths.append(f"{path}.{index}")
+        index += 1
+    paths.reverse()
+    if os.path.exists(path):
+        paths.append(path)
+    return paths
+
+
+def iter_entries(path: str) -> Iterator[Dict[str, Any]]:
+    """Itera sobre as entradas do log, rotacionados incluídos (ignora linhas e finais truncados)."""
+    for log_path in log_paths(path):
+        yield from _iter_file(log_path)
+
+
+def _iter_file(path: str) -> Iterator[Dict[str, Any]]:
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+    except (EOFError, OSError):
+        # Último lote gravado pela metade (ex: processo interrompido)
+        return
+
+
+def normalize_query(query: str) -> str:
+    """Chave de agregação: espaços colapsados e minúsculas."""
+    return " ".join(query.split()).lower()
+
+
+def top_queries(path: str, limit: int = 100) -> List[Dict[str, Any]]:
+    """
+    Queries mais frequentes do log.
+
+    Returns:
+        Dicts com query (na grafia mais recente) e count, do mais frequente
+    """
+    counts: Counter = Counter()
+    spelling: Dict[str, str] = {}
+    for entry in iter_entries(path):
+        query = entry.get("query")
+        if not query:
+            continue
+        key = normalize_query(query)
+        counts[key] += 1
+        spelling[key] = query.strip()
+    return [{"query": spelling[key], "count": count} for key, count in counts.most_common(limit)]
+
+
+class QueryLog:
+    """Ring buffer de consultas com gravação em lote no log gzip."""
+
+    CAPACITY = 10000
+    FLUSH_INTERVAL = 5.0
+    MAX_BYTES = 8 * 1024 * 1024
+    BACKUPS = 1
+
+    def __init__(
+        self,
+        path: str,
+        capacity: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        backups: Optional[int] = None
+    ):
+        """
+        Args:
+            path: Arquivo do log (QUERY_LOG_FILE)
+            capacity: Entradas mantidas no buffer entre gravações
+            flush_interval: Segundos entre gravações (padrão: QUERY_LOG_FLUSH_INTERVAL ou 5)
+            max_bytes: Tamanho que dispara a rotação (padrão: QUERY_LOG_MAX_BYTES ou 8 MB)
+            backups: Arquivos rotacionados mantidos (padrão: QUERY_LOG_BACKUPS ou 1)
+        """
+        self.path = path
+        self.capacity = capacity or self.CAPACITY
+        self.flush_interval = float(
+            os.getenv("QUERY_LOG_FLUSH_INTERVAL", str(self.FLUSH_INTERVAL)) if flush_interval is None else flush_interval
+        )
+        self.max_bytes = int(os.getenv("QUERY_LOG_MAX_BYTES", str(self.MAX_BYTES)) if max_bytes is None else max_bytes)
+        self.backups = max(0, int(os.getenv("QUERY_LOG_BACKUPS", str(self.BACKUPS)) if backups is None else backups))
+        self.buffer: deque = deque(maxlen=self.capacity)
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.rotations = 0
+        self._flush_lock = threading.Lock()
+        # Protege o buffer: record roda no event loop, drain/analyze em threads
+        self._buffer_lock = threading.Lock()
+
+    def record(
+        self,
+        query: str,
+        latency_ms: float,
+        total_results: int,
+        filters: Optional[Dict[str, Any]] = None,
+        route: Optional[str] = None,
+        cache: Optional[str] = None,
+        endpoint: str = "search"
+    ) -> None:
+        """Registra uma consulta (O(1), sem I/O)."""
+        entry = {
+            "ts": time.time(),
+            "query": query,
+            "filters": filters or None,
+            "latency_ms": round(latency_ms, 2),
+            "total_results": total_results,
+            "route": route,
+            "cache": cache,
+            "endpoint": endpoint,
+        }
+        with self._buffer_lock:
+            if len(self.buffer) == self.capacity:
+                self.dropped += 1
+            self.recorded += 1
+            self.buffer.append(entry)
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Retira todas as entradas do buffer."""
+        with self._buffer_lock:
+            entries = list(self.buffer)
+            self.buffer.clear()
+        return entries
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Cópia das entradas ainda não gravadas."""
+        with self._buffer_lock:
+            return list(self.buffer)
+
+    def flush(self) -> int:
+        """Grava o buffer como um novo membro gzip (chamar fora do event loop)."""
+        with self._flush_lock:
+            entries = self.drain()
+            if not entries:
+                return 0
+            data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(data)
+            self.flushed += len(entries)
+            if os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+            return len(entries)
+
+    def _rotate(self) -> None:
+        """query_log.jsonl.gz -> .1 -> .2 ...; o mais antigo além de `backups` é descartado."""
+        if self.backups == 0:
+            os.remove(self.path)
+        else:
+            for index in range(self.backups, 0, -1):
+                source = self.path if index == 1 else f"{self.path}.{index - 1}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index}")
+        self.rotations += 1
+
+    def analyze(self, limit: int = 20, since: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Top queries, queries sem resultado e consultas mais lentas.
+
+        Lê o log gravado (rotacionados incluídos) e o que ainda está no buffer.
+
+        Args:
+            limit: Itens por lista
+            since: Considera só entradas com ts >= since (epoch)
+        """
+        counts: Counter = Counter()
+        zero_hits: Counter = Counter()
+        spelling: Dict[str, str] = {}
+        slowest: List[tuple] = []
+        latencies: List[float] = []
+        total = 0
+
+        for entry in itertools.chain(iter_entries(self.path), self.pending()):
+            query = entry.get("query")
+            if not query or (since is not None and entry.get("ts", 0) < since):
+                continue
+            total += 1
+            key = normalize_query(query)
+            counts[key] += 1
+            spelling[key] = query.strip()
+            if entry.get("total_results") == 0:
+                zero_hits[key] += 1
+            latency = entry.get("latency_ms") or 0.0
+            latencies.append(latency)
+            item = (latency, total, entry)
+            if len(slowest) < limit:
+                heapq.heappush(slowest, item)
+            elif latency > slowest[0][0]:
+                heapq.heapreplace(slowest, item)
+
+        latencies.sort()
+        return {
+            "total_queries": total,
+            "distinct_queries": len(counts),
+            "latency_p50_ms": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else None,
+            "top_queries": [{"query": spelling[key], "count": count} for key, count in counts.most_common(limit)],
+            "zero_hit_queries": [{"query": spelling[key], "count": count} for key, count in zero_hits.most_common(limit)],
+            "slowest_queries": [
+                {key: entry.get(key) for key in ("query", "latency_ms", "total_results", "route", "cache", "ts")}
+                for _, _, entry in sorted(slowest, key=lambda item: item[0], reverse=True)
+            ],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "bytes": sum(os.stat(path).st_size for path in log_paths(self.path) if os.path.exists(path)),
+            "max_bytes": self.max_bytes,
+            "backups": self.backups,
+            "rotations": self.rotations,
+            "buffered": len(self.buffer),
+            "capacity": self.capacity,
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flush_interval_s": self.flush_interval,
+        }
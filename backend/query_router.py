@@ -0,0 +1,129 @@
+"""
+Roteador de queries da busca.
+
+Muitas perguntas do chat são consultas diretas ("programa 2125", "quanto
+para Regional 5", "página 254", "secretaria da saúde") que não precisam de
+embedding nem de busca vetorial. O roteador reconhece esses casos com
+padrões pré-compilados e um gazetteer de órgãos e os encaminha para os
+stores estruturados; o restante segue para a busca semântica.
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterable, Tuple
+
+from lexical_index import fold, tokenize, STOPWORDS
+
+
+@dataclass
+class Route:
+    """Destino de uma query: page, program, regional, orgao ou vector."""
+    kind: str
+    value: Any = None
+    terms: Tuple[str, ...] = ()
+
+
+class QueryRouter:
+    """
+    Classifica queries em consultas estruturadas ou semânticas.
+
+    Uma query só é roteada se, removidos a entidade reconhecida, stopwords e
+    palavras de intenção ("quanto", "valor", "orçamento"...), não sobrar
+    nenhum termo: "regional 5 obras de saúde" continua na busca vetorial.
+    """
+
+    KINDS = ("page", "program", "regional", "orgao", "vector")
+
+    # Aplicados sobre o texto normalizado (minúsculo, sem acentos)
+    PAGE_PATTERN = re.compile(r"\b(?:pagina|pag|pg|p)\.?\s*(\d{1,4})\b")
+    PROGRAM_PATTERN = re.compile(r"\bprograma\s*(?:n[o.]?\s*)?(\d{4})\b")
+    REGIONAL_PATTERN = re.compile(r"\b(?:regional|sr|ser)\s*(\d{1,2})\b")
+    CODE_ONLY_PATTERN = re.compile(r"^\s*(\d{4})\s*$")
+
+    INTENT_WORDS = {
+        "quanto", "quantos", "valor", "valores", "total", "totais", "orcamento",
+        "orcado", "previsto", "prevista", "recursos", "recurso", "gasto", "gastos",
+        "investimento", "investimentos", "verba", "dinheiro", "vai", "tem", "ha",
+        "mostrar", "mostre", "ver", "loa", "2026", "r",
+    }
+
+    MAX_REGIONAL = 12
+
+    def __init__(self):
+        self.gazetteer: List[Tuple[frozenset, str]] = []
+        self.counts: Dict[str, int] = dict.fromkeys(self.KINDS, 0)
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def set_gazetteer(self, names: Iterable[str]) -> "QueryRouter":
+        """
+        Define os nomes de órgãos/unidades reconhecidos.
+
+        Cada nome é guardado como conjunto de termos (sem stopwords); o
+        maior nome contido na query vence.
+        """
+        entries = {}
+        for name in names:
+            terms = frozenset(term for term, _, _ in tokenize(name) if term not in STOPWORDS)
+            # Nomes de um termo só ("FUNDO") casariam com qualquer query
+            if len(terms) >= 2:
+                entries.setdefault(terms, name)
+        self.gazetteer = sorted(entries.items(), key=lambda entry: len(entry[0]), reverse=True)
+        return self
+
+    def classify(self, query: str) -> Route:
+        """Classifica a query. Retorna Route("vector") quando não é uma consulta direta."""
+        folded = fold(query)
+
+        match = self.CODE_ONLY_PATTERN.match(folded)
+        if match:
+            return Route("program", match.group(1), (match.group(1),))
+
+        for kind, pattern in (
+            ("page", self.PAGE_PATTERN),
+            ("program", self.PROGRAM_PATTERN),
+            ("regional", self.REGIONAL_PATTERN),
+        ):
+            match = pattern.search(folded)
+            if not match:
+                continue
+            residual = folded[:match.start()] + " " + folded[match.end():]
+            if self._residual_terms(residual):
+                return Route("vector")
+            value = int(match.group(1)) if kind != "program" else match.group(1)
+            if kind == "regional" and not 1 <= value <= self.MAX_REGIONAL:
+                return Route("vector")
+            return Route(kind, value, (match.group(1),))
+
+        terms = {term for term, _, _ in tokenize(folded) if term not in STOPWORDS}
+        for name_terms, name in self.gazetteer:
+            if name_terms <= terms and not self._residual_terms(" ".join(terms - name_terms)):
+                return Route("orgao", name, tuple(sorted(name_terms)))
+
+        return Route("vector")
+
+    def _residual_terms(self, text: str) -> List[str]:
+        return [
+            term for term, _, _ in tokenize(text)
+            if term not in STOPWORDS and term not in self.INTENT_WORDS
+        ]
+
+    def record(self, kind: str, fallback: bool = False) -> None:
+        """Contabiliza uma query atendida pela rota `kind`."""
+        with self._lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            if fallback:
+                self.fallbacks += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas do roteador, incluindo a fração de queries sem embedding."""
+        total = sum(self.counts.values())
+        structured = total - self.counts.get("vector", 0)
+        return {
+            "total_queries": total,
+            "by_route": dict(self.counts),
+            "structured_fallbacks": self.fallbacks,
+            "served_without_embedding": structured,
+            "served_without_embedding_ratio": round(structured / total, 4) if total else 0.0
+        }
@@ -0,0 +1,338 @@
+"""
+Totais materializados por Regional (1 a 12) da LOA 2026.
+
+Calculados na indexação a partir das linhas tipadas do content_list:
+
+- "REGIONALIZAÇÃO DAS APLICAÇÕES POR ÓRGÃO": tabela órgão × REGIONAL N,
+  que dá o total oficial aplicado por órgão em cada regional;
+- linhas de subprodutos "Regional N <meta física> <meta financeira>",
+  atribuídas ao contexto mais recente no documento: unidade orçamentária
+  ("25902 - FUNDO MUNICIPAL DE SAÚDE") e ação ("1964 - OBRAS E SERVIÇOS...")
+  e, no anexo do Processo Participativo, também programa e função
+  ("Programa: 0042 - ...", "Função: 12 - EDUCAÇÃO").
+
+A quebra função × programa só existe onde a LOA rotula esses campos; nas
+demais linhas a regional é agregada por unidade × ação.
+
+Cada regional tem uma visão pré-montada, servida em tempo constante.
+"""
+
+import re
+import hashlib
+import json
+from typing import List, Dict, Any, Optional, Callable, Iterable, Tuple
+
+from content_list import TableRow, ContentItem, parse_brl
+
+
+REGIONAL_COUNT = 12
+
+FIELD_LABELS = {
+    "Unidade Orçamentária": "unidade",
+    "Programa": "programa",
+    "Ação": "acao",
+    "Função": "funcao",
+}
+FIELD_PATTERN = re.compile(
+    r"(Unidade Orçamentária|Programa|Ação|Função|Subfunção|Produto):\s*(?:(\d+)\s*[-–]\s*)?"
+)
+UNIT_PATTERN = re.compile(r"\b(\d{5})\s*[-–]\s*([^\d$|]+)")
+ACTION_PATTERN = re.compile(r"\b(\d{4})\s*[-–]\s*([A-ZÀ-Ú][^\d$|]+)")
+REGIONAL_COLUMN_PATTERN = re.compile(r"^REGIONAL\s+(\d{1,2})$", re.IGNORECASE)
+# "Regional 8 1 200.000" / "Regional 9 100.000 1": meta física e financeira em qualquer ordem
+REGIONAL_ROW_PATTERN = re.compile(r"\bRegional\s+(\d{1,2})((?:\s+\d{1,3}(?:\.\d{3})*(?![\d.]))+)")
+AMOUNT_PATTERN = re.compile(r"^\d{1,3}(?:\.\d{3})*$")
+
+
+# Palavras de colunas vizinhas que o OCR cola no fim de nomes de ação
+TRAILING_NOISE = re.compile(r"(\s+(Regional|Regi[aã]o|Munic[ií]pio|Subprodutos:?|[A-ZÀ-Ú ]+\(UNIDADE\)))+$")
+
+
+def clean_name(name: str) -> str:
+    """Nome sem fórmulas LaTeX, espaços repetidos, pontuação nas bordas e rótulos residuais."""
+    name = re.sub(r"\s+", " ", re.sub(r"\$[^$]*\$", " ", name)).strip(" -–*:")
+    return TRAILING_NOISE.sub("", name).strip(" -–*:")
+
+
+def labeled_fields(text: str) -> List[Tuple[str, str]]:
+    """
+    Extrai campos rotulados ("Programa: 0042 - NOME") na ordem do texto.
+
+    Returns:
+        Lista de (campo, "código - nome") para os campos de FIELD_LABELS
+    """
+    text = re.sub(r"\s+", " ", text)
+    matches = list(FIELD_PATTERN.finditer(text))
+    fields = []
+    for i, match in enumerate(matches):
+        key = FIELD_LABELS.get(match.group(1))
+        if key is None or not match.group(2):
+            continue
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        fields.append((key, f"{match.group(2)} - {clean_name(text[match.end():end])}"))
+    return fields
+
+
+def _default_extract_regional(text: str) -> Optional[str]:
+    match = re.search(r"REGIONAL\s+(\d+)", text, re.IGNORECASE)
+    return f"Regional {match.group(1)}" if match else None
+
+
+class RegionalRollup:
+    """
+    Agregados por regional com páginas de origem.
+
+    As entradas são guardadas por página; em um novo `update`, só as
+    regionais cujas entradas mudaram têm a visão recalculada.
+    """
+
+    def __init__(self):
+        self.entries_by_page: Dict[int, List[Dict[str, Any]]] = {}
+        self.page_digests: Dict[int, str] = {}
+        self.views: Dict[int, Dict[str, Any]] = {}
+        self.source_fingerprint: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.views)
+
+    def extract_entries(
+        self,
+        items: Iterable[ContentItem],
+        extract_regional: Optional[Callable[[str], Optional[str]]] = None
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Extrai as entradas regionais do documento.
+
+        Args:
+            items: Itens de content_list.iter_items(), na ordem do documento
+            extract_regional: Detector de regional (padrão: "REGIONAL N")
+
+        Returns:
+            Entradas agrupadas por página
+        """
+        extract_regional = extract_regional or _default_extract_regional
+        context: Dict[str, Optional[str]] = dict.fromkeys(("unidade", "programa", "acao", "funcao"))
+        entries: Dict[int, List[Dict[str, Any]]] = {}
+        # Descrição do subproduto quando ela vem em uma linha própria, antes das regionais
+        last_label: Optional[str] = None
+
+        for item in items:
+            text = item.text
+            fields = labeled_fields(text)
+            if fields:
+                for key, value in fields:
+                    if key == "unidade":
+                        context = dict.fromkeys(context)
+                    context[key] = value
+            else:
+                unit_match = UNIT_PATTERN.search(text)
+                if unit_match:
+                    context = dict.fromkeys(context)
+                    context["unidade"] = f"{unit_match.group(1)} - {clean_name(unit_match.group(2))}"
+                action_match = ACTION_PATTERN.search(text[unit_match.end():] if unit_match else text)
+                if action_match:
+                    context["acao"] = f"{action_match.group(1)} - {clean_name(action_match.group(2))}"
+
+            if not isinstance(item, TableRow):
+                continue
+
+            columns = self._regional_columns(item.headers)
+            if columns:
+                # Tabela de regionalização: órgão na primeira célula, uma coluna por regional
+                label = clean_name(item.cells[0]) if item.cells else ""
+                # A linha de total pode vir colada ao fim do nome de um órgão quebrado
+                is_total = re.search(r"\bTOTAL$", label) is not None
+                for index, regional in columns:
+                    cell = item.cells[index] if index < len(item.cells) else ""
+                    if label and AMOUNT_PATTERN.match(cell):
+                        entries.setdefault(item.page, []).append({
+                            "regional": regional,
+                            "source": "total" if is_total else "orgao",
+                            "orgao": None if is_total else label,
+                            "valor": parse_brl(cell),
+                            "page": item.page
+                        })
+                continue
+
+            if not extract_regional(text):
+                last_label = clean_name(text) or last_label
+                continue
+            for match in REGIONAL_ROW_PATTERN.finditer(text):
+                regional = int(match.group(1))
+                if not 1 <= regional <= REGIONAL_COUNT:
+                    continue
+                # A meta financeira é o maior dos números que seguem a regional
+                value = max(parse_brl(number) for number in match.group(2).split())
+                entries.setdefault(item.page, []).append({
+                    "regional": regional,
+                    "source": "subproduto",
+                    **context,
+                    "descricao": clean_name(text[:match.start()]) or last_label,
+                    "valor": value,
+                    "page": item.page
+                })
+
+        return entries
+
+    @staticmethod
+    def _regional_columns(headers: List[str]) -> List[Tuple[int, int]]:
+        """Índices das colunas "REGIONAL N" de um cabeçalho."""
+        columns = []
+        for index, header in enumerate(headers):
+            match = REGIONAL_COLUMN_PATTERN.match(header.strip())
+            if match and 1 <= int(match.group(1)) <= REGIONAL_COUNT:
+                columns.append((index, int(match.group(1))))
+        return columns
+
+    def update(
+        self,
+        items: Iterable[ContentItem],
+        fingerprint: Optional[str] = None,
+        extract_regional: Optional[Callable[[str], Optional[str]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Atualiza os agregados a partir do documento.
+
+        Se `fingerprint` for igual ao da última atualização, nada é feito.
+        Caso contrário, compara o digest das entradas de cada página e
+        recalcula apenas as regionais afetadas.
+
+        Returns:
+            Relatório com páginas e regionais atualizadas
+        """
+        if fingerprint is not None and fingerprint == self.source_fingerprint:
+            return {"changed_pages": 0, "refreshed_regionals": [], "skipped": True}
+
+        entries = self.extract_entries(items, extract_regional)
+        digests = {
+            page: hashlib.sha1(json.dumps(page_entries, sort_keys=True).encode()).hexdigest()
+            for page, page_entries in entries.items()
+        }
+
+        changed = {page for page in set(digests) | set(self.page_digests)
+                   if digests.get(page) != self.page_digests.get(page)}
+        affected = set()
+        for page in changed:
+            for entry in self.entries_by_page.get(page, []) + entries.get(page, []):
+                affected.add(entry["regional"])
+
+        self.entries_by_page = entries
+        self.page_digests = digests
+        self.source_fingerprint = fingerprint
+
+        if not self.views:
+            affected = set(range(1, REGIONAL_COUNT + 1))
+        for regional in sorted(affected):
+            self.views[regional] = self._build_view(regional)
+
+        return {
+            "changed_pages": len(changed),
+            "refreshed_regionals": sorted(affected),
+            "skipped": False
+        }
+
+    def _build_view(self, regional: int) -> Dict[str, Any]:
+        """Monta a visão agregada de uma regional."""
+        orgaos: Dict[str, Dict[str, Any]] = {}
+        acoes: Dict[Tuple[Optional[str], Optional[str]], Dict[str, Any]] = {}
+        programas: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        total: Optional[float] = None
+        pages = set()
+
+        for page_entries in self.entries_by_page.values():
+            for entry in page_entries:
+                if entry["regional"] != regional:
+                    continue
+                pages.add(entry["page"])
+                if entry["source"] == "total":
+                    total = (total or 0.0) + entry["valor"]
+                    continue
+                if entry["source"] == "orgao":
+                    group = orgaos.setdefault(entry["orgao"], {
+                        "orgao": entry["orgao"], "valor": 0.0, "pages": set()
+                    })
+                else:
+                    if entry["funcao"] and entry["programa"]:
+                        key = (entry["funcao"], entry["programa"])
+                        program = programas.setdefault(key, {
+                            "funcao": entry["funcao"], "programa": entry["programa"],
+                            "valor": 0.0, "pages": set()
+                        })
+                        program["valor"] += entry["valor"]
+                        program["pages"].add(entry["page"])
+                    key = (entry["unidade"], entry["acao"])
+                    group = acoes.setdefault(key, {
+                        "unidade": entry["unidade"], "acao": entry["acao"],
+                        "valor": 0.0, "subprodutos": 0, "pages": set()
+                    })
+                    group["subprodutos"] += 1
+                group["valor"] += entry["valor"]
+                group["pages"].add(entry["page"])
+
+        def finish(groups: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            rows = [dict(group, pages=sorted(group["pages"])) for group in groups]
+            return sorted(rows, key=lambda row: row["valor"], reverse=True)
+
+        by_orgao = finish(orgaos.values())
+        by_acao = finish(acoes.values())
+        return {
+            "regional": regional,
+            "name": f"Regional {regional}",
+            # Total oficial da tabela de regionalização (soma dos órgãos se a linha faltar)
+            "total": total if total is not None else sum(row["valor"] for row in by_orgao),
+            "total_subprodutos": sum(row["valor"] for row in by_acao),
+            "orgaos": by_orgao,
+            "funcoes_programas": finish(programas.values()),
+            "acoes": by_acao,
+            "pages": sorted(pages)
+        }
+
+    def get(self, regional: int) -> Optional[Dict[str, Any]]:
+        """Retorna a visão pré-calculada de uma regional (ou None)."""
+        return self.views.get(regional)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Totais de todas as regionais."""
+        return [
+            {
+                "regional": view["regional"],
+                "name": view["name"],
+                "total": view["total"],
+                "total_subprodutos": view["total_subprodutos"]
+            }
+            for _, view in sorted(self.views.items())
+        ]
+
+    def entity_names(self) -> List[str]:
+        """Nomes de órgãos e unidades orçamentárias vistos nas entradas (sem código)."""
+        names = set()
+        for page_entries in self.entries_by_page.values():
+            for entry in page_entries:
+                if entry.get("orgao"):
+                    names.add(entry["orgao"])
+                if entry.get("unidade"):
+                    names.add(entry["unidade"].split(" - ", 1)[-1])
+        return sorted(names)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Estado serializável (JSON) dos agregados, para snapshots."""
+        return {
+            "source_fingerprint": self.source_fingerprint,
+            "page_digests": {str(page): digest for page, digest in self.page_digests.items()},
+            "entries_by_page": {str(page): entries for page, entries in self.entries_by_page.items()},
+            "views": {str(regional): view for regional, view in self.views.items()},
+        }
+
+    def load_dict(self, state: Dict[str, Any]) -> "RegionalRollup":
+        """Restaura o estado gerado por to_dict()."""
+        self.source_fingerprint = state.get("source_fingerprint")
+        self.page_digests = {int(page): digest for page, digest in state.get("page_digests", {}).items()}
+        self.entries_by_page = {int(page): entries for page, entries in state.get("entries_by_page", {}).items()}
+        self.views = {int(regional): view for regional, view in state.get("views", {}).items()}
+        return self
+
+    def clear(self) -> None:
+        self.entries_by_page = {}
+        self.page_digests = {}
+        self.views = {}
+        self.source_fingerprint = None
@@ -0,0 +1,163 @@
+"""
+Reranking local dos candidatos da busca semântica.
+
+Segundo estágio leve, em CPU, aplicado sobre os candidatos retornados pelo
+HNSW: combina o score semântico com sinais léxicos (sobreposição de termos,
+código de programa, números da query) e penaliza quase-duplicatas, que em
+tabelas da LOA costumam ocupar todas as primeiras posições.
+"""
+
+import re
+import time
+from typing import List, Dict, Any, Optional, Tuple, Set
+
+from lexical_index import LexicalIndex, tokenize
+
+
+class FeatureReranker:
+    """
+    Reranker baseado em features, com orçamento de latência por requisição.
+
+    Se o orçamento estourar, a ordem do primeiro estágio é mantida.
+    """
+
+    WEIGHTS = {
+        "semantic": 1.0,
+        "term_overlap": 0.35,
+        "program_code": 0.3,
+        "numeric": 0.15,
+    }
+    DUPLICATE_THRESHOLD = 0.8
+    DUPLICATE_PENALTY = 0.3
+
+    PROGRAM_CODE_PATTERN = re.compile(r"\b(\d{4})\b")
+    NUMBER_PATTERN = re.compile(r"\d+")
+
+    def __init__(self, lexical_index: Optional[LexicalIndex] = None):
+        self.lexical_index = lexical_index or LexicalIndex()
+
+    def rerank(
+        self,
+        query: str,
+        candidates: List[Dict[str, Any]],
+        k: int,
+        budget_ms: float
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Reordena os candidatos e corta em k.
+
+        Args:
+            query: Query de busca
+            candidates: Candidatos com id, text, metadata e score, na ordem do primeiro estágio
+            k: Número de resultados finais
+            budget_ms: Tempo máximo para o reranking (ms)
+
+        Returns:
+            Tupla (resultados, informações do reranking)
+        """
+        started = time.perf_counter()
+        deadline = started + budget_ms / 1000.0
+
+        terms = self.lexical_index.query_terms(query)
+        codes = set(self.PROGRAM_CODE_PATTERN.findall(query))
+        numbers = set(self.NUMBER_PATTERN.findall(query)) - codes
+
+        scored = []
+        token_sets: Dict[str, Set[str]] = {}
+        for candidate in candidates:
+            if time.perf_counter() > deadline:
+                return self._fallback(candidates, k, started)
+
+            tokens = {term for term, _, _ in tokenize(candidate["text"])}
+            token_sets[candidate["id"]] = tokens
+            features = self._features(candidate, tokens, terms, codes, numbers)
+            score = sum(self.WEIGHTS[name] * value for name, value in features.items())
+            scored.append((score, candidate))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        # Seleção gulosa penalizando quase-duplicatas já selecionadas
+        selected: List[Dict[str, Any]] = []
+        selected_scores: List[float] = []
+        remaining = scored
+        while remaining and len(selected) < k:
+            if time.perf_counter() > deadline:
+                return self._fallback(candidates, k, started)
+
+            best_index, best_score = 0, None
+            for index, (score, candidate) in enumerate(remaining):
+                penalty = self._duplicate_penalty(token_sets[candidate["id"]], selected, token_sets)
+                adjusted = score - penalty
+                if best_score is None or adjusted > best_score:
+                    best_index, best_score = index, adjusted
+            _, candidate = remaining.pop(best_index)
+            selected.append(candidate)
+            selected_scores.append(best_score)
+
+        for candidate, score in zip(selected, selected_scores):
+            candidate["rerank_score"] = round(score, 4)
+
+        return selected, {
+            "applied": True,
+            "candidates": len(candidates),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    def _features(
+        self,
+        candidate: Dict[str, Any],
+        tokens: Set[str],
+        terms: List[str],
+        codes: Set[str],
+        numbers: Set[str]
+    ) -> Dict[str, float]:
+        """Calcula as features de um candidato."""
+        features = {
+            "semantic": float(candidate.get("score", 0.0)),
+            "term_overlap": 0.0,
+            "program_code": 0.0,
+            "numeric": 0.0,
+        }
+
+        if terms:
+            features["term_overlap"] = sum(1 for term in terms if term in tokens) / len(terms)
+
+        if codes:
+            program_code = str(candidate["metadata"].get("program_code", ""))
+            if program_code in codes:
+                features["program_code"] = 1.0
+            elif codes & tokens:
+                features["program_code"] = 0.5
+
+        if numbers:
+            features["numeric"] = len(numbers & tokens) / len(numbers)
+
+        return features
+
+    def _duplicate_penalty(
+        self,
+        tokens: Set[str],
+        selected: List[Dict[str, Any]],
+        token_sets: Dict[str, Set[str]]
+    ) -> float:
+        """Penaliza candidatos muito parecidos com algum já selecionado (Jaccard)."""
+        for other in selected:
+            other_tokens = token_sets[other["id"]]
+            union = len(tokens | other_tokens)
+            if union and len(tokens & other_tokens) / union >= self.DUPLICATE_THRESHOLD:
+                return self.DUPLICATE_PENALTY
+        return 0.0
+
+    @staticmethod
+    def _fallback(
+        candidates: List[Dict[str, Any]],
+        k: int,
+        started: float
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Mantém a ordem do primeiro estágio quando o orçamento estoura."""
+        return candidates[:k], {
+            "applied": False,
+            "reason": "budget_exceeded",
+            "candidates": len(candidates),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
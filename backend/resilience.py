@@ -0,0 +1,294 @@
+"""
+Camada de resiliência para o provedor de embeddings (Gemini).
+
+Quando o Gemini fica lento ou limita a taxa, uma chamada direta bloqueia
+até o timeout do cliente e cada requisição de busca espera o mesmo tempo.
+`ResilientProvider` envolve as chamadas com:
+
+- prazo por chamada (`deadline`), que cobre todas as tentativas: a chamada
+  roda em um pool de threads e quem chamou desiste ao fim do prazo;
+- retentativas só para erros transitórios (timeout, 429, 5xx), com backoff
+  exponencial e jitter completo, sem ultrapassar o prazo; com `fail_fast`
+  (busca), qualquer outro erro (ex: 403 de chave inválida) também conta
+  para o breaker e vira `ProviderUnavailable`, sem retentativa;
+- limite de chamadas simultâneas ao provedor (retentativas incluídas): uma
+  chamada que estourou o prazo continua ocupando a vaga até terminar;
+- circuit breaker: após `failure_threshold` falhas seguidas o circuito abre
+  e as chamadas falham na hora com `ProviderUnavailable`; depois de
+  `reset_timeout` segundos ele fica meio-aberto e a próxima chamada testa o
+  provedor (sucesso fecha, falha reabre).
+
+Quem chama decide o que fazer com `ProviderUnavailable`: a busca degrada
+para o índice léxico ou para o cache; a indexação espera o circuito
+meio-abrir dentro do seu prazo e, se o provedor não voltar, para em vez de
+gravar vetores inválidos.
+"""
+
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Any, Callable, Optional
+
+# Status HTTP que indicam falha transitória do provedor
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class ProviderUnavailable(Exception):
+    """Provedor indisponível: circuito aberto, prazo esgotado ou falhas seguidas."""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeout, erro de conexão ou status HTTP transitório (google.api_core expõe `code`)."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in RETRYABLE_STATUS
+
+
+class CircuitBreaker:
+    """Circuit breaker por falhas consecutivas (closed -> open -> half_open -> closed)."""
+
+    FAILURE_THRESHOLD = 5
+    RESET_TIMEOUT = 30.0
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        """
+        Args:
+            failure_threshold: Falhas seguidas para abrir (padrão: EMBED_FAILURE_THRESHOLD ou 5)
+            reset_timeout: Segundos aberto antes de testar de novo (padrão: EMBED_RESET_TIMEOUT ou 30)
+        """
+        self.failure_threshold = int(
+            os.getenv("EMBED_FAILURE_THRESHOLD", str(self.FAILURE_THRESHOLD))
+            if failure_threshold is None else failure_threshold
+        )
+        self.reset_timeout = float(
+            os.getenv("EMBED_RESET_TIMEOUT", str(self.RESET_TIMEOUT)) if reset_timeout is None else reset_timeout
+        )
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.times_opened = 0
+        # Meio-aberto: só uma chamada de teste por vez vai ao provedor
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """
+        Se uma chamada pode ir ao provedor: sempre com o circuito fechado; no
+        meio-aberto, só a primeira (o teste), até `record_success`,
+        `record_failure` ou `release` — as demais são recusadas como se o
+        circuito estivesse aberto.
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "open" or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def release(self) -> None:
+        """Libera o teste meio-aberto de uma chamada que terminou sem resultado do provedor."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self._probing = False
+            self.failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+            # Meio-aberto: uma falha no teste reabre na hora
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None or time.monotonic() - self.opened_at >= self.reset_timeout:
+                    self.times_opened += 1
+                    print(f"ATENÇÃO: circuito do provedor aberto após {self.failures} falha(s): {self.last_error}")
+                self.opened_at = time.monotonic()
+
+    def retry_in(self) -> float:
+        """Segundos até o circuito aberto aceitar uma chamada de teste (0 se não está aberto)."""
+        opened_at = self.opened_at
+        if opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - opened_at))
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        return {
+            "state": state,
+            "consecutive_failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout_s": self.reset_timeout,
+            "retry_in_s": round(self.retry_in(), 1) if state == "open" else None,
+            "times_opened": self.times_opened,
+            "probe_in_flight": self._probing,
+            "last_error": self.last_error,
+        }
+
+
+class ResilientProvider:
+    """Chamadas a um provedor externo com prazo, retentativas, limite de concorrência e breaker."""
+
+    CONCURRENCY = 4
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 8.0
+    # Intervalo (s) entre verificações de quem espera o teste meio-aberto terminar
+    PROBE_POLL = 0.1
+
+    def __init__(
+        self,
+        name: str,
+        breaker: Optional[CircuitBreaker] = None,
+        concurrency: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None
+    ):
+        """
+        Args:
+            name: Nome do provedor (logs e /api/health)
+            breaker: Circuit breaker (padrão: um novo, configurado por ambiente)
+            concurrency: Chamadas simultâneas ao provedor (padrão: EMBED_CONCURRENCY ou 4)
+            backoff_base: Espera base entre tentativas em segundos (dobra a cada tentativa)
+            backoff_max: Espera máxima entre tentativas em segundos
+        """
+        self.name = name
+        self.breaker = breaker or CircuitBreaker()
+        self.concurrency = max(1, int(
+            os.getenv("EMBED_CONCURRENCY", str(self.CONCURRENCY)) if concurrency is None else concurrency
+        ))
+        self.backoff_base = self.BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = self.BACKOFF_MAX if backoff_max is None else backoff_max
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"{name}-call")
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "attempts": 0, "successes": 0, "retries": 0,
+                         "timeouts": 0, "failures": 0, "rejected": 0}
+        self.in_flight = 0
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += amount
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def backoff(self, attempt: int) -> float:
+        """Espera antes da tentativa `attempt + 1` (jitter completo)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def call(
+        self,
+        fn: Callable[[], Any],
+        deadline: float,
+        retries: int = 0,
+        wait_open: bool = False,
+        fail_fast: bool = False
+    ) -> Any:
+        """
+        Executa `fn` respeitando prazo, retentativas e o circuit breaker.
+
+        Args:
+            fn: Chamada ao provedor (sem argumentos)
+            deadline: Prazo total em segundos, incluindo retentativas e esperas
+            retries: Retentativas após a primeira tentativa (só erros transitórios)
+            wait_open: Com o circuito aberto, espera o teste (meio-aberto) se ele
+                couber no prazo, em vez de falhar na hora (indexação)
+            fail_fast: Erros não transitórios também contam como falha do
+                provedor e viram `ProviderUnavailable` na hora (busca)
+
+        Returns:
+            O retorno de `fn`
+
+        Raises:
+            ProviderUnavailable: circuito aberto, prazo esgotado, tentativas esgotadas
+                ou, com `fail_fast`, qualquer erro de `fn`
+            Exception: sem `fail_fast`, erros não transitórios de `fn` (ex: requisição
+                inválida) sobem como vieram
+        """
+        self._count("calls")
+        expires = time.monotonic() + deadline
+        attempt = 0
+        while True:
+            allowed = self.breaker.allow()
+            # Espera o circuito aceitar um teste, ou o teste em andamento terminar
+            while not allowed and wait_open:
+                wait = max(self.breaker.retry_in(), self.PROBE_POLL)
+                if time.monotonic() + wait >= expires:
+                    break
+                time.sleep(wait)
+                allowed = self.breaker.allow()
+            if not allowed:
+                self._count("rejected")
+                raise ProviderUnavailable(f"{self.name}: circuito aberto", reason="circuit_open")
+
+            remaining = expires - time.monotonic()
+            if remaining <= 0 or not self._slots.acquire(timeout=remaining):
+                self.breaker.release()
+                self._count("timeouts")
+                raise ProviderUnavailable(f"{self.name}: prazo de {deadline}s esgotado", reason="deadline")
+
+            with self._lock:
+                self.in_flight += 1
+                self.counters["attempts"] += 1
+            future = self._executor.submit(fn)
+            # A vaga só é liberada quando a chamada termina de fato
+            future.add_done_callback(self._release)
+            try:
+                result = future.result(timeout=max(0.0, expires - time.monotonic()))
+            except FutureTimeout:
+                error: BaseException = TimeoutError(f"sem resposta em {deadline}s")
+                self._count("timeouts")
+            except Exception as e:
+                if not is_retryable(e):
+                    if not fail_fast:
+                        self.breaker.release()
+                        raise
+                    self.breaker.record_failure(e)
+                    self._count("failures")
+                    raise ProviderUnavailable(f"{self.name}: {e}", reason="provider_error") from e
+                error = e
+            else:
+                self.breaker.record_success()
+                self._count("successes")
+                return result
+
+            self.breaker.record_failure(error)
+            self._count("failures")
+            pause = self.backoff(attempt)
+            if attempt >= retries or time.monotonic() + pause >= expires:
+                reason = "deadline" if isinstance(error, TimeoutError) else "retries_exhausted"
+                raise ProviderUnavailable(f"{self.name}: {error}", reason=reason) from error
+            attempt += 1
+            self._count("retries")
+            time.sleep(pause)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            **self.breaker.stats(),
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            **self.counters,
+        }
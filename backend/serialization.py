@@ -0,0 +1,224 @@
+"""
+Serialização JSON rápida e compressão das respostas da API.
+
+`json_dumps` usa o orjson quando instalado (com fallback para o módulo
+json) e entende tipos do NumPy, que aparecem em scores e metadados.
+`FastJSONResponse` serializa o dict direto com ele: os endpoints de busca
+devolvem a resposta pronta, sem revalidar os resultados pelo modelo
+pydantic nem passar pelo `jsonable_encoder`.
+
+`CompressionMiddleware` negocia brotli (se o pacote estiver instalado) ou
+gzip via Accept-Encoding para respostas acima de um tamanho mínimo. Streams
+SSE e conteúdos já comprimidos passam intactos.
+"""
+
+import os
+import gzip
+import json
+import zlib
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+try:
+    from starlette.responses import Response
+except ImportError:  # pragma: no cover - permite usar json_dumps sem a API
+    Response = object
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Tipos que não vale a pena comprimir (já comprimidos ou streaming incremental)
+SKIP_CONTENT_TYPES = ("text/event-stream", "application/gzip", "application/zip", "image/")
+
+
+def _default(obj: Any) -> Any:
+    """Converte tipos que o encoder não conhece (escalares/arrays NumPy, sets)."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Tipo não serializável em JSON: {type(obj).__name__}")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def json_dumps(obj: Any) -> bytes:
+        """Serializa para JSON compacto em UTF-8."""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def json_dumps(obj: Any) -> bytes:
+        """Serializa para JSON compacto em UTF-8."""
+        return json.dumps(
+            obj, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """Resposta JSON serializada com `json_dumps` (sem jsonable_encoder)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Escolhe a codificação suportada de maior preferência do Accept-Encoding.
+
+    Respeita `q=0` (codificação recusada); em empate, brotli vence gzip.
+    """
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _Compressor:
+    """Compressor incremental com a mesma interface para gzip e brotli."""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._impl = brotli.Compressor(quality=level)
+        else:
+            self._impl = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._impl.process(data)
+        return self._impl.compress(data)
+
+    def finish(self) -> bytes:
+        return self._impl.finish() if self.encoding == "br" else self._impl.flush()
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Comprime um corpo completo (usado também pelo benchmark)."""
+    if encoding == "br":
+        return brotli.compress(data, quality=CompressionMiddleware.BROTLI_LEVEL if level is None else level)
+    return gzip.compress(data, compresslevel=CompressionMiddleware.GZIP_LEVEL if level is None else level)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compressão negociada (brotli ou gzip).
+
+    Corpos menores que `minimum_size` seguem sem compressão: abaixo de ~1 KB
+    o custo de CPU não compensa os bytes economizados. Respostas em
+    streaming são comprimidas incrementalmente, exceto SSE, que precisa
+    chegar ao cliente evento a evento.
+    """
+
+    MINIMUM_SIZE = 1024
+    GZIP_LEVEL = 6
+    BROTLI_LEVEL = 4
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = int(
+            os.getenv("COMPRESSION_MIN_SIZE", str(self.MINIMUM_SIZE)) if minimum_size is None else minimum_size
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope.get("headers", ()):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers, skip = self._inspect(start_message)
+                if skip or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(
+                    encoding, self.BROTLI_LEVEL if encoding == "br" else self.GZIP_LEVEL
+                )
+                headers = [(k, v) for k, v in headers if k != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                headers.append((b"vary", b"Accept-Encoding"))
+                if not more_body:
+                    data = compressor.compress(body) + compressor.finish()
+                    headers.append((b"content-length", str(len(data)).encode("latin-1")))
+                    await send({**start_message, "headers": headers})
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                await send({**start_message, "headers": headers})
+
+            data = compressor.compress(body)
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _inspect(start_message) -> Tuple[list, bool]:
+        """Headers da resposta e se ela deve seguir sem compressão."""
+        headers = list(start_message.get("headers", []))
+        for name, value in headers:
+            if name == b"content-encoding":
+                return headers, True
+            if name == b"content-type" and value.decode("latin-1").startswith(SKIP_CONTENT_TYPES):
+                return headers, True
+        return headers, False
@@ -0,0 +1,364 @@
+"""
+Snapshots do índice da LOA 2026 (exportação e importação).
+
+Um snapshot é um único `.tar.gz` versionado com tudo o que uma réplica
+precisa para atender buscas sem reindexar pelo Gemini:
+
+- manifest.json: versão do formato, modelo de embedding, dimensão/dtype,
+  contagens e sha256 de cada arquivo
+- documents.sqlite3: store de documentos (cópia pela API de backup do SQLite)
+- vectors.npy / scales.npy: vetores no formato do store (escalas se int8)
+- ids.json: id de cada linha de vectors.npy
+- regional_rollup.json: agregados por regional já calculados
+
+Na importação os checksums são verificados enquanto os arquivos são
+extraídos; os vetores são carregados em bloco (memory-mapped) e os índices
+em memória são reconstruídos a partir do store de documentos.
+
+Uso:
+    python snapshot.py export [--out snapshots/loa.tar.gz]
+    python snapshot.py import snapshots/loa.tar.gz
+    python snapshot.py verify snapshots/loa.tar.gz
+"""
+
+import os
+import io
+import json
+import time
+import hashlib
+import tarfile
+import tempfile
+import argparse
+from datetime import datetime, timezone
+from typing import List, Dict, Any
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+DOCUMENTS_FILE = "documents.sqlite3"
+VECTORS_FILE = "vectors.npy"
+SCALES_FILE = "scales.npy"
+IDS_FILE = "ids.json"
+ROLLUP_FILE = "regional_rollup.json"
+SNAPSHOT_SUFFIX = ".tar.gz"
+READ_BLOCK = 1024 * 1024
+
+
+class SnapshotError(Exception):
+    """Snapshot inválido, corrompido ou incompatível."""
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_snapshot(vectorizer, out_path: str) -> Dict[str, Any]:
+    """
+    Exporta o índice atual para um snapshot.
+
+    O store de documentos é copiado primeiro e serve de referência: só
+    entram os vetores de chunks presentes na cópia.
+
+    Args:
+        vectorizer: LOAVectorizer com o índice carregado
+        out_path: Caminho do arquivo .tar.gz a criar
+
+    Returns:
+        Manifest do snapshot
+    """
+    started = time.perf_counter()
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(out_dir, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=out_dir, prefix=".snapshot_") as work:
+        documents_path = os.path.join(work, DOCUMENTS_FILE)
+        vectorizer.document_store.backup(documents_path)
+
+        from document_store import DocumentStore
+        copy = DocumentStore(documents_path)
+        try:
+            chunk_ids = [chunk["id"] for chunk in copy.iter_chunks()]
+        finally:
+            copy.close()
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(documents_path + suffix):
+                os.remove(documents_path + suffix)
+
+        ids, vectors, scales = vectorizer.store.export_vectors()
+        row_of = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        rows = [row_of[chunk_id] for chunk_id in chunk_ids if chunk_id in row_of]
+        ids = [ids[row] for row in rows]
+        vectors = vectors[rows]
+        scales = scales[rows] if scales is not None else None
+
+        np.save(os.path.join(work, VECTORS_FILE), vectors)
+        files = [DOCUMENTS_FILE, VECTORS_FILE, IDS_FILE, ROLLUP_FILE]
+        if scales is not None:
+            np.save(os.path.join(work, SCALES_FILE), scales)
+            files.append(SCALES_FILE)
+        with open(os.path.join(work, IDS_FILE), "w", encoding="utf-8") as f:
+            json.dump(ids, f)
+        with open(os.path.join(work, ROLLUP_FILE), "w", encoding="utf-8") as f:
+            json.dump(vectorizer.regional_rollup.to_dict(), f, ensure_ascii=False)
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "embedding_model": vectorizer.EMBEDDING_MODEL,
+            "vector_backend": vectorizer.store.name,
+            "vector_dimension": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+            "vector_dtype": vectors.dtype.name,
+            "chunks": len(chunk_ids),
+            "vectors": len(ids),
+            "chunks_without_vector": len(chunk_ids) - len(ids),
+            "files": {
+                name: {"sha256": _sha256(os.path.join(work, name)),
+                       "bytes": os.path.getsize(os.path.join(work, name))}
+                for name in files
+            },
+        }
+
+        partial = out_path + ".partial"
+        with tarfile.open(partial, "w:gz") as tar:
+            data = json.dumps(manifest, indent=2, ensure_ascii=False).encode("utf-8")
+            info = tarfile.TarInfo(MANIFEST_FILE)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(data))
+            for name in files:
+                tar.add(os.path.join(work, name), arcname=name)
+        os.replace(partial, out_path)
+
+    manifest["path"] = out_path
+    manifest["archive_bytes"] = os.path.getsize(out_path)
+    manifest["elapsed_s"] = round(time.perf_counter() - started, 3)
+    print(f"Snapshot exportado: {out_path} ({manifest['vectors']} vetores, "
+          f"{manifest['archive_bytes'] / 1024 / 1024:.1f} MB)")
+    return manifest
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """Lê o manifest de um snapshot sem extrair os demais arquivos."""
+    try:
+        with tarfile.open(path, "r:gz") as tar:
+            member = tar.getmember(MANIFEST_FILE)
+            manifest = json.load(tar.extractfile(member))
+    except (OSError, KeyError, tarfile.TarError, ValueError) as e:
+        raise SnapshotError(f"Snapshot ilegível: {path}: {e}")
+    if manifest.get("format_version", 0) > FORMAT_VERSION:
+        raise SnapshotError(
+            f"Formato de snapshot {manifest.get('format_version')} mais novo que o suportado ({FORMAT_VERSION})"
+        )
+    return manifest
+
+
+def extract_snapshot(path: str, target_dir: str) -> Dict[str, Any]:
+    """
+    Extrai um snapshot verificando tamanho e sha256 de cada arquivo.
+
+    Só são extraídos os arquivos listados no manifest (nomes simples, sem
+    diretórios).
+
+    Returns:
+        Manifest do snapshot
+    """
+    manifest = read_manifest(path)
+    expected = manifest["files"]
+    found = set()
+
+    with tarfile.open(path, "r:gz") as tar:
+        for member in tar:
+            if member.name == MANIFEST_FILE:
+                continue
+            if member.name not in expected or not member.isfile() or os.path.basename(member.name) != member.name:
+                raise SnapshotError(f"Arquivo inesperado no snapshot: {member.name}")
+            digest = hashlib.sha256()
+            size = 0
+            source = tar.extractfile(member)
+            with open(os.path.join(target_dir, member.name), "wb") as out:
+                for block in iter(lambda: source.read(READ_BLOCK), b""):
+                    digest.update(block)
+                    size += len(block)
+                    out.write(block)
+            if digest.hexdigest() != expected[member.name]["sha256"] or size != expected[member.name]["bytes"]:
+                raise SnapshotError(f"Checksum inválido: {member.name}")
+            found.add(member.name)
+
+    missing = set(expected) - found
+    if missing:
+        raise SnapshotError(f"Arquivos ausentes no snapshot: {', '.join(sorted(missing))}")
+    return manifest
+
+
+def verify_snapshot(path: str) -> Dict[str, Any]:
+    """Verifica os checksums de um snapshot sem importá-lo."""
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as work:
+        return extract_snapshot(path, work)
+
+
+def import_snapshot(vectorizer, path: str) -> Dict[str, Any]:
+    """
+    Substitui o índice do vetorizador pelo conteúdo de um snapshot.
+
+    Args:
+        vectorizer: LOAVectorizer de destino (backend vetorial qualquer)
+        path: Caminho do .tar.gz
+
+    Returns:
+        Relatório com contagens e tempos
+    """
+    started = time.perf_counter()
+    manifest = read_manifest(path)
+    if manifest.get("embedding_model") != vectorizer.EMBEDDING_MODEL:
+        raise SnapshotError(
+            f"Snapshot gerado com {manifest.get('embedding_model')}, "
+            f"vetorizador usa {vectorizer.EMBEDDING_MODEL}"
+        )
+
+    persist_dir = os.path.dirname(os.path.abspath(vectorizer.document_store.db_path))
+    restored = False
+    try:
+        with tempfile.TemporaryDirectory(dir=persist_dir, prefix=".snapshot_") as work:
+            extract_snapshot(path, work)
+            extracted = time.perf_counter()
+
+            # A versão do índice (ETags) só muda depois de vetores e índices carregados
+            snapshot_version = vectorizer.document_store.restore(os.path.join(work, DOCUMENTS_FILE))
+            restored = True
+
+            with open(os.path.join(work, IDS_FILE), encoding="utf-8") as f:
+                ids = json.load(f)
+            vectors = np.load(os.path.join(work, VECTORS_FILE), mmap_mode="r")
+            scales_path = os.path.join(work, SCALES_FILE)
+            scales = np.load(scales_path, mmap_mode="r") if os.path.exists(scales_path) else None
+
+            documents: List[str] = []
+            metadatas: List[Dict[str, Any]] = []
+            for start in range(0, len(ids), 500):
+                for chunk in vectorizer.document_store.get_many(ids[start:start + 500]):
+                    documents.append(chunk["text"])
+                    metadatas.append(chunk["metadata"])
+            if len(documents) != len(ids):
+                raise SnapshotError("Snapshot inconsistente: vetores sem documento correspondente")
+
+            vectorizer.store.bulk_load(ids, vectors, scales, documents, metadatas)
+            del vectors, scales
+
+            with open(os.path.join(work, ROLLUP_FILE), encoding="utf-8") as f:
+                vectorizer.regional_rollup.load_dict(json.load(f))
+
+        loaded = time.perf_counter()
+        index_report = vectorizer.refresh_indexes()
+    except Exception:
+        # Conteúdo parcialmente restaurado não pode herdar as respostas em cache
+        if restored:
+            vectorizer.document_store.bump_index_version()
+        raise
+
+    if snapshot_version:
+        vectorizer.document_store.set_index_version(snapshot_version)
+    else:
+        vectorizer.document_store.bump_index_version()
+    finished = time.perf_counter()
+
+    report = {
+        "snapshot": os.path.basename(path),
+        "format_version": manifest["format_version"],
+        "created_at": manifest["created_at"],
+        "chunks": manifest["chunks"],
+        "vectors": manifest["vectors"],
+        "vector_backend": vectorizer.store.name,
+        "extract_s": round(extracted - started, 3),
+        "load_s": round(loaded - extracted, 3),
+        "index_s": round(finished - loaded, 3),
+        "elapsed_s": round(finished - started, 3),
+        "indexes": index_report,
+    }
+    print(f"Snapshot importado: {report['vectors']} vetores em {report['elapsed_s']:.1f}s")
+    return report
+
+
+def list_snapshots(directory: str) -> List[Dict[str, Any]]:
+    """Lista os snapshots de um diretório (mais recentes primeiro), com o manifest."""
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith(SNAPSHOT_SUFFIX):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            manifest = read_manifest(path)
+        except SnapshotError as e:
+            snapshots.append({"name": name, "error": str(e)})
+            continue
+        snapshots.append({
+            "name": name,
+            "bytes": os.path.getsize(path),
+            "created_at": manifest.get("created_at"),
+            "format_version": manifest.get("format_version"),
+            "chunks": manifest.get("chunks"),
+            "vectors": manifest.get("vectors"),
+            "vector_dtype": manifest.get("vector_dtype"),
+            "vector_dimension": manifest.get("vector_dimension"),
+        })
+    return snapshots
+
+
+def snapshot_name() -> str:
+    """Nome padrão de um novo snapshot (com data e hora UTC)."""
+    return f"loa_2026_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}{SNAPSHOT_SUFFIX}"
+
+
+def main() -> None:
+    from loa_vectorizer import create_vectorizer
+
+    default_persist = os.getenv("CHROMA_PERSIST_DIR") or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chroma_db"
+    )
+    default_dir = os.getenv("SNAPSHOT_DIR") or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "snapshots"
+    )
+    content_list_path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "Arquivo completo LOA 2026",
+        "Dados LOA 2026",
+        "LOA-2026 (1)_content_list.json"
+    )
+
+    parser = argparse.ArgumentParser(description="Snapshots do índice LOA 2026")
+    parser.add_argument("command", choices=["export", "import", "verify", "list"])
+    parser.add_argument("path", nargs="?", help="Snapshot (.tar.gz) para import/verify")
+    parser.add_argument("--out", help="Arquivo de saída do export")
+    parser.add_argument("--persist-dir", default=default_persist)
+    parser.add_argument("--snapshot-dir", default=default_dir)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for snapshot in list_snapshots(args.snapshot_dir):
+            print(json.dumps(snapshot, ensure_ascii=False))
+        return
+    if args.command in ("import", "verify") and not args.path:
+        parser.error(f"{args.command} exige o caminho do snapshot")
+
+    if args.command == "verify":
+        manifest = verify_snapshot(args.path)
+        print(f"Snapshot OK: {manifest['vectors']} vetores, formato {manifest['format_version']}")
+        return
+
+    vectorizer = create_vectorizer(persist_dir=args.persist_dir, content_list_path=content_list_path)
+    if args.command == "export":
+        out = args.out or os.path.join(args.snapshot_dir, snapshot_name())
+        vectorizer.refresh_indexes()
+        export_snapshot(vectorizer, out)
+    else:
+        print(json.dumps(import_snapshot(vectorizer, args.path), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Autocompletar de entidades da LOA 2026 (/api/suggest).
+
+Na indexação são coletados nomes de programas, órgãos, unidades
+orçamentárias, ações e regionais a partir dos títulos e das linhas de
+tabela do documento. Cada nome vira chaves normalizadas (minúsculas, sem
+acentos): o nome completo, "código nome" e cada sufixo a partir de uma
+palavra, para que "gonzaga" encontre "HOSPITAL GONZAGA MOTA".
+
+As chaves ficam em um array ordenado (equivalente a um trie achatado): o
+intervalo de chaves com um prefixo sai de duas buscas binárias. Para
+prefixos de até `PRECOMPUTED_PREFIX` caracteres, cujos intervalos são
+grandes, o top-K já fica calculado na construção, então cada tecla custa
+microssegundos. O ranking combina a frequência do nome no documento com a
+frequência nas consultas do log.
+"""
+
+import re
+import math
+import heapq
+from bisect import bisect_left
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from lexical_index import fold, STOPWORDS
+from content_list import TableRow, ContentItem
+from regional_rollup import (
+    RegionalRollup, REGIONAL_COUNT, UNIT_PATTERN, labeled_fields, clean_name
+)
+
+KINDS = ("programa", "orgao", "unidade", "acao", "regional")
+
+PROGRAM_HEADING = re.compile(r"^PROGRAMA\s+(\d{4})\s*[-–]?\s*(.{3,})$", re.IGNORECASE)
+CODE_NAME = re.compile(r"^(\d{4})\s*[-–]?\s*([^\d].{2,})$")
+TRAILING_AMOUNTS = re.compile(r"(\s+[\d.,]+)+$")
+
+
+def _key_text(text: str) -> str:
+    """Chave de comparação: sem acentos, minúscula, só letras/dígitos separados por espaço."""
+    return " ".join(re.findall(r"\w+", fold(text)))
+
+
+def extract_entities(items: Iterable[ContentItem]) -> List[Dict[str, Any]]:
+    """
+    Coleta as entidades nomeadas do documento.
+
+    Returns:
+        Dicts com kind, code (ou None), name e count (ocorrências)
+    """
+    # (kind, code ou chave do nome) -> Counter de grafias
+    spellings: Dict[Tuple[str, str], Counter] = {}
+    codes: Dict[Tuple[str, str], Optional[str]] = {}
+
+    def add(kind: str, code: Optional[str], name: str) -> None:
+        name = TRAILING_AMOUNTS.sub("", clean_name(name))
+        key_text = _key_text(name)
+        if len(key_text) < 3 or key_text.isdigit():
+            return
+        group = (kind, code or key_text)
+        spellings.setdefault(group, Counter())[name] += 1
+        codes[group] = code
+
+    for item in items:
+        text = item.text
+        for field, value in labeled_fields(text):
+            if field in ("programa", "unidade", "acao"):
+                code, _, name = value.partition(" - ")
+                add(field, code, name)
+
+        if isinstance(item, TableRow):
+            columns = RegionalRollup._regional_columns(item.headers)
+            if columns and item.cells:
+                label = clean_name(item.cells[0])
+                if label and not re.search(r"\bTOTAL$", label):
+                    add("orgao", None, label)
+                continue
+            if item.headers and "PROGRAMA" in fold(" ".join(item.headers)).upper():
+                match = CODE_NAME.match(item.cells[0] if item.cells else "")
+                if match:
+                    add("programa", match.group(1), match.group(2))
+                    continue
+        else:
+            match = PROGRAM_HEADING.match(text.strip())
+            if match:
+                add("programa", match.group(1), match.group(2))
+                continue
+
+        for match in UNIT_PATTERN.finditer(text):
+            add("unidade", match.group(1), match.group(2))
+
+    entities = []
+    for group, counter in spellings.items():
+        # Grafia: a forma normalizada mais comum; dentro dela, a acentuada
+        by_key: Counter = Counter()
+        for name, count in counter.items():
+            by_key[_key_text(name)] += count
+        best_key = by_key.most_common(1)[0][0]
+        candidates = [name for name in counter if _key_text(name) == best_key]
+        name = max(candidates, key=lambda n: (sum(ord(c) > 127 for c in n), counter[n], len(n)))
+        entities.append({
+            "kind": group[0],
+            "code": codes[group],
+            "name": name,
+            "count": sum(counter.values()),
+        })
+
+    for regional in range(1, REGIONAL_COUNT + 1):
+        entities.append({"kind": "regional", "code": str(regional), "name": f"Regional {regional}", "count": 1})
+
+    return entities
+
+
+class Suggester:
+    """Sugestões por prefixo com ranking por popularidade."""
+
+    LIMIT = 8
+    TOP_K = 20
+    PRECOMPUTED_PREFIX = 2
+    SUFFIX_PENALTY = 0.5
+    QUERY_WEIGHT = 2.0
+
+    def __init__(self):
+        self.entities: List[Dict[str, Any]] = []
+        self.keys: List[str] = []
+        self.key_entity: List[int] = []
+        self.key_penalty: List[float] = []
+        self.scores: List[float] = []
+        self.query_counts: List[Tuple[str, int]] = []
+        self._top: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def build(self, entities: Iterable[Dict[str, Any]]) -> "Suggester":
+        """Reconstrói as chaves ordenadas a partir de extract_entities()."""
+        self.entities = list(entities)
+        keyed = []
+        for index, entity in enumerate(self.entities):
+            words = _key_text(entity["name"]).split()
+            seen = set()
+            full = " ".join(words)
+            for key, penalty in ((full, 0.0), (f"{entity['code']} {full}" if entity["code"] else None, 0.0)):
+                if key and key not in seen:
+                    seen.add(key)
+                    keyed.append((key, index, penalty))
+            for start in range(1, len(words)):
+                if words[start] in STOPWORDS:
+                    continue
+                key = " ".join(words[start:])
+                if key not in seen:
+                    seen.add(key)
+                    keyed.append((key, index, self.SUFFIX_PENALTY))
+
+        keyed.sort()
+        self.keys = [key for key, _, _ in keyed]
+        self.key_entity = [index for _, index, _ in keyed]
+        self.key_penalty = [penalty for _, _, penalty in keyed]
+        self._rank()
+        return self
+
+    def set_popularity(self, query_counts: Iterable[Dict[str, Any]]) -> "Suggester":
+        """
+        Pondera o ranking pelas consultas do log (query_log.top_queries()).
+
+        Uma consulta conta para a entidade quando contém o nome dela ou é
+        um prefixo do nome (o usuário parou de digitar antes).
+        """
+        self.query_counts = [(_key_text(item["query"]), item["count"]) for item in query_counts]
+        self._rank()
+        return self
+
+    def _rank(self) -> None:
+        hits = [0] * len(self.entities)
+        if self.query_counts:
+            names = [_key_text(entity["name"]) for entity in self.entities]
+            for query, count in self.query_counts:
+                if len(query) < 3:
+                    continue
+                for index, name in enumerate(names):
+                    if name in query or name.startswith(query):
+                        hits[index] += count
+        self.scores = [
+            math.log1p(entity["count"]) + self.QUERY_WEIGHT * math.log1p(hits[index])
+            for index, entity in enumerate(self.entities)
+        ]
+
+        prefixes: Dict[str, Dict[int, float]] = {}
+        for key, index, penalty in zip(self.keys, self.key_entity, self.key_penalty):
+            score = self.scores[index] - penalty
+            for length in range(1, self.PRECOMPUTED_PREFIX + 1):
+                if len(key) < length:
+                    break
+                best = prefixes.setdefault(key[:length], {})
+                if score > best.get(index, float("-inf")):
+                    best[index] = score
+        self._top = {
+            prefix: [index for index, _ in heapq.nlargest(self.TOP_K, best.items(), key=lambda item: item[1])]
+            for prefix, best in prefixes.items()
+        }
+
+    def _scan(self, prefix: str, kinds: Optional[set], limit: int) -> List[int]:
+        """Melhores entidades entre as chaves com o prefixo (duas buscas binárias)."""
+        low = bisect_left(self.keys, prefix)
+        high = bisect_left(self.keys, prefix + "\uffff", low)
+        best: Dict[int, float] = {}
+        for position in range(low, high):
+            index = self.key_entity[position]
+            if kinds and self.entities[index]["kind"] not in kinds:
+                continue
+            score = self.scores[index] - self.key_penalty[position]
+            if score > best.get(index, float("-inf")):
+                best[index] = score
+        ranked = heapq.nlargest(
+            limit, best.items(),
+            key=lambda item: (item[1], -len(self.entities[item[0]]["name"]))
+        )
+        return [index for index, _ in ranked]
+
+    def suggest(self, query: str, limit: Optional[int] = None, kinds: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Entidades cujo nome (ou uma palavra dele em diante) começa com `query`.
+
+        Args:
+            query: Texto digitado (acentos e caixa são ignorados)
+            limit: Máximo de sugestões
+            kinds: Restringe aos tipos dados (ver KINDS)
+        """
+        limit = limit or self.LIMIT
+        prefix = _key_text(query)
+        # Espaço final digitado conta: "rua " não deve sugerir "ruas"
+        if query[-1:].isspace() and prefix:
+            prefix += " "
+        if not prefix:
+            return []
+
+        kinds = set(kinds) if kinds else None
+        # Busca um pouco mais para compensar nomes repetidos entre tipos
+        wanted = limit * 2
+        if kinds is None and len(prefix) <= self.PRECOMPUTED_PREFIX and prefix in self._top:
+            indexes = self._top[prefix][:wanted]
+        else:
+            indexes = self._scan(prefix, kinds, wanted)
+
+        words = prefix.split()
+        if len(indexes) < limit and len(words) > 1:
+            # "hospital gon" -> "HOSPITAL DISTRITAL GONZAGA MOTA": a última palavra
+            # é prefixo e as anteriores aparecem inteiras no nome
+            required = set(words[:-1])
+            for index in self._scan(words[-1], kinds, self.TOP_K * 5):
+                if index not in indexes and required <= set(_key_text(self.entities[index]["name"]).split()):
+                    indexes.append(index)
+
+        suggestions = []
+        seen = set()
+        for index in indexes:
+            entity = self.entities[index]
+            name_key = _key_text(entity["name"])
+            if name_key in seen:
+                continue
+            seen.add(name_key)
+            suggestions.append({
+                "text": entity["name"],
+                "kind": entity["kind"],
+                "code": entity["code"],
+                "score": round(self.scores[index], 3),
+            })
+            if len(suggestions) == limit:
+                break
+        return suggestions
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entities": len(self.entities),
+            "keys": len(self.keys),
+            "by_kind": dict(Counter(entity["kind"] for entity in self.entities)),
+            "popularity_queries": len(self.query_counts),
+        }
@@ -0,0 +1,113 @@
+"""
+Unidades de busca por linha de tabela.
+
+Uma tabela do content_list pode listar dezenas de programas; indexada como
+um único chunk, uma consulta sobre um programa devolve a tabela inteira e a
+linha que responde fica escondida. Aqui cada linha (ou pequeno grupo de
+linhas consecutivas) vira uma unidade própria, com a legenda e os
+cabeçalhos da tabela como contexto e a referência à tabela de origem
+(`table_id`), que pode ser obtida inteira por `TableIndex`.
+"""
+
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+from content_list import TableRow, ContentItem
+
+ROW_GROUP = 1
+
+
+def row_line(headers: List[str], cells: List[str]) -> str:
+    """Linha como "cabeçalho: célula | ..." (células vazias omitidas)."""
+    parts = []
+    for index, cell in enumerate(cells):
+        if not cell:
+            continue
+        header = headers[index] if index < len(headers) else ""
+        parts.append(f"{header}: {cell}" if header and header != cell else cell)
+    return " | ".join(parts)
+
+
+def _is_data_row(row: TableRow) -> bool:
+    """Descarta linhas vazias e cabeçalhos repetidos (tabelas que continuam na página seguinte)."""
+    return any(row.cells) and row.cells != row.headers
+
+
+def iter_row_units(items: Iterable[ContentItem], group_size: int = ROW_GROUP) -> Iterator[Dict[str, Any]]:
+    """
+    Agrupa as linhas de cada tabela em unidades de até `group_size` linhas.
+
+    Returns:
+        Dicts com table_id, page, caption, headers, row_start, row_end e text
+    """
+    group_size = max(1, group_size)
+    group: List[TableRow] = []
+
+    def emit() -> Dict[str, Any]:
+        first = group[0]
+        lines = [first.caption] if first.caption else []
+        lines.extend(row_line(first.headers, row.cells) for row in group)
+        return {
+            "table_id": first.table_id,
+            "page": first.page,
+            "caption": first.caption,
+            "headers": first.headers,
+            "row_start": first.row_index,
+            "row_end": group[-1].row_index,
+            "text": "\n".join(lines),
+        }
+
+    for item in items:
+        if not isinstance(item, TableRow) or not _is_data_row(item):
+            continue
+        if group and (item.table_id != group[0].table_id or len(group) >= group_size):
+            yield emit()
+            group = []
+        group.append(item)
+    if group:
+        yield emit()
+
+
+class TableIndex:
+    """
+    Tabelas completas por table_id (destino da referência das unidades de linha).
+
+    As tabelas da LOA vêm do content_list (`build`); as de documentos avulsos
+    (decretos) ficam à parte (`set_document_tables`), com o table_id
+    prefixado pelo ID do documento.
+    """
+
+    def __init__(self):
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self.document_tables: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.tables) + len(self.document_tables)
+
+    @staticmethod
+    def collect(items: Iterable[ContentItem]) -> Dict[str, Dict[str, Any]]:
+        """Agrupa as linhas dos itens em tabelas completas por table_id."""
+        tables: Dict[str, Dict[str, Any]] = {}
+        for item in items:
+            if not isinstance(item, TableRow):
+                continue
+            table = tables.get(item.table_id)
+            if table is None:
+                table = tables[item.table_id] = {
+                    "table_id": item.table_id,
+                    "page": item.page,
+                    "caption": item.caption,
+                    "headers": item.headers,
+                    "rows": [],
+                }
+            table["rows"].append({"row_index": item.row_index, "cells": item.cells})
+        return tables
+
+    def build(self, items: Iterable[ContentItem]) -> "TableIndex":
+        self.tables = self.collect(items)
+        return self
+
+    def set_document_tables(self, tables: Dict[str, Dict[str, Any]]) -> None:
+        self.document_tables = tables
+
+    def get(self, table_id: str) -> Optional[Dict[str, Any]]:
+        return self.tables.get(table_id) or self.document_tables.get(table_id)
@@ -0,0 +1,794 @@
+"""
+Backends de armazenamento vetorial para o LOAVectorizer.
+
+- ChromaVectorStore: coleção ChromaDB com índice HNSW (padrão).
+- NumpyVectorStore: busca exata em processo sobre uma matriz contígua
+  (float32, float16 ou int8 quantizado) memory-mapped. Para o tamanho da
+  LOA (alguns milhares de vetores de 768 dimensões) um produto
+  matriz-vetor é mais rápido que um round-trip ao Chroma e tem recall exato.
+
+Os dois backends aceitam uma dimensão menor que a do modelo: os vetores
+são truncados nas primeiras N dimensões e renormalizados (ver
+`truncate_normalize`).
+
+Ambos retornam resultados no formato de `collection.query` do ChromaDB
+(listas de listas de ids, documents, metadatas, distances).
+"""
+
+import os
+import sys
+import json
+import operator
+import threading
+from array import array
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+import chromadb
+
+from corpus import Corpus
+
+VECTOR_DTYPES = ("float32", "float16", "int8")
+COMPARISONS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+def truncate_normalize(vectors: Any, dimension: Optional[int] = None) -> np.ndarray:
+    """
+    Trunca vetores nas primeiras `dimension` dimensões e renormaliza (norma L2 = 1).
+
+    Args:
+        vectors: Matriz (ou lista de listas) de vetores
+        dimension: Dimensões mantidas (None = todas)
+
+    Returns:
+        Matriz float32 de vetores unitários
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    if dimension and vectors.shape[1] > dimension:
+        vectors = vectors[:, :dimension]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantiza vetores em int8 com uma escala por vetor (max |v| ↦ 127).
+
+    Returns:
+        Tupla (vetores int8, escalas float32) — v ≈ q × escala
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def match_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Aplica um filtro no formato `where` do Chroma aos metadados de um único chunk."""
+    for key, condition in (where or {}).items():
+        if key == "$and":
+            if not all(match_where(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(match_where(metadata, sub) for sub in condition):
+                return False
+        else:
+            value = metadata.get(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, expected in condition.items():
+                if op == "$eq":
+                    ok = value == expected
+                elif op == "$ne":
+                    ok = value != expected
+                elif op == "$in":
+                    ok = value in expected
+                elif op == "$nin":
+                    ok = value not in expected
+                elif op in COMPARISONS:
+                    ok = value is not None and COMPARISONS[op](float(value), expected)
+                else:
+                    raise ValueError(f"Operador de filtro não suportado: {op}")
+                if not ok:
+                    return False
+    return True
+
+
+class VectorStore:
+    """Interface comum dos backends vetoriais."""
+
+    name = "base"
+
+    def add(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        raise NotImplementedError
+
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int,
+        where: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, List[List[Any]]]:
+        raise NotImplementedError
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Substitui os metadados de itens existentes (vetores e documentos mantidos)."""
+        raise NotImplementedError
+
+    def get_all(self) -> Dict[str, List[Any]]:
+        """Retorna ids, documents e metadatas de todos os itens."""
+        raise NotImplementedError
+
+    def peek(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Retorna os metadados de alguns itens (para estatísticas)."""
+        raise NotImplementedError
+
+    def export_vectors(self) -> Tuple[List[str], np.ndarray, Optional[np.ndarray]]:
+        """
+        Retorna os vetores de todos os itens no formato armazenado.
+
+        Returns:
+            Tupla (ids, vetores, escalas int8 ou None)
+        """
+        raise NotImplementedError
+
+    def bulk_load(
+        self,
+        ids: List[str],
+        vectors: np.ndarray,
+        scales: Optional[np.ndarray],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        batch_size: int = 500
+    ) -> None:
+        """Substitui o conteúdo do store por vetores já calculados (ex: snapshot)."""
+        self.clear()
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            batch = np.asarray(vectors[start:end], dtype=np.float32)
+            if scales is not None:
+                batch = batch * np.asarray(scales[start:end], dtype=np.float32)[:, None]
+            self.add(ids[start:end], batch, documents[start:end], metadatas[start:end])
+
+    def attach_corpus(self, corpus: Corpus) -> None:
+        """Corpus compartilhado com documentos e metadados dos chunks (backends que os guardam em processo)."""
+
+    def warm(self) -> int:
+        """
+        Traz o índice para a memória antes das primeiras consultas.
+
+        Returns:
+            Bytes lidos (0 quando o backend só aquece pelas próprias consultas)
+        """
+        return 0
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class ChromaVectorStore(VectorStore):
+    """Backend ChromaDB (HNSW, distância cosseno)."""
+
+    name = "chroma"
+    COLLECTION_NAME = "loa_2026"
+
+    def __init__(
+        self,
+        persist_dir: str,
+        collection_metadata: Dict[str, Any],
+        dimension: Optional[int] = None
+    ):
+        self.collection_metadata = collection_metadata
+        # Dimensão armazenada (None = a do modelo); o HNSW guarda float32
+        self.dimension = dimension
+        self.client = chromadb.PersistentClient(path=persist_dir)
+        self.collection = self.client.get_or_create_collection(
+            name=self.COLLECTION_NAME,
+            metadata=collection_metadata
+        )
+
+    def add(self, ids, embeddings, documents, metadatas) -> None:
+        self.collection.add(
+            documents=documents,
+            embeddings=truncate_normalize(embeddings, self.dimension).tolist(),
+            metadatas=metadatas,
+            ids=ids
+        )
+
+    def update_metadata(self, ids, metadatas) -> None:
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def query(self, query_embeddings, n_results, where=None):
+        return self.collection.query(
+            query_embeddings=truncate_normalize(query_embeddings, self.dimension).tolist(),
+            n_results=n_results,
+            where=where
+        )
+
+    def get_all(self) -> Dict[str, List[Any]]:
+        data = self.collection.get(include=["documents", "metadatas"])
+        return {
+            "ids": data.get("ids") or [],
+            "documents": data.get("documents") or [],
+            "metadatas": data.get("metadatas") or []
+        }
+
+    def peek(self, limit: int = 5) -> List[Dict[str, Any]]:
+        return self.collection.get(limit=limit, include=["metadatas"]).get("metadatas") or []
+
+    def export_vectors(self) -> Tuple[List[str], np.ndarray, Optional[np.ndarray]]:
+        data = self.collection.get(include=["embeddings"])
+        vectors = truncate_normalize(data["embeddings"], self.dimension) if len(data["ids"]) else \
+            np.zeros((0, self.dimension or 0), dtype=np.float32)
+        return list(data["ids"]), vectors, None
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def clear(self) -> None:
+        self.client.delete_collection(self.COLLECTION_NAME)
+        self.collection = self.client.get_or_create_collection(
+            name=self.COLLECTION_NAME,
+            metadata=self.collection_metadata
+        )
+
+
+class _Rows:
+    """
+    Estado de leitura do NumpyVectorStore: as primeiras `count` linhas.
+
+    Nunca é alterado depois de publicado (só o cache de colunas cresce); cada
+    escrita monta um novo e troca `store._rows` de uma vez. `records` é o
+    records.jsonl aberto quando o estado foi criado: depois de uma
+    compactação, estados antigos seguem lendo o arquivo substituído.
+    """
+
+    __slots__ = ("ids", "count", "alive", "vectors", "scales", "offsets", "records",
+                 "corpus", "source", "columns")
+
+    def __init__(self, ids: List[str], count: int, alive: np.ndarray, vectors: np.ndarray, scales: np.ndarray,
+                 offsets: array, records, corpus: Optional[Corpus], source: np.ndarray):
+        self.ids = ids
+        self.count = count
+        self.alive = alive
+        self.vectors = vectors
+        self.scales = scales
+        self.offsets = offsets
+        self.records = records
+        self.corpus = corpus
+        # Posição de cada linha no corpus compartilhado (-1 = ler do records.jsonl)
+        self.source = source
+        self.columns: Dict[str, np.ndarray] = {}
+
+
+def _object_array(values: List[Any]) -> np.ndarray:
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Busca exata por cosseno com NumPy.
+
+    Persistência append-only em `store_dir`:
+    - vectors.bin: vetores normalizados, linha a linha (memory-mapped na leitura)
+    - scales.bin: escala float32 de cada linha (só com dtype int8)
+    - records.jsonl: id, documento e metadados de cada linha
+    - store.json: dimensão e dtype (fixados na criação do store)
+
+    Se um id for inserido novamente, a linha mais recente prevalece e a
+    anterior fica inativa. Quando as linhas inativas passam de
+    `compact_ratio` do total, os arquivos são reescritos só com as ativas
+    (`compact`).
+
+    Em memória ficam só os ids e o offset de cada linha no records.jsonl:
+    documentos e metadados vêm do corpus compartilhado pelo vetorizador
+    (`attach_corpus`) ou, para linhas que ele ainda não cobre, do arquivo.
+    """
+
+    name = "numpy"
+    VECTORS_FILE = "vectors.bin"
+    SCALES_FILE = "scales.bin"
+    RECORDS_FILE = "records.jsonl"
+    META_FILE = "store.json"
+    COMPACT_RATIO = 0.3
+
+    def __init__(self, store_dir: str, dimension: int = 768, dtype: str = "float32",
+                 compact_ratio: Optional[float] = None):
+        """
+        Args:
+            store_dir: Diretório dos arquivos do store
+            dimension: Dimensões armazenadas (ignorado se o store já existe)
+            dtype: "float32", "float16" ou "int8" (ignorado se o store já existe)
+            compact_ratio: Fração de linhas inativas que dispara a compactação
+                (padrão: VECTOR_COMPACT_RATIO ou 0.3)
+        """
+        self.store_dir = store_dir
+        self.compact_ratio = float(
+            os.getenv("VECTOR_COMPACT_RATIO", str(self.COMPACT_RATIO)) if compact_ratio is None else compact_ratio
+        )
+        os.makedirs(store_dir, exist_ok=True)
+
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"dtype não suportado: {dtype} (use {', '.join(VECTOR_DTYPES)})")
+
+        meta_path = os.path.join(store_dir, self.META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            dimension, dtype = meta["dimension"], meta["dtype"]
+        else:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"dimension": dimension, "dtype": dtype}, f)
+
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        # Escritas (add, update_metadata, compact, clear, bulk_load) são
+        # serializadas; buscas não travam e leem o estado publicado em self._rows
+        self._write_lock = threading.RLock()
+        self._load()
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.store_dir, self.VECTORS_FILE)
+
+    @property
+    def _scales_path(self) -> str:
+        return os.path.join(self.store_dir, self.SCALES_FILE)
+
+    @property
+    def _records_path(self) -> str:
+        return os.path.join(self.store_dir, self.RECORDS_FILE)
+
+    def _load(self) -> None:
+        """Lê ids e offsets dos registros e mapeia os vetores do disco."""
+        self.ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self._offsets = array("q", [0])
+        self._rows = _Rows(self.ids, 0, np.ones(0, dtype=bool), np.zeros((0, self.dimension), dtype=self.dtype),
+                           np.ones(0, dtype=np.float32), self._offsets, None, None, np.zeros(0, dtype=np.int32))
+
+        if os.path.exists(self._records_path):
+            ids, sizes = [], []
+            with open(self._records_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    ids.append(json.loads(line)["id"])
+                    sizes.append(len(line))
+            rows = self._repair_tail(len(ids), sum(sizes))
+            self._append_records(ids[:rows], sizes[:rows])
+            self._maybe_compact()
+
+    def _repair_tail(self, rows: int, records_bytes: int) -> int:
+        """
+        Alinha vectors.bin, scales.bin e records.jsonl após uma escrita interrompida.
+
+        `_write` acrescenta escalas e vetores antes dos registros; se o
+        processo cair no meio, sobram vetores sem registro (que deslocariam
+        todas as linhas gravadas depois) ou uma linha de registro incompleta.
+        Corta a cauda excedente de cada arquivo para o menor número de linhas
+        completas.
+
+        Returns:
+            Número de linhas consistentes
+        """
+        row_bytes = self.dimension * np.dtype(self.dtype).itemsize
+        files = [(self._vectors_path, row_bytes)]
+        if self.quantized:
+            files.append((self._scales_path, np.dtype(np.float32).itemsize))
+
+        sizes = {path: os.path.getsize(path) if os.path.exists(path) else 0 for path, _ in files}
+        committed = min([rows] + [sizes[path] // width for path, width in files])
+        if committed < rows:
+            print(f"⚠️ Vetores incompletos no store: descartando {rows - committed} registros do fim")
+
+        for path, width in files:
+            if sizes[path] > committed * width:
+                print(f"⚠️ Cortando {sizes[path] - committed * width} bytes órfãos de {os.path.basename(path)}")
+                os.truncate(path, committed * width)
+
+        keep = records_bytes
+        if committed < rows:
+            with open(self._records_path, "rb") as f:
+                keep = sum(len(line) for _, line in zip(range(committed), f))
+        if os.path.getsize(self._records_path) > keep:
+            os.truncate(self._records_path, keep)
+        return committed
+
+    def _append_records(self, ids: List[str], sizes: List[int],
+                        metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Registra linhas acrescentadas ao records.jsonl e remapeia os vetores.
+
+        Ids e offsets só crescem no fim; máscara, vetores e escalas são
+        montados à parte e trocados de uma vez (`self._rows`), então uma busca
+        concorrente sempre vê um estado coerente (as linhas antigas).
+
+        Args:
+            ids: IDs das novas linhas
+            sizes: Bytes de cada linha no records.jsonl
+            metadatas: Metadados das novas linhas, para estender as colunas em cache
+        """
+        state = self._rows
+        start = len(self.ids)
+        replaced = []
+        for chunk_id, size in zip(ids, sizes):
+            # Linhas substituídas por uma inserção posterior do mesmo id ficam inativas
+            previous = self.row_of.get(chunk_id)
+            if previous is not None:
+                replaced.append(previous)
+            chunk_id = sys.intern(chunk_id)
+            self.row_of[chunk_id] = len(self.ids)
+            self.ids.append(chunk_id)
+            self._offsets.append(self._offsets[-1] + size)
+        rows = len(self.ids)
+
+        alive = np.concatenate([state.alive, np.ones(rows - start, dtype=bool)])
+        alive[replaced] = False
+
+        if rows and os.path.exists(self._vectors_path):
+            vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dimension))
+        else:
+            vectors = np.zeros((0, self.dimension), dtype=self.dtype)
+
+        if self.quantized and rows and os.path.exists(self._scales_path):
+            scales = np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(rows,))
+        else:
+            scales = np.ones(rows, dtype=np.float32)
+
+        records = state.records
+        if records is None and rows:
+            records = open(self._records_path, "rb")
+        source = np.concatenate([state.source, np.full(rows - start, -1, dtype=np.int32)])
+
+        appended = _Rows(self.ids, rows, alive, vectors, scales, self._offsets, records, state.corpus, source)
+        if metadatas is not None:
+            for field, column in state.columns.items():
+                appended.columns[field] = np.concatenate(
+                    [column, _object_array([metadata.get(field) for metadata in metadatas])]
+                )
+        self._rows = appended
+
+    def attach_corpus(self, corpus: Corpus) -> None:
+        """
+        Passa a ler documentos e metadados do corpus compartilhado.
+
+        Linhas ativas cujo id está no corpus apontam para a posição dele; as
+        demais (e as gravadas depois) seguem lidas do records.jsonl até o
+        próximo `attach_corpus`.
+        """
+        with self._write_lock:
+            state = self._rows
+            position = corpus.position
+            source = np.fromiter((position.get(chunk_id, -1) for chunk_id in state.ids[:state.count]),
+                                 dtype=np.int32, count=state.count)
+            source[~state.alive] = -1
+            attached = _Rows(state.ids, state.count, state.alive, state.vectors, state.scales,
+                             state.offsets, state.records, corpus, source)
+            attached.columns = dict(state.columns)
+            self._rows = attached
+
+    @property
+    def quantized(self) -> bool:
+        return self.dtype == np.int8
+
+    def _record(self, state: _Rows, row: int) -> Dict[str, Any]:
+        """Registro (id, document, metadata) de uma linha, lido do records.jsonl."""
+        start = state.offsets[row]
+        return json.loads(os.pread(state.records.fileno(), state.offsets[row + 1] - start, start))
+
+    def _chunk(self, state: _Rows, row: int) -> Tuple[str, Dict[str, Any]]:
+        """Documento e metadados de uma linha (corpus compartilhado ou disco)."""
+        position = int(state.source[row])
+        if position >= 0:
+            return state.corpus.text(position), state.corpus.metadata(position)
+        record = self._record(state, row)
+        return record["document"], record["metadata"]
+
+    def add(self, ids, embeddings, documents, metadatas) -> None:
+        vectors = truncate_normalize(embeddings, self.dimension)
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Dimensão {vectors.shape[1]} menor que a do store ({self.dimension})")
+        scales = None
+        if self.quantized:
+            vectors, scales = quantize_int8(vectors)
+        with self._write_lock:
+            self._write(ids, vectors.astype(self.dtype), scales, documents, metadatas)
+            self._maybe_compact()
+
+    def _write(self, ids, vectors, scales, documents, metadatas) -> None:
+        """Acrescenta linhas já no formato do store aos arquivos e publica o novo estado (com o lock)."""
+        if self.quantized:
+            with open(self._scales_path, "ab") as f:
+                f.write(np.ascontiguousarray(scales, dtype=np.float32).tobytes())
+        with open(self._vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors).tobytes())
+        lines = [
+            (json.dumps({"id": chunk_id, "document": document, "metadata": metadata}, ensure_ascii=False) + "\n")
+            .encode("utf-8")
+            for chunk_id, document, metadata in zip(ids, documents, metadatas)
+        ]
+        with open(self._records_path, "ab") as f:
+            f.write(b"".join(lines))
+        self._append_records(list(ids), [len(line) for line in lines], list(metadatas))
+
+    def update_metadata(self, ids, metadatas) -> None:
+        # Append-only: regrava as linhas com os mesmos bytes de vetor (e escala,
+        # sem requantizar) e os novos metadados
+        with self._write_lock:
+            pairs = [(chunk_id, metadata) for chunk_id, metadata in zip(ids, metadatas) if chunk_id in self.row_of]
+            if not pairs:
+                return
+            state = self._rows
+            rows = [self.row_of[chunk_id] for chunk_id, _ in pairs]
+            self._write(
+                [chunk_id for chunk_id, _ in pairs],
+                np.asarray(state.vectors[rows]),
+                np.asarray(state.scales[rows]) if self.quantized else None,
+                [self._chunk(state, row)[0] for row in rows],
+                [metadata for _, metadata in pairs]
+            )
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        state = self._rows
+        dead = state.count - int(state.alive.sum())
+        if dead and dead > self.compact_ratio * state.count:
+            self.compact()
+
+    def compact(self, batch_size: int = 4096) -> Dict[str, int]:
+        """
+        Reescreve os arquivos só com as linhas ativas.
+
+        Os novos arquivos são gravados ao lado e trocados com `os.replace`;
+        buscas em andamento continuam lendo os memmaps e o records.jsonl
+        antigos (o arquivo substituído segue acessível até ser fechado).
+        """
+        with self._write_lock:
+            state = self._rows
+            rows = np.flatnonzero(state.alive)
+            before = state.count
+
+            with open(self._vectors_path + ".tmp", "wb") as f:
+                for start in range(0, len(rows), batch_size):
+                    f.write(np.ascontiguousarray(state.vectors[rows[start:start + batch_size]]).tobytes())
+            if self.quantized:
+                with open(self._scales_path + ".tmp", "wb") as f:
+                    f.write(np.ascontiguousarray(state.scales[rows], dtype=np.float32).tobytes())
+            # Registros copiados como bytes, sem decodificar
+            offsets = array("q", [0])
+            with open(self._records_path + ".tmp", "wb") as f:
+                for row in rows:
+                    start, end = state.offsets[row], state.offsets[row + 1]
+                    f.write(os.pread(state.records.fileno(), end - start, start))
+                    offsets.append(offsets[-1] + end - start)
+
+            paths = [self._vectors_path, self._records_path] + ([self._scales_path] if self.quantized else [])
+            for path in paths:
+                os.replace(path + ".tmp", path)
+
+            count = len(rows)
+            self.ids = [state.ids[row] for row in rows]
+            self.row_of = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+            self._offsets = offsets
+            vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(count, self.dimension)) \
+                if count else np.zeros((0, self.dimension), dtype=self.dtype)
+            scales = np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(count,)) \
+                if self.quantized and count else np.ones(count, dtype=np.float32)
+            compacted = _Rows(self.ids, count, np.ones(count, dtype=bool), vectors, scales, offsets,
+                              open(self._records_path, "rb"), state.corpus, state.source[rows])
+            compacted.columns = {field: column[rows] for field, column in state.columns.items()}
+            self._rows = compacted
+
+        print(f"Store NumPy compactado: {before} -> {count} linhas")
+        return {"rows_before": before, "rows_after": count}
+
+    def _column(self, state: _Rows, field: str) -> np.ndarray:
+        """Coluna de metadados das linhas do estado como array NumPy (cache por campo)."""
+        column = state.columns.get(field)
+        if column is None:
+            column = np.empty(state.count, dtype=object)
+            shared = state.source >= 0
+            if shared.any():
+                column[shared] = _object_array(state.corpus.column(field))[state.source[shared]]
+            for row in np.flatnonzero(state.alive & ~shared):
+                column[row] = self._record(state, row)["metadata"].get(field)
+            state.columns[field] = column
+        return column
+
+    def _mask(self, state: _Rows, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Converte um filtro no formato `where` do Chroma em máscara booleana."""
+        mask = state.alive.copy()
+        if where:
+            mask &= self._evaluate(state, where)
+        return mask
+
+    def _evaluate(self, state: _Rows, where: Dict[str, Any]) -> np.ndarray:
+        result = np.ones(state.count, dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for sub in condition:
+                    result &= self._evaluate(state, sub)
+            elif key == "$or":
+                any_mask = np.zeros(state.count, dtype=bool)
+                for sub in condition:
+                    any_mask |= self._evaluate(state, sub)
+                result &= any_mask
+            else:
+                result &= self._compare(self._column(state, key), condition)
+        return result
+
+    @staticmethod
+    def _compare(column: np.ndarray, condition: Any) -> np.ndarray:
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        result = np.ones(len(column), dtype=bool)
+        for op, value in condition.items():
+            if op == "$eq":
+                result &= column == value
+            elif op == "$ne":
+                result &= column != value
+            elif op == "$in":
+                result &= np.isin(column, list(value))
+            elif op == "$nin":
+                result &= ~np.isin(column, list(value))
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                present = np.array([v is not None for v in column], dtype=bool)
+                values = np.where(present, column, 0).astype(float)
+                compare = {
+                    "$gt": np.greater, "$gte": np.greater_equal,
+                    "$lt": np.less, "$lte": np.less_equal
+                }[op]
+                result &= present & compare(values, value)
+            else:
+                raise ValueError(f"Operador de filtro não suportado: {op}")
+        return result
+
+    def query(self, query_embeddings, n_results, where=None):
+        queries = truncate_normalize(query_embeddings, self.dimension)
+        # Um único estado durante toda a consulta (escritas concorrentes trocam self._rows)
+        state = self._rows
+        mask = self._mask(state, where)
+        candidates = np.flatnonzero(mask)
+
+        response = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if len(candidates) == 0:
+            for _ in range(len(queries)):
+                for key in response:
+                    response[key].append([])
+            return response
+
+        # Similaridade de todas as queries contra os candidatos em um só produto.
+        # Filtro seletivo: só as linhas candidatas; senão a matriz inteira (sem
+        # copiar as linhas) com as excluídas em -inf
+        if len(candidates) * 2 < state.count:
+            positions = candidates
+            scores = np.asarray(state.vectors[candidates], dtype=np.float32) @ queries.T
+            if self.quantized:
+                scores *= np.asarray(state.scales[candidates], dtype=np.float32)[:, None]
+        else:
+            positions = np.arange(state.count)
+            scores = np.asarray(state.vectors, dtype=np.float32) @ queries.T
+            if self.quantized:
+                scores *= np.asarray(state.scales, dtype=np.float32)[:, None]
+            scores[~mask] = -np.inf
+
+        k = min(n_results, len(candidates))
+        for column in range(scores.shape[1]):
+            col = scores[:, column]
+            top = np.argpartition(-col, k - 1)[:k] if k < len(col) else np.arange(len(col))
+            top = top[np.argsort(-col[top])]
+            rows = positions[top]
+            chunks = [self._chunk(state, row) for row in rows]
+            response["ids"].append([state.ids[row] for row in rows])
+            response["documents"].append([document for document, _ in chunks])
+            response["metadatas"].append([metadata for _, metadata in chunks])
+            response["distances"].append([float(1.0 - col[i]) for i in top])
+
+        return response
+
+    def get_all(self) -> Dict[str, List[Any]]:
+        state = self._rows
+        data = {"ids": [], "documents": [], "metadatas": []}
+        for row in np.flatnonzero(state.alive):
+            document, metadata = self._chunk(state, row)
+            data["ids"].append(state.ids[row])
+            data["documents"].append(document)
+            data["metadatas"].append(metadata)
+        return data
+
+    def peek(self, limit: int = 5) -> List[Dict[str, Any]]:
+        state = self._rows
+        return [self._chunk(state, row)[1] for row in np.flatnonzero(state.alive)[:limit]]
+
+    def export_vectors(self) -> Tuple[List[str], np.ndarray, Optional[np.ndarray]]:
+        state = self._rows
+        rows = np.flatnonzero(state.alive)
+        scales = np.asarray(state.scales[rows], dtype=np.float32) if self.quantized else None
+        return [state.ids[row] for row in rows], np.asarray(state.vectors[rows]), scales
+
+    def bulk_load(self, ids, vectors, scales, documents, metadatas, batch_size: int = 500) -> None:
+        # Mesmo formato do store: grava os arquivos direto, sem renormalizar
+        if vectors.dtype != self.dtype or vectors.shape[1] != self.dimension \
+                or (self.quantized and scales is None):
+            super().bulk_load(ids, vectors, scales, documents, metadatas, batch_size)
+            return
+        with self._write_lock:
+            self.clear()
+            with open(self._vectors_path, "wb") as f:
+                for start in range(0, len(ids), batch_size):
+                    f.write(np.ascontiguousarray(vectors[start:start + batch_size]).tobytes())
+            if self.quantized:
+                with open(self._scales_path, "wb") as f:
+                    f.write(np.ascontiguousarray(scales, dtype=np.float32).tobytes())
+            with open(self._records_path, "w", encoding="utf-8") as f:
+                for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                    f.write(json.dumps({"id": chunk_id, "document": document, "metadata": metadata},
+                                       ensure_ascii=False) + "\n")
+            self._load()
+
+    def count(self) -> int:
+        return int(self._rows.alive.sum())
+
+    def warm(self, block_rows: int = 4096) -> int:
+        """Lê o vectors.bin (e escalas) inteiro para carregar as páginas do memmap."""
+        state = self._rows
+        touched = 0
+        for start in range(0, state.count, block_rows):
+            block = state.vectors[start:start + block_rows]
+            np.add.reduce(block, axis=None, dtype=np.float64)
+            touched += block.nbytes
+        if self.quantized and state.count:
+            np.add.reduce(state.scales, dtype=np.float64)
+            touched += state.scales.nbytes
+        return int(touched)
+
+    def memory_bytes(self) -> int:
+        """Bytes ocupados pelos vetores (e escalas) de todas as linhas."""
+        per_vector = self.dimension * self.dtype.itemsize + (4 if self.quantized else 0)
+        return self._rows.count * per_vector
+
+    def clear(self) -> None:
+        with self._write_lock:
+            for path in (self._vectors_path, self._scales_path, self._records_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._load()
+
+
+def create_vector_store(
+    backend: str,
+    persist_dir: str,
+    collection_metadata: Dict[str, Any],
+    dimension: int = 768,
+    dtype: str = "float32"
+) -> VectorStore:
+    """
+    Cria o backend vetorial configurado.
+
+    Args:
+        backend: "chroma" ou "numpy"
+        persist_dir: Diretório de persistência
+        collection_metadata: Metadados da coleção (Chroma)
+        dimension: Dimensões armazenadas; menor que a do modelo trunca e renormaliza
+        dtype: "float32", "float16" ou "int8" (NumPy)
+    """
+    if backend == "chroma":
+        return ChromaVectorStore(persist_dir, collection_metadata, dimension)
+    if backend == "numpy":
+        return NumpyVectorStore(os.path.join(persist_dir, "numpy_store"), dimension, dtype)
+    raise ValueError(f"Backend vetorial desconhecido: {backend}")
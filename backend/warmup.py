@@ -0,0 +1,97 @@
+"""
+Aquecimento da API após o deploy.
+
+Antes de liberar o tráfego, lê os vetores do backend para a memória e
+reexecuta as queries mais frequentes do log persistido: isso preenche o
+cache de embeddings de queries e percorre as mesmas páginas do índice
+vetorial e do SQLite que as primeiras requisições reais vão usar. Sem log
+(primeiro deploy), usa as queries de benchmark_queries.json.
+"""
+
+import os
+import json
+import time
+import threading
+from typing import List, Dict, Any, Optional
+
+from query_log import top_queries, log_paths
+
+FALLBACK_QUERIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_queries.json")
+
+
+class Warmup:
+    """Estado e execução do aquecimento (pending -> warming -> ready | failed)."""
+
+    TOP_QUERIES = 200
+    BATCH_SIZE = 50
+
+    def __init__(self, query_log_path: Optional[str] = None, top_n: Optional[int] = None):
+        """
+        Args:
+            query_log_path: Log de queries persistido (query_log.QUERY_LOG_FILE)
+            top_n: Queries reexecutadas (padrão: WARMUP_QUERIES ou 200; 0 desliga)
+        """
+        self.query_log_path = query_log_path
+        self.top_n = int(os.getenv("WARMUP_QUERIES", str(self.TOP_QUERIES)) if top_n is None else top_n)
+        self.status = "pending"
+        self.report: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "failed")
+
+    def load_queries(self) -> List[str]:
+        """Top-N do log; sem log, as queries de benchmark."""
+        if self.query_log_path and log_paths(self.query_log_path):
+            queries = [item["query"] for item in top_queries(self.query_log_path, self.top_n)]
+            if queries:
+                self.report["query_source"] = "query_log"
+                return queries
+        self.report["query_source"] = "benchmark"
+        try:
+            with open(FALLBACK_QUERIES_PATH, encoding="utf-8") as f:
+                return [item["query"] for item in json.load(f)][:self.top_n]
+        except (OSError, ValueError):
+            return []
+
+    def run(self, vectorizer) -> Dict[str, Any]:
+        """
+        Executa o aquecimento (síncrono; chamar fora do event loop).
+
+        Falhas (ex: Gemini indisponível) não impedem a API de subir: o
+        status vira "failed" e o erro fica no relatório.
+        """
+        with self._lock:
+            self.status = "warming"
+            self.report = {"started_at": time.time()}
+            started = time.perf_counter()
+            try:
+                vector_started = time.perf_counter()
+                self.report["vector_bytes_touched"] = vectorizer.store.warm()
+                self.report["vector_s"] = round(time.perf_counter() - vector_started, 3)
+
+                queries = self.load_queries() if self.top_n > 0 else []
+                replay_started = time.perf_counter()
+                for start in range(0, len(queries), self.BATCH_SIZE):
+                    vectorizer.search_batch(
+                        [{"query": query} for query in queries[start:start + self.BATCH_SIZE]],
+                        include_text=False
+                    )
+                self.report["queries_replayed"] = len(queries)
+                self.report["replay_s"] = round(time.perf_counter() - replay_started, 3)
+                self.report["query_cache"] = vectorizer.query_embedding_cache.stats()
+                self.status = "ready"
+            except Exception as e:
+                self.report["error"] = str(e)
+                self.status = "failed"
+            self.report["elapsed_s"] = round(time.perf_counter() - started, 3)
+
+        print(
+            f"Aquecimento {self.status}: {self.report.get('queries_replayed', 0)} queries "
+            f"({self.report.get('query_source', '-')}) em {self.report['elapsed_s']:.1f}s"
+        )
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"status": self.status, "top_n": self.top_n, **self.report}
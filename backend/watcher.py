@@ -0,0 +1,225 @@
+"""
+Ingestão por pasta monitorada (decretos de crédito, emendas).
+
+Arquivos .pdf, .json (content_list) e .md colocados em `INGEST_DIR` são
+indexados em background ao lado da LOA, sem reindexar o documento inteiro.
+A pasta é verificada por polling (sem dependências extras):
+
+1. um arquivo novo ou alterado fica em `debouncing` até tamanho e mtime
+   ficarem estáveis por `debounce` segundos (cópia ainda em andamento);
+2. o conteúdo é identificado pelo sha256: um arquivo já indexado (mesmo
+   renomeado ou copiado de novo) é ignorado;
+3. os documentos novos são indexados um por vez com
+   `LOAVectorizer.index_document`, com IDs e metadado `document` próprios.
+
+O estado (documentos já indexados) é persistido em `ingest_state.json`, e
+o status de cada arquivo fica disponível em GET /api/admin/ingest. Depois
+de limpar a coleção ou restaurar um snapshot, `reconcile` esquece os
+documentos que não estão mais no índice para que sejam reindexados.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+SUPPORTED_EXTENSIONS = (".pdf", ".json", ".md")
+INGEST_STATE_FILE = "ingest_state.json"
+
+
+def file_fingerprint(path: str, block_size: int = 1 << 20) -> str:
+    """sha256 do conteúdo do arquivo (lido em blocos)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def document_id(name: str, fingerprint: str) -> str:
+    """ID estável do documento: nome do arquivo normalizado + início do hash."""
+    stem = os.path.splitext(name)[0].lower()
+    slug = re.sub(r"[^a-z0-9]+", "_", stem).strip("_")[:40] or "documento"
+    return f"{slug}_{fingerprint[:8]}"
+
+
+class IngestWatcher:
+    """Monitora a pasta de ingestão e indexa os documentos novos."""
+
+    POLL_INTERVAL = 5.0
+    DEBOUNCE = 10.0
+
+    def __init__(
+        self,
+        directory: str,
+        state_path: str,
+        poll_interval: Optional[float] = None,
+        debounce: Optional[float] = None,
+        lock: Optional[threading.Lock] = None
+    ):
+        """
+        Args:
+            directory: Pasta monitorada (INGEST_DIR)
+            state_path: Arquivo com os documentos já indexados (INGEST_STATE_FILE)
+            poll_interval: Segundos entre verificações (padrão: INGEST_POLL_INTERVAL ou 5; 0 desliga)
+            debounce: Segundos sem alteração antes de indexar (padrão: INGEST_DEBOUNCE ou 10)
+            lock: Trava de escrita no índice compartilhada com os outros escritores
+                (reindexação, restauração de snapshot, limpeza)
+        """
+        self.directory = directory
+        self.state_path = state_path
+        self.poll_interval = float(
+            os.getenv("INGEST_POLL_INTERVAL", str(self.POLL_INTERVAL)) if poll_interval is None else poll_interval
+        )
+        self.debounce = float(os.getenv("INGEST_DEBOUNCE", str(self.DEBOUNCE)) if debounce is None else debounce)
+        # nome do arquivo -> status exposto pela API
+        self.files: Dict[str, Dict[str, Any]] = {}
+        # nome do arquivo -> (tamanho, mtime, estável desde)
+        self._signatures: Dict[str, Tuple[int, float, float]] = {}
+        # sha256 -> documento indexado
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.lock = lock or threading.Lock()
+        self._load_state()
+
+    @property
+    def enabled(self) -> bool:
+        return self.poll_interval > 0
+
+    def _load_state(self) -> None:
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                self.documents = json.load(f).get("documents", {})
+        except (OSError, ValueError) as e:
+            print(f"ATENÇÃO: estado da ingestão ilegível ({self.state_path}): {e}")
+
+    def _save_state(self) -> None:
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"documents": self.documents}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def scan(self, now: Optional[float] = None) -> List[str]:
+        """
+        Verifica a pasta e atualiza o status dos arquivos.
+
+        Returns:
+            Nomes dos arquivos prontos para indexar (estáveis e ainda não indexados)
+        """
+        now = time.time() if now is None else now
+        if not os.path.isdir(self.directory):
+            return []
+
+        ready = []
+        present = set()
+        for entry in sorted(os.scandir(self.directory), key=lambda e: e.name):
+            name = entry.name
+            if not entry.is_file() or name.startswith(".") or not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            present.add(name)
+            stat = entry.stat()
+            previous = self._signatures.get(name)
+            if previous is None or previous[:2] != (stat.st_size, stat.st_mtime):
+                # Novo ou ainda sendo copiado: reinicia o debounce
+                self._signatures[name] = (stat.st_size, stat.st_mtime, now)
+                self._set(name, status="debouncing", size=stat.st_size, detected_at=now)
+                continue
+
+            status = self.files.get(name, {}).get("status")
+            if status != "debouncing" or now - previous[2] < self.debounce:
+                continue
+
+            fingerprint = file_fingerprint(entry.path)
+            known = self.documents.get(fingerprint)
+            if known is not None:
+                self._set(name, status="already_indexed", fingerprint=fingerprint, document=known["document"])
+                continue
+            self._set(name, status="queued", fingerprint=fingerprint, document=document_id(name, fingerprint))
+            ready.append(name)
+
+        for name in set(self._signatures) - present:
+            del self._signatures[name]
+            if self.files.get(name, {}).get("status") in ("debouncing", "queued"):
+                del self.files[name]
+        return ready
+
+    def _set(self, name: str, **fields: Any) -> None:
+        self.files.setdefault(name, {"file": name}).update(fields)
+
+    def ingest(self, name: str, vectorizer) -> Dict[str, Any]:
+        """Indexa um arquivo já marcado como `queued` (síncrono; chamar fora do event loop)."""
+        info = self.files[name]
+        path = os.path.join(self.directory, name)
+        self._set(name, status="indexing", started_at=time.time(), error=None)
+        print(f"Ingestão: indexando {name} como {info['document']}...")
+        try:
+            # O arquivo pode ter mudado entre o scan e a indexação
+            if file_fingerprint(path) != info["fingerprint"]:
+                self._signatures.pop(name, None)
+                self._set(name, status="debouncing")
+                return info
+            result = vectorizer.index_document(path, info["document"])
+            self.documents[info["fingerprint"]] = {
+                "document": info["document"],
+                "file": name,
+                "chunks": result["total_inserted"],
+                "indexed_at": time.time(),
+            }
+            self._save_state()
+            self._set(name, status="indexed", chunks=result["total_inserted"], finished_at=time.time())
+        except Exception as e:
+            print(f"Erro na ingestão de {name}: {e}")
+            self._set(name, status="failed", error=str(e), finished_at=time.time())
+        return self.files[name]
+
+    def reconcile(self, vectorizer) -> List[str]:
+        """
+        Esquece os documentos que não estão mais no índice (coleção limpa ou
+        snapshot restaurado); seus arquivos voltam a ser detectados no próximo
+        scan e são reindexados.
+
+        Chamado com `lock` adquirido pelo escritor que alterou o índice (ou
+        antes de o monitoramento começar).
+
+        Returns:
+            IDs dos documentos esquecidos
+        """
+        missing = {
+            fingerprint for fingerprint, info in self.documents.items()
+            if not vectorizer.metadata_index.lookup("document", info["document"])
+        }
+        if not missing:
+            return []
+        forgotten = [self.documents.pop(fingerprint)["document"] for fingerprint in missing]
+        for name in [name for name, info in self.files.items() if info.get("fingerprint") in missing]:
+            del self.files[name]
+            self._signatures.pop(name, None)
+        self._save_state()
+        print(f"Ingestão: {len(forgotten)} documento(s) fora do índice serão reindexados")
+        return forgotten
+
+    def run_once(self, vectorizer) -> List[Dict[str, Any]]:
+        """Uma verificação da pasta seguida da indexação dos arquivos prontos (pula se outro escritor tem `lock`)."""
+        if not self.lock.acquire(blocking=False):
+            return []
+        try:
+            return [self.ingest(name, vectorizer) for name in self.scan()]
+        finally:
+            self.lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "enabled": self.enabled,
+            "poll_interval_s": self.poll_interval,
+            "debounce_s": self.debounce,
+            "indexed_documents": len(self.documents),
+            "files": sorted(self.files.values(), key=lambda info: info.get("detected_at", 0), reverse=True),
+        }
@@ -13,7 +13,10 @@ export interface ChatMessage {
 
 export interface SearchResult {
   rank: number;
-  text: string;
+  id: string;
+  snippet: string;
+  highlights: [number, number][];
+  text?: string;
   metadata: {
     page: number;
     chunk_type?: string;
@@ -145,7 +148,7 @@ const ChatView: React.FC = () => {
     topResults.forEach((result, index) => {
       const page = result.metadata.page || '?';
       response += `\n**${index + 1}.** (Página ${page})\n`;
-      response += `"${result.text.substring(0, 200)}${result.text.length > 200 ? '...' : ''}"\n`;
+      response += `"${result.snippet}"\n`;
     });
 
     response += `\n📊 **Relevância**: ${Math.round(sources[0].score * 100)}%`;
@@ -218,7 +221,7 @@ const ChatView: React.FC = () => {
                         <span
                           key={idx}
                           className="inline-flex items-center gap-1 px-2 py-1 bg-white rounded-md text-xs text-gray-600 border border-gray-200"
-                          title={source.text.substring(0, 100)}
+                          title={source.snippet.substring(0, 100)}
                         >
                           Pg. {source.metadata.page}
                           {source.metadata.section && (
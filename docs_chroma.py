@@ -215,6 +215,29 @@ def comparar_investimentos(regionais=[1,2,3,4,5,6,7,8]):
 comparar_investimentos([1,2,3,4,5,6,7,8])
 ```
 
+### Comparação Regional via API (uma única requisição)
+```python
+# Com a API rodando (backend/main.py), todas as combinações regional × tema
+# vão em um só POST: um lote de embeddings e uma busca multi-query.
+import requests
+
+def comparar_investimentos_api(regionais=range(1, 13), temas=("saúde", "educação", "infraestrutura", "esporte", "cultura")):
+    queries = [
+        {"query": f"Regional {regional} {tema}", "n_results": 10}
+        for regional in regionais
+        for tema in temas
+    ]
+    resposta = requests.post(
+        "http://localhost:8000/api/search/batch",
+        json={"queries": queries}
+    ).json()
+
+    for item in resposta["results"]:
+        print(f"{item['query']}: {item['total_results']} resultados")
+
+comparar_investimentos_api()
+```
+
 ## 🔍 Dicas de Busca Avançada
 
 ### 1. **Combinar Termos**
@@ -348,11 +371,15 @@ if st.button("Buscar"):
 
 ### Backup do Banco
 ```bash
-# Copiar banco de dados
-cp chroma_db/chroma.sqlite3 backups/loa_2026_$(date +%Y%m%d).sqlite3
+# Snapshot consistente (SQLite via backup API, vetores, rollup e manifest com sha256).
+# Não copie chroma_db/ com a API rodando: o arquivo pode estar no meio de uma escrita.
+python backend/snapshot.py export --out backups/loa_2026_$(date +%Y%m%d).tar.gz
+
+# Conferir checksums e restaurar
+python backend/snapshot.py verify backups/loa_2026_20260101.tar.gz
+python backend/snapshot.py import backups/loa_2026_20260101.tar.gz
 
-# Compactar backup
-tar -czf backups/loa_2026_$(date +%Y%m%d).tar.gz chroma_db/
+# Com a API no ar: POST /api/admin/snapshots e POST /api/admin/snapshots/{nome}/restore
 ```
 
 ### Reconstrução (se necessário)